@@ -1,38 +1,52 @@
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, Tuple
 from jose import JWTError, jwt
-import bcrypt
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from backend import models
-from backend.database import get_db
-import os
+from backend.database import get_db, get_async_db, replica_router
+import hashlib
 import logging
 import uuid
-from dotenv import load_dotenv
+from backend.settings import get_settings
 
 # Import Redis client
-from backend.redis_client import redis_client
+from backend.redis_client import async_redis_client
+from backend.password_hasher import password_hasher, check_password, hash_password
+from backend.cache import TTLCache
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import make_transient_to_detached
 
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+settings = get_settings()
 
 # JWT Configuration
-SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+SECRET_KEY = settings.jwt_secret_key
 if not SECRET_KEY:
     raise ValueError("JWT_SECRET_KEY environment variable is not set")
     
-ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ALGORITHM = settings.jwt_algorithm
 # Token expiration settings
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))  # 30 minutes for access token
-REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))  # Default 7 days for refresh token
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes  # 30 minutes for access token
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days  # Default 7 days for refresh token
 DEFAULT_REFRESH_TOKEN_DAYS = REFRESH_TOKEN_EXPIRE_DAYS  # Alias for backward compatibility
 REMEMBER_ME_REFRESH_DAYS = 30  # 30 days for "Remember Me" sessions
-TOKEN_ISSUER = os.getenv("TOKEN_ISSUER", "eaglevision-mvp")
-TOKEN_AUDIENCE = os.getenv("TOKEN_AUDIENCE", "eaglevision-users")
+TOKEN_ISSUER = settings.token_issuer
+TOKEN_AUDIENCE = settings.token_audience
+
+# Authenticated-principal cache (per worker). Entries never outlive the
+# token that populated them, and writes that change a user must call
+# invalidate_principal() so this worker stops serving the stale row.
+PRINCIPAL_CACHE_TTL_SECONDS = settings.principal_cache_ttl_seconds
+PRINCIPAL_CACHE_SIZE = settings.principal_cache_size
+
+# Decoded-token cache (per worker), bounded by each token's exp claim
+TOKEN_CACHE_TTL_SECONDS = settings.token_cache_ttl_seconds
+TOKEN_CACHE_SIZE = settings.token_cache_size
 
 # Token URLs
 TOKEN_URL = "/api/auth/token"
@@ -45,33 +59,20 @@ oauth2_scheme = OAuth2PasswordBearer(
 )
 
 # Password hashing
+# The sync versions block for the full bcrypt cost and are meant for scripts.
+# Request handlers must use the *_async versions, which run on the
+# password hasher's bounded thread pool.
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    try:
-        # Convert the plain password to bytes if it's not already
-        if isinstance(plain_password, str):
-            plain_password = plain_password.encode('utf-8')
-        
-        # Convert the hashed password to bytes if it's not already
-        if isinstance(hashed_password, str):
-            hashed_password = hashed_password.encode('utf-8')
-            
-        # Verify the password using bcrypt
-        return bcrypt.checkpw(plain_password, hashed_password)
-    except Exception as e:
-        logger.error(f"Error verifying password: {e}")
-        return False
+    return check_password(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    # Convert the password to bytes if it's not already
-    if isinstance(password, str):
-        password = password.encode('utf-8')
-    
-    # Generate a salt and hash the password
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password, salt)
-    
-    # Return the hashed password as a string
-    return hashed.decode('utf-8')
+    return hash_password(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.hash(password)
 
 # User authentication
 def authenticate_user(db: Session, email: str, password: str):
@@ -188,10 +189,43 @@ def create_refresh_token(
             detail="Could not create refresh token"
         )
 
+# Decoded-token cache: digest of the raw token -> validated claims.
+# The blacklist is still consulted on every call, so revocation is honoured.
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+def forget_token(token: str) -> None:
+    """Drop a token from the decoded-token cache (e.g. after blacklisting it)."""
+    token_cache.pop(_token_digest(token))
+
+def _decode_token(token: str) -> Dict[str, Any]:
+    """Run full signature and claim validation on a token."""
+    return jwt.decode(
+        token,
+        SECRET_KEY,
+        algorithms=[ALGORITHM],
+        audience=TOKEN_AUDIENCE,
+        issuer=TOKEN_ISSUER,
+        options={
+            "require": ["exp", "iat", "sub"],
+            "verify_exp": True,
+            "verify_iat": True,
+            "verify_nbf": False,
+            "verify_iss": True,
+            "verify_aud": True,
+            "verify_signature": True
+        }
+    )
+
 async def verify_token(token: str):
     """
     Verify and decode a JWT token.
     Also checks if the token is blacklisted.
+
+    Tokens that passed validation are cached until their ``exp``, so repeat
+    calls with the same token skip signature and claim validation.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -200,28 +234,20 @@ async def verify_token(token: str):
     )
     
     try:
+        digest = _token_digest(token)
+
         # Check if token is blacklisted
-        if redis_client.is_blacklisted(token):
+        if await async_redis_client.is_blacklisted(token):
+            token_cache.pop(digest)
             logger.warning(f"Blacklisted token attempt: {token[:10]}...")
             raise credentials_exception
+
+        cached = token_cache.get(digest)
+        if cached is not None:
+            return dict(cached)
             
         # Decode the token
-        payload = jwt.decode(
-            token,
-            SECRET_KEY,
-            algorithms=[ALGORITHM],
-            audience=TOKEN_AUDIENCE,
-            issuer=TOKEN_ISSUER,
-            options={
-                "require": ["exp", "iat", "sub"],
-                "verify_exp": True,
-                "verify_iat": True,
-                "verify_nbf": False,
-                "verify_iss": True,
-                "verify_aud": True,
-                "verify_signature": True
-            }
-        )
+        payload = _decode_token(token)
         
         # Additional validation
         if not payload.get("sub"):
@@ -233,8 +259,9 @@ async def verify_token(token: str):
         if token_type and token_type not in ["access", "refresh"]:
             logger.warning(f"Invalid token type: {token_type}")
             raise credentials_exception
-            
-        return payload
+
+        token_cache.set(digest, payload, expires_at=payload["exp"])
+        return dict(payload)
         
     except jwt.ExpiredSignatureError:
         logger.info("Token has expired")
@@ -252,6 +279,99 @@ async def verify_token(token: str):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+# Principal cache
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+def _principal_snapshot(user: models.User) -> Dict[str, Any]:
+    """Copy the column values of a freshly loaded user."""
+    return {attr.key: getattr(user, attr.key) for attr in sa_inspect(models.User).column_attrs}
+
+def _detached_principal(snapshot: Dict[str, Any]) -> models.User:
+    """Rebuild a cached principal as a detached instance."""
+    user = models.User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+def _principal_from_snapshot(db: Session, snapshot: Dict[str, Any]) -> models.User:
+    """Attach a cached principal to ``db`` without issuing a SELECT."""
+    return db.merge(_detached_principal(snapshot), load=False)
+
+def invalidate_principal(user_id) -> None:
+    """Drop a user from this worker's principal cache.
+
+    Call this after logout, deactivation, password changes and profile updates.
+    """
+    principal_cache.pop(str(user_id))
+
+def load_principal(
+    db: Session,
+    user_id: str,
+    token_exp: Optional[float] = None,
+    active_only: bool = True
+) -> Optional[models.User]:
+    """
+    Load the user a token belongs to, serving repeat lookups from the principal cache.
+
+    Args:
+        db: Database session the returned user is attached to
+        user_id: The ``sub`` claim of the token
+        token_exp: The token's ``exp`` claim; cache entries never outlive it
+        active_only: Only return users with ``is_active`` set
+
+    Returns:
+        The user, or None if it doesn't exist (or is inactive when active_only is set)
+    """
+    key = str(user_id)
+    snapshot = principal_cache.get(key)
+    if snapshot is None:
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if not user:
+            return None
+        principal_cache.set(key, _principal_snapshot(user), expires_at=token_exp)
+    else:
+        user = _principal_from_snapshot(db, snapshot)
+
+    if active_only and not user.is_active:
+        return None
+    return user
+
+async def load_principal_async(
+    db: AsyncSession,
+    user_id: str,
+    token_exp: Optional[float] = None,
+    active_only: bool = True
+) -> Optional[models.User]:
+    """
+    Async version of load_principal for handlers on the async engine.
+
+    Args:
+        db: Async session the returned user is attached to
+        user_id: The ``sub`` claim of the token
+        token_exp: The token's ``exp`` claim; cache entries never outlive it
+        active_only: Only return users with ``is_active`` set
+
+    Returns:
+        The user, or None if it doesn't exist (or is inactive when active_only is set)
+    """
+    key = str(user_id)
+    snapshot = principal_cache.get(key)
+    if snapshot is None:
+        try:
+            user_pk = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        result = await db.execute(select(models.User).where(models.User.id == user_pk))
+        user = result.scalars().first()
+        if not user:
+            return None
+        principal_cache.set(key, _principal_snapshot(user), expires_at=token_exp)
+    else:
+        user = await db.merge(_detached_principal(snapshot), load=False)
+
+    if active_only and not user.is_active:
+        return None
+    return user
+
 async def get_current_user(
     request: Request,
     token: str = Depends(oauth2_scheme),
@@ -261,6 +381,27 @@ async def get_current_user(
     Dependency to get the current authenticated user from the JWT token.
     Includes additional security checks and logging.
     """
+    async def load(user_id, token_exp):
+        return load_principal(db, user_id, token_exp=token_exp)
+
+    return await _resolve_current_user(request, token, load)
+
+async def get_current_user_async(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> models.User:
+    """
+    Same as get_current_user, but the user is attached to an async session.
+    Use it in handlers that depend on get_async_db.
+    """
+    async def load(user_id, token_exp):
+        return await load_principal_async(db, user_id, token_exp=token_exp)
+
+    return await _resolve_current_user(request, token, load)
+
+async def _resolve_current_user(request: Request, token: Optional[str], load) -> models.User:
+    """Authenticate ``token`` and load its user with ``load(user_id, token_exp)``."""
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -291,11 +432,8 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Get user from database
-        user = db.query(models.User).filter(
-            models.User.id == user_id,
-            models.User.is_active == True
-        ).first()
+        # Get user from the principal cache, falling back to the database
+        user = await load(user_id, payload.get("exp"))
         
         if not user:
             logger.warning(f"User not found or inactive: {user_id}")
@@ -314,6 +452,7 @@ async def get_current_user(
         
         # Add user to request state for logging/monitoring
         request.state.user = user
+        replica_router.identify(f"user:{user_id}")
         
         return user
         
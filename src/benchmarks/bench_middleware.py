@@ -0,0 +1,191 @@
+"""
+Microbenchmark for the per-request overhead of the security middleware.
+
+"before" rebuilds the previous stack: SecurityHeadersMiddleware
+(BaseHTTPMiddleware), four ``@app.middleware("http")`` layers (rate limit,
+CORS headers, process time, request logging), two CORSMiddleware instances
+and SessionMiddleware. "after" is the single pure-ASGI SecurityMiddleware.
+Both wrap the same trivial endpoint and are driven with raw ASGI calls, so
+the numbers are middleware cost only. The rate limiter is stubbed with an
+in-process result so Redis is not needed.
+
+Usage:
+    python benchmarks/bench_middleware.py [iterations]
+"""
+import os
+import sys
+import time
+import asyncio
+from datetime import datetime
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+from fastapi import FastAPI, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.sessions import SessionMiddleware
+
+from backend.rate_limiter import RateLimitResult
+from backend.security import ALLOWED_ORIGINS, CONTENT_SECURITY_POLICY, SecurityMiddleware
+
+
+class StubLimiter:
+    async def check_default_limits(self, request):
+        return RateLimitResult(True, 100, 99, 0, time.time() + 3600)
+
+
+def endpoint_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/items")
+    async def items():
+        return {"ok": True}
+
+    return app
+
+
+def legacy_app() -> FastAPI:
+    app = endpoint_app()
+    app.state.limiter = StubLimiter()
+
+    class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            response = await call_next(request)
+            response.headers["X-Content-Type-Options"] = "nosniff"
+            response.headers["X-Frame-Options"] = "DENY"
+            response.headers["X-XSS-Protection"] = "1; mode=block"
+            response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+            response.headers["Content-Security-Policy"] = CONTENT_SECURITY_POLICY
+            response.headers["X-Nonce"] = os.urandom(16).hex()
+            response.headers["Permissions-Policy"] = "camera=(), microphone=(), geolocation=()"
+            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+            return response
+
+    @app.middleware("http")
+    async def rate_limit_middleware(request: Request, call_next):
+        rate_limit = await request.app.state.limiter.check_default_limits(request)
+        request.state.rate_limit = rate_limit
+        response = await call_next(request)
+        response.headers.update(request.state.rate_limit.headers())
+        return response
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=ALLOWED_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+        max_age=600,
+    )
+
+    @app.middleware("http")
+    async def add_cors_headers(request: Request, call_next):
+        if request.method == "OPTIONS":
+            return Response()
+        response = await call_next(request)
+        response.headers["Access-Control-Allow-Origin"] = "http://localhost:3000"
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        return response
+
+    app.add_middleware(SecurityHeadersMiddleware)
+
+    @app.middleware("http")
+    async def add_process_time_header(request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = str(time.time() - start_time)
+        return response
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        start_time = datetime.utcnow()
+        response = await call_next(request)
+        process_time = (datetime.utcnow() - start_time).total_seconds()
+        response.headers["X-Process-Time"] = str(process_time)
+        return response
+
+    app.add_middleware(SessionMiddleware, secret_key="benchmark", session_cookie="sessionid")
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return app
+
+
+def single_pass_app() -> FastAPI:
+    app = endpoint_app()
+    app.add_middleware(SecurityMiddleware, limiter=StubLimiter(), allowed_origins=ALLOWED_ORIGINS)
+    return app
+
+
+async def call(app, scope):
+    request_sent = False
+    response_complete = asyncio.Event()
+
+    async def receive():
+        # Like a real server: the body once, then a disconnect after the response
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_complete.set()
+
+    await app(dict(scope), receive, send)
+
+
+def bench(label: str, app, iterations: int, loop) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/items",
+        "raw_path": b"/api/items",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"localhost:8000"),
+            (b"origin", b"http://localhost:3000"),
+            (b"user-agent", b"bench"),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+
+    async def run(n):
+        for _ in range(n):
+            await call(app, scope)
+
+    loop.run_until_complete(run(200))  # warm up routing and the middleware stack
+    start = time.perf_counter()
+    loop.run_until_complete(run(iterations))
+    per_call_us = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<38} {per_call_us:9.2f} us/request")
+    return per_call_us
+
+
+def main(iterations: int = 5000):
+    loop = asyncio.new_event_loop()
+    print(f"GET /api/items, {iterations} iterations")
+    baseline = bench("no middleware", endpoint_app(), iterations, loop)
+    before = bench("before: layered middleware stack", legacy_app(), iterations, loop)
+    after = bench("after: single-pass SecurityMiddleware", single_pass_app(), iterations, loop)
+    loop.close()
+    print(f"middleware overhead: {before - baseline:.2f} us -> {after - baseline:.2f} us "
+          f"({(before - baseline) / max(after - baseline, 0.01):.1f}x less)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
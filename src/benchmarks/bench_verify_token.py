@@ -0,0 +1,59 @@
+"""
+Microbenchmark for auth.verify_token.
+
+Compares the per-request cost of full JWT validation (what every request
+paid before the decoded-token cache) with a warm-cache lookup of the same
+token. The Redis blacklist check is stubbed out so the numbers show CPU
+cost only; the blacklist round trip itself is covered by the local mirror.
+
+Usage:
+    python benchmarks/bench_verify_token.py [iterations]
+"""
+import os
+import sys
+import time
+import asyncio
+from unittest.mock import patch
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+from backend import auth
+from backend.redis_client import async_redis_client
+
+
+def bench(label: str, fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call_us = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<32} {per_call_us:9.2f} us/request")
+    return per_call_us
+
+
+def main(iterations: int = 20000):
+    token = auth.create_access_token(
+        user_id="42",
+        additional_claims={"role": "CLIENT", "email": "bench@example.com"},
+    )
+    loop = asyncio.new_event_loop()
+
+    def uncached():
+        auth.token_cache.clear()
+        loop.run_until_complete(auth.verify_token(token))
+
+    def cached():
+        loop.run_until_complete(auth.verify_token(token))
+
+    with patch.object(async_redis_client, "is_blacklisted", return_value=False):
+        print(f"verify_token, {iterations} iterations")
+        before = bench("full validation (no cache)", uncached, iterations)
+        loop.run_until_complete(auth.verify_token(token))
+        after = bench("decoded-token cache hit", cached, iterations)
+    loop.close()
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,104 @@
+"""
+Per-request detection of database connections that are never returned.
+
+While a :class:`CheckoutLog` is current, every connection checked out from
+an instrumented engine is recorded in it, and removed again when it is
+checked in, wherever that happens. Anything left when the scope closes is a
+session the request opened and did not close; each one is logged with its
+pool and the code that checked it out. Under load such sessions hold their
+connections until garbage collection and exhaust the pool.
+
+The GraphQL unit of work (gql/unit_of_work.py) opens a log per request::
+
+    log, token = connection_leaks.start("graphql")
+    ...
+    leaked = connection_leaks.finish(log, token)
+"""
+import sys
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["CheckoutLog"]] = ContextVar("connection_leaks", default=None)
+
+# Frames from these packages are skipped when looking for the code that checked out a connection
+_SKIPPED_MODULES = ("sqlalchemy.", "backend.connection_leaks", "backend.database", "contextlib", "asyncio.")
+
+
+class CheckoutLog:
+    """Connections checked out within one request and not yet returned"""
+
+    __slots__ = ("label", "open")
+
+    def __init__(self, label: str):
+        self.label = label
+        # connection record id -> (pool name, origin, checkout time)
+        self.open: Dict[int, Tuple[str, str, float]] = {}
+
+    def leaked(self) -> List[Dict[str, object]]:
+        now = time.monotonic()
+        return [
+            {"pool": pool, "origin": origin, "held_ms": round((now - since) * 1000, 3)}
+            for pool, origin, since in self.open.values()
+        ]
+
+
+def _origin() -> str:
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(_SKIPPED_MODULES):
+            return f"{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def start(label: str):
+    """Open a log; pass the token to finish"""
+    log = CheckoutLog(label)
+    return log, _current.set(log)
+
+
+def finish(log: CheckoutLog, token) -> List[Dict[str, object]]:
+    """Close ``log`` and warn about every connection still checked out"""
+    _current.reset(token)
+    leaked = log.leaked()
+    for leak in leaked:
+        logger.warning(
+            "%s did not return a %s connection checked out at %s (held %.1f ms)",
+            log.label, leak["pool"], leak["origin"], leak["held_ms"],
+        )
+    return leaked
+
+
+@contextmanager
+def track(label: str):
+    """Check the enclosed block for connections it does not return"""
+    log, token = start(label)
+    try:
+        yield log
+    finally:
+        finish(log, token)
+
+
+def instrument_engine(engine, name: str = "db") -> None:
+    """Record checkouts from ``engine`` in the current log"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        log = _current.get()
+        if log is not None:
+            log.open[id(connection_record)] = (name, _origin(), time.monotonic())
+            # Checkin may happen outside the request's context
+            connection_record.info["checkout_log"] = log
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        log = connection_record.info.pop("checkout_log", None)
+        if log is not None:
+            log.open.pop(id(connection_record), None)
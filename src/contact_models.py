@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -6,6 +6,8 @@ Base = declarative_base()
 
 class Contact(Base):
     __tablename__ = "contacts"
+    # Contact listings are ordered newest first, by (created_at, id) cursors
+    __table_args__ = (Index("ix_contacts_created_at_id", "created_at", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
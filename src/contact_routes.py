@@ -4,12 +4,11 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from backend.database import get_db, engine
-from backend.contact_models import Contact, Base
+from backend.database import get_db, get_read_db
+from backend.contact_models import Contact
 from pydantic import BaseModel, EmailStr, validator
 
-# Create database tables if they don't exist
-Base.metadata.create_all(bind=engine)
+# The contacts table is created by init_db() at startup
 
 router = APIRouter(
     prefix="/api/contacts",
@@ -113,14 +112,14 @@ async def show_contact_form():
     """
 
 @router.get("/", response_model=List[ContactResponse])
-def list_contacts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def list_contacts(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     """
     List all contact form submissions (for admin use)
     """
     return db.query(Contact).offset(skip).limit(limit).all()
 
 @router.get("/{contact_id}", response_model=ContactResponse)
-def get_contact(contact_id: int, db: Session = Depends(get_db)):
+def get_contact(contact_id: int, db: Session = Depends(get_read_db)):
     """
     Get a specific contact form submission by ID
     """
@@ -1,5 +1,8 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from . import models, schemas
+from .auth import invalidate_principal
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional, List
@@ -14,6 +17,14 @@ def get_user(db: Session, user_id: int):
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
+async def get_user_async(db: AsyncSession, user_id):
+    result = await db.execute(select(models.User).where(models.User.id == int(user_id)))
+    return result.scalars().first()
+
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
 def get_users(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.User).offset(skip).limit(limit).all()
 
@@ -45,6 +56,7 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
     
     db_user.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_principal(user_id)
     db.refresh(db_user)
     return db_user
 
@@ -53,6 +65,7 @@ def delete_user(db: Session, user_id: int):
     if db_user:
         db.delete(db_user)
         db.commit()
+        invalidate_principal(user_id)
         return True
     return False
 
@@ -0,0 +1,262 @@
+"""
+Static cost analysis and per-client cost budgets for GraphQL operations.
+
+Before an operation runs, its document is walked once to estimate how much
+work it asks for:
+
+- every field that returns an object costs 1 (one resolver, at most one
+  batched query), scalars are free;
+- a field taking ``first`` or ``limit`` multiplies its selection by the
+  page size; other lists multiply by GRAPHQL_UNBOUNDED_LIST_SIZE at the
+  root, where they read a whole table, and GRAPHQL_NESTED_LIST_SIZE below;
+- fields in PER_DAY_FIELDS return one entry per day of their
+  ``startDate``..``endDate`` span and cost that many days.
+
+Operations deeper than GRAPHQL_MAX_DEPTH or costlier than
+GRAPHQL_MAX_QUERY_COST are rejected without running. Everything else is
+charged to the client's GRAPHQL_COST_BUDGET, a GCRA budget in Redis shared
+with the REST rate limits (see rate_limiter.py) that replenishes
+continuously. Every HTTP request pays one unit up front (charge_request),
+so requests that never execute or cost nothing, such as parse errors,
+unknown persisted queries and introspection, still spend the budget. The
+cost and remaining budget are reported in the response's ``extensions.cost``.
+"""
+import logging
+from typing import Any, Dict, Optional
+
+from graphql import (
+    FieldNode, FragmentSpreadNode, GraphQLError, GraphQLList, GraphQLObjectType, InlineFragmentNode,
+    get_named_type, get_nullable_type, value_from_ast_untyped,
+)
+from graphql.execution import ExecutionResult as GraphQLExecutionResult
+from graphql.utilities import get_operation_ast
+from strawberry.extensions import SchemaExtension
+
+from backend.gql.pagination import GRAPHQL_DEFAULT_PAGE_SIZE
+from backend.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+GRAPHQL_MAX_DEPTH = settings.graphql_max_depth
+GRAPHQL_MAX_QUERY_COST = settings.graphql_max_query_cost
+GRAPHQL_UNBOUNDED_LIST_SIZE = settings.graphql_unbounded_list_size
+GRAPHQL_NESTED_LIST_SIZE = settings.graphql_nested_list_size
+GRAPHQL_COST_BUDGET = settings.graphql_cost_budget
+
+PAGE_SIZE_ARGUMENTS = ("first", "limit")
+
+# Resolvers that return one entry per day of their date range
+PER_DAY_FIELDS = {"getUserActivityStats"}
+
+
+class QueryCost:
+    __slots__ = ("cost", "depth")
+
+    def __init__(self, cost: int, depth: int):
+        self.cost = cost
+        self.depth = depth
+
+
+def _argument(field: FieldNode, definition, name: str, variables: Dict[str, Any]):
+    for argument in field.arguments or ():
+        if argument.name.value == name:
+            return value_from_ast_untyped(argument.value, variables)
+    default = definition.args[name].default_value if name in definition.args else None
+    # graphql-core marks "no default" with the Undefined sentinel
+    return default if isinstance(default, (int, str)) else None
+
+
+def _days(field: FieldNode, definition, variables: Dict[str, Any]) -> int:
+    from backend.gql.schema import parse_date_range
+
+    try:
+        start, end = parse_date_range(
+            _argument(field, definition, "startDate", variables),
+            _argument(field, definition, "endDate", variables),
+        )
+    except (TypeError, ValueError):
+        # The resolver reports the bad dates
+        return 1
+    return max(1, (end - start).days + 1)
+
+
+class _Walker:
+    def __init__(self, schema, document, variables: Optional[Dict[str, Any]]):
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if definition.kind == "fragment_definition"
+        }
+
+    def selection_cost(self, parent, selection_set, depth: int, page: Optional[int]) -> QueryCost:
+        """Cost of ``selection_set`` on ``parent``; ``page`` bounds its lists"""
+        total = QueryCost(0, depth)
+        if selection_set is None:
+            return total
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                cost = self.field_cost(parent, selection, depth + 1, page)
+            elif isinstance(selection, InlineFragmentNode):
+                on = self.schema.get_type(selection.type_condition.name.value) if selection.type_condition else parent
+                cost = self.selection_cost(on, selection.selection_set, depth, page)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments[selection.name.value]
+                on = self.schema.get_type(fragment.type_condition.name.value)
+                cost = self.selection_cost(on, fragment.selection_set, depth, page)
+            else:
+                continue
+            total.cost += cost.cost
+            total.depth = max(total.depth, cost.depth)
+        return total
+
+    def field_cost(self, parent, field: FieldNode, depth: int, page: Optional[int]) -> QueryCost:
+        name = field.name.value
+        definition = getattr(parent, "fields", {}).get(name)
+        if name.startswith("__") or definition is None:
+            # Introspection, and __typename on unions
+            return QueryCost(0, depth - 1)
+        named = get_named_type(definition.type)
+        if not isinstance(named, GraphQLObjectType):
+            return QueryCost(0, depth)
+
+        size = None
+        for argument in PAGE_SIZE_ARGUMENTS:
+            if argument in definition.args:
+                size = _argument(field, definition, argument, self.variables) or GRAPHQL_DEFAULT_PAGE_SIZE
+                break
+
+        if size is not None:
+            # A paginated field: the lists directly inside it are the page
+            children = self.selection_cost(named, field.selection_set, depth, size)
+            return QueryCost(1 + children.cost, children.depth)
+
+        children = self.selection_cost(named, field.selection_set, depth, None)
+        if isinstance(get_nullable_type(definition.type), GraphQLList):
+            if page is not None:
+                multiplier = page
+            elif parent is self.schema.query_type:
+                multiplier = GRAPHQL_UNBOUNDED_LIST_SIZE
+            else:
+                multiplier = GRAPHQL_NESTED_LIST_SIZE
+            return QueryCost(multiplier * (1 + children.cost), children.depth)
+        if name in PER_DAY_FIELDS:
+            return QueryCost(_days(field, definition, self.variables) + children.cost, children.depth)
+        return QueryCost(1 + children.cost, children.depth)
+
+
+def operation_cost(schema, document, operation_name: Optional[str] = None,
+                   variables: Optional[Dict[str, Any]] = None) -> QueryCost:
+    """
+    Estimate the cost and depth of one operation in a validated document.
+
+    Args:
+        schema: The graphql-core schema
+        document: The parsed document
+        operation_name: The operation to run, if the document has several
+        variables: The request's variables
+
+    Returns:
+        QueryCost with the operation's cost and its deepest field nesting
+    """
+    operation = get_operation_ast(document, operation_name)
+    if operation is None:
+        return QueryCost(0, 0)
+    root = schema.get_root_type(operation.operation)
+    return _Walker(schema, document, variables).selection_cost(root, operation.selection_set, 0, None)
+
+
+def _client_key(context: Dict[str, Any]) -> str:
+    user = context.get("current_user")
+    if user is not None:
+        return f"user:{user.id}"
+    client = context["request"].client
+    return f"ip:{client.host if client else 'unknown'}"
+
+
+def _budget_exceeded(budget) -> GraphQLError:
+    return GraphQLError(
+        "GraphQL cost budget exceeded. Please try again later.",
+        extensions={"code": "RATE_LIMITED", "retryAfter": round(budget.retry_after, 3)},
+    )
+
+
+async def charge_request(context: Dict[str, Any]) -> Optional[GraphQLError]:
+    """
+    Spend the one unit of the client's budget that every HTTP request costs.
+
+    Call it before the request is parsed; QueryCostExtension then charges the
+    operation's cost less this unit.
+
+    Returns:
+        The error to answer with if the budget is exhausted, else None
+    """
+    from backend.security import limiter
+
+    budget = await limiter.hit(f"graphql:{_client_key(context)}", GRAPHQL_COST_BUDGET)
+    context["cost_budget"] = budget
+    return None if budget.allowed else _budget_exceeded(budget)
+
+
+class QueryCostExtension(SchemaExtension):
+    """Reject operations over the static limits and charge the rest to the client's budget."""
+
+    cost: Optional[QueryCost] = None
+    budget = None
+
+    async def on_execute(self):
+        context = self.execution_context
+        error = None
+        try:
+            self.cost = operation_cost(
+                context.schema._schema, context.graphql_document, context.operation_name, context.variables
+            )
+        except Exception as e:
+            logger.exception("Could not estimate the cost of operation %s: %s", context.operation_name, e)
+
+        if self.cost is None:
+            pass
+        elif self.cost.depth > GRAPHQL_MAX_DEPTH:
+            error = GraphQLError(
+                f"Query depth {self.cost.depth} exceeds the maximum of {GRAPHQL_MAX_DEPTH}",
+                extensions={"code": "QUERY_TOO_DEEP"},
+            )
+        elif self.cost.cost > GRAPHQL_MAX_QUERY_COST:
+            error = GraphQLError(
+                f"Query cost {self.cost.cost} exceeds the maximum of {GRAPHQL_MAX_QUERY_COST}",
+                extensions={"code": "QUERY_TOO_COSTLY"},
+            )
+        elif isinstance(context.context, dict) and "request" in context.context:
+            # Budgets apply to HTTP clients; in-process callers have no identity
+            from backend.security import limiter
+
+            self.budget = context.context.get("cost_budget")
+            # The request has already paid one unit (see charge_request)
+            charge = self.cost.cost - 1 if self.budget is not None else self.cost.cost
+            if charge > 0:
+                self.budget = await limiter.hit(
+                    f"graphql:{_client_key(context.context)}", GRAPHQL_COST_BUDGET, cost=charge
+                )
+            if self.budget is not None and not self.budget.allowed:
+                error = _budget_exceeded(self.budget)
+
+        if error is not None:
+            logger.warning("Rejected GraphQL operation %s: %s", context.operation_name, error.message)
+            # Strawberry does not execute operations that already have a result
+            context.result = GraphQLExecutionResult(data=None, errors=[error])
+        yield
+
+    def get_results(self) -> Dict[str, Any]:
+        if self.cost is None:
+            return {}
+        cost = {"requested": self.cost.cost, "depth": self.cost.depth, "maximum": GRAPHQL_MAX_QUERY_COST}
+        if self.budget is not None:
+            cost["budget"] = {
+                "limit": self.budget.limit,
+                "remaining": self.budget.remaining,
+                "resetAt": int(self.budget.reset),
+            }
+        return {"cost": cost}
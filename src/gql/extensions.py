@@ -0,0 +1,73 @@
+"""Schema extensions shared by the GraphQL router."""
+from typing import List, Optional
+
+from graphql import DocumentNode, GraphQLError
+from strawberry.extensions import SchemaExtension
+
+from backend import sql_monitor
+from backend.cache import TTLCache
+from backend.gql.persisted_queries import query_hash
+from backend.settings import get_settings
+
+GRAPHQL_DOCUMENT_CACHE_SIZE = get_settings().graphql_document_cache_size
+
+
+class SQLMonitorExtension(SchemaExtension):
+    """Count the SQL statements of each operation in its own sql_monitor log."""
+
+    def on_operation(self):
+        log, token = sql_monitor.start("graphql")
+        try:
+            yield
+        finally:
+            # The name is known once the document has been parsed
+            log.label = f"graphql {self.execution_context.operation_name or 'anonymous'}"
+            sql_monitor.finish(log, token)
+
+
+class CachedDocument:
+    __slots__ = ("document", "errors")
+
+    def __init__(self, document: DocumentNode):
+        self.document = document
+        # Validation errors, once the document has been validated
+        self.errors: Optional[List[GraphQLError]] = None
+
+
+# Documents do not depend on anything but the query text and the schema,
+# which is fixed for the life of the process, so entries never expire
+document_cache = TTLCache(maxsize=GRAPHQL_DOCUMENT_CACHE_SIZE, ttl=float("inf"))
+
+
+class DocumentCacheExtension(SchemaExtension):
+    """
+    Skip parsing and validation for query texts seen before.
+
+    Entries are keyed by the query's SHA-256, the same hash persisted
+    queries use. Strawberry's ParserCache and ValidationCache are not used
+    because they are shared instances whose execution_context concurrent
+    requests overwrite.
+    """
+
+    def on_parse(self):
+        context = self.execution_context
+        self.key = query_hash(context.query) if context.query else None
+        self.entry = document_cache.get(self.key) if self.key else None
+        if self.entry is not None:
+            context.graphql_document = self.entry.document
+        yield
+        if self.entry is None and self.key and context.graphql_document is not None:
+            self.entry = CachedDocument(context.graphql_document)
+            document_cache.set(self.key, self.entry)
+
+    def on_validate(self):
+        context = self.execution_context
+        entry = getattr(self, "entry", None)
+        if entry is not None and entry.errors is not None and context.errors is None:
+            # Strawberry skips validation when errors are already set
+            context.errors = list(entry.errors)
+            yield
+            return
+        yield
+        if entry is not None and entry.errors is None:
+            entry.errors = list(context.errors or [])
@@ -0,0 +1,108 @@
+"""
+Per-request DataLoaders for the GraphQL relationship fields.
+
+Resolvers of related rows (an appointment's user, a message's sender,
+contact, appointment and recipients) go through ``info.context["loaders"]``
+instead of querying on their own. Keys requested while the sibling fields of
+a list resolve are collected into one batch and fetched with a single
+``IN (...)`` query, so a list of N items costs one statement per relationship
+rather than N. Results are cached by key for the rest of the request;
+``get_context`` builds a fresh :class:`Loaders` for every request.
+"""
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from strawberry.dataloader import DataLoader
+
+import backend.models as models
+from backend.contact_models import Contact as ContactModel
+
+# A message sender's (email, phone), used to find their contact submission
+# and appointment
+SenderKey = Tuple[Optional[str], Optional[str]]
+
+# Only the columns UserType exposes, so is_active and the auth fields are not loaded
+USER_COLUMNS = (
+    models.User.id,
+    models.User.email,
+    models.User.full_name,
+    models.User.phone,
+    models.User.role,
+    models.User.created_at,
+    models.User.updated_at,
+)
+
+
+def _latest_matching(rows: Sequence[Any], keys: List[SenderKey]) -> List[Optional[Any]]:
+    """For each key, the first of ``rows`` (newest first) with that email and phone"""
+    found = []
+    for email, phone in keys:
+        if not email and not phone:
+            found.append(None)
+            continue
+        found.append(next((
+            row for row in rows
+            if (not email or row.email == email) and (not phone or row.phone == phone)
+        ), None))
+    return found
+
+
+def _sender_filter(model, keys: List[SenderKey]):
+    emails = {email for email, _ in keys if email}
+    phones = {phone for _, phone in keys if phone}
+    clauses = []
+    if emails:
+        clauses.append(model.email.in_(emails))
+    if phones:
+        clauses.append(model.phone.in_(phones))
+    return or_(*clauses)
+
+
+class Loaders:
+    """The DataLoaders of one GraphQL request, all reading through ``db``"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        # user id -> row of USER_COLUMNS
+        self.users = DataLoader(self._load_users)
+        # message id -> list of MessageRecipient
+        self.recipients = DataLoader(self._load_recipients)
+        # SenderKey -> newest Contact / Appointment of that sender
+        self.contacts = DataLoader(self._load_contacts)
+        self.appointments = DataLoader(self._load_appointments)
+
+    async def _load_users(self, ids: List[int]) -> List[Optional[Any]]:
+        result = await self.db.execute(select(*USER_COLUMNS).where(models.User.id.in_(ids)))
+        by_id = {row.id: row for row in result}
+        return [by_id.get(user_id) for user_id in ids]
+
+    async def _load_recipients(self, message_ids: List[int]) -> List[List[Any]]:
+        result = await self.db.execute(
+            select(models.MessageRecipient)
+            .where(models.MessageRecipient.message_id.in_(message_ids))
+            .order_by(models.MessageRecipient.id)
+        )
+        by_message: Dict[int, List[Any]] = defaultdict(list)
+        for recipient in result.scalars():
+            by_message[recipient.message_id].append(recipient)
+        return [by_message[message_id] for message_id in message_ids]
+
+    async def _load_contacts(self, keys: List[SenderKey]) -> List[Optional[ContactModel]]:
+        if not any(email or phone for email, phone in keys):
+            return [None] * len(keys)
+        result = await self.db.execute(
+            select(ContactModel).where(_sender_filter(ContactModel, keys))
+            .order_by(ContactModel.created_at.desc())
+        )
+        return _latest_matching(result.scalars().all(), keys)
+
+    async def _load_appointments(self, keys: List[SenderKey]) -> List[Optional[Any]]:
+        if not any(email or phone for email, phone in keys):
+            return [None] * len(keys)
+        result = await self.db.execute(
+            select(models.Appointment).where(_sender_filter(models.Appointment, keys))
+            .order_by(models.Appointment.created_at.desc())
+        )
+        return _latest_matching(result.scalars().all(), keys)
@@ -0,0 +1,151 @@
+"""
+Keyset (cursor) pagination for the GraphQL list fields.
+
+Connections follow the Relay shape (``edges { cursor node }`` and
+``pageInfo``). A cursor is the opaque, base64 encoded sort key of its row,
+e.g. ``(appointment_date, id)``, and the next page is read with
+``WHERE (sort, id) < (:sort, :id) ORDER BY sort DESC, id DESC LIMIT n``.
+With an index on ``(sort, id)`` every page costs the same however deep it
+is, unlike ``OFFSET``, which reads and discards all the rows before it.
+
+Page sizes are bounded by GRAPHQL_MAX_PAGE_SIZE. ``estimatedTotal`` is only
+computed when it is selected: on Postgres an unfiltered listing uses the
+planner's row estimate instead of counting the table; anything else runs
+``COUNT(*)``.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Generic, List, Optional, Sequence, TypeVar
+
+import strawberry
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.settings import get_settings
+
+settings = get_settings()
+
+GRAPHQL_DEFAULT_PAGE_SIZE = settings.graphql_default_page_size
+GRAPHQL_MAX_PAGE_SIZE = settings.graphql_max_page_size
+
+T = TypeVar("T")
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool = strawberry.field(name="hasNextPage")
+    end_cursor: Optional[str] = strawberry.field(name="endCursor")
+
+
+@strawberry.type
+class Edge(Generic[T]):
+    node: T
+    cursor: str
+
+
+@strawberry.type
+class Connection(Generic[T]):
+    edges: List[Edge[T]]
+    page_info: PageInfo = strawberry.field(name="pageInfo")
+    _total: strawberry.Private[Callable[[], Awaitable[int]]]
+
+    @strawberry.field
+    def nodes(self) -> List[T]:
+        return [edge.node for edge in self.edges]
+
+    @strawberry.field(name="estimatedTotal")
+    async def estimated_total(self) -> int:
+        """Rows in the whole listing; approximate for large unfiltered tables"""
+        return await self._total()
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    key = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(key, list) or len(key) != size:
+            raise ValueError
+        return [datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value for value in key]
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+
+def page_size(first: Optional[int]) -> int:
+    if first is None:
+        return GRAPHQL_DEFAULT_PAGE_SIZE
+    if first < 1 or first > GRAPHQL_MAX_PAGE_SIZE:
+        raise ValueError(f"first must be between 1 and {GRAPHQL_MAX_PAGE_SIZE}")
+    return first
+
+
+async def estimate_rows(db: AsyncSession, table) -> Optional[int]:
+    """The planner's row estimate for ``table`` on Postgres, if it has one"""
+    if db.bind.dialect.name != "postgresql":
+        return None
+    estimate = (await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+        {"table": table.name},
+    )).scalar()
+    # -1 (or 0 on older servers) until the table has been vacuumed or analyzed
+    return estimate if estimate and estimate > 0 else None
+
+
+async def paginate(
+    db: AsyncSession,
+    query,
+    sort_key: Sequence[Any],
+    to_node: Callable[[Any], Any],
+    first: Optional[int] = None,
+    after: Optional[str] = None,
+) -> Connection:
+    """
+    One page of ``query``, newest first by ``sort_key``.
+
+    Args:
+        db: Session to read from
+        query: select() of a single entity, with any filters applied
+        sort_key: Columns that order the rows uniquely, ending with the primary key
+        to_node: Converts a row into the GraphQL node
+        first: Page size, at most GRAPHQL_MAX_PAGE_SIZE
+        after: endCursor of the previous page
+
+    Returns:
+        A Connection whose estimatedTotal counts the unpaginated query
+    """
+    limit = page_size(first)
+    page_query = query
+    if after:
+        page_query = page_query.where(tuple_(*sort_key) < tuple_(*decode_cursor(after, len(sort_key))))
+    page_query = page_query.order_by(*(column.desc() for column in sort_key)).limit(limit + 1)
+    rows = (await db.execute(page_query)).scalars().all()
+
+    edges = [
+        Edge(node=to_node(row), cursor=encode_cursor([getattr(row, column.key) for column in sort_key]))
+        for row in rows[:limit]
+    ]
+
+    async def total() -> int:
+        if query.whereclause is None:
+            estimate = await estimate_rows(db, sort_key[-1].table)
+            if estimate is not None:
+                return estimate
+        return (await db.execute(select(func.count()).select_from(query.subquery()))).scalar_one()
+
+    return Connection(
+        edges=edges,
+        page_info=PageInfo(has_next_page=len(rows) > limit, end_cursor=edges[-1].cursor if edges else None),
+        _total=total,
+    )
+
+
+def empty_connection() -> Connection:
+    async def total() -> int:
+        return 0
+
+    return Connection(edges=[], page_info=PageInfo(has_next_page=False, end_cursor=None), _total=total)
@@ -0,0 +1,148 @@
+"""
+Automatic persisted queries (APQ), in the protocol Apollo clients speak.
+
+A client sends ``extensions.persistedQuery.sha256Hash`` instead of the query
+text. If the server knows the hash it runs the stored document; otherwise it
+answers with a ``PersistedQueryNotFound`` error, and the client retries once
+with both the query and the hash, which registers the document. Hashed
+queries may also be sent as GET requests
+(``/graphql?extensions={...}&variables={...}``), which only run queries,
+never mutations.
+
+Documents are kept in Redis for GRAPHQL_PERSISTED_QUERY_TTL seconds, so
+every worker sees a registration, with a per-worker LRU in front. If Redis
+is unavailable, each worker falls back to its own copy. Registration is open
+to anonymous clients, so documents are capped at
+GRAPHQL_PERSISTED_QUERY_MAX_LENGTH characters and each client may register
+GRAPHQL_PERSISTED_QUERY_REGISTRATIONS new documents; past that limit the
+query still runs but is not stored.
+"""
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from graphql import GraphQLError
+
+from backend.cache import TTLCache
+from backend.redis_client import async_redis_client
+from backend.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+GRAPHQL_PERSISTED_QUERY_TTL = settings.graphql_persisted_query_ttl
+GRAPHQL_PERSISTED_QUERY_CACHE_SIZE = settings.graphql_persisted_query_cache_size
+GRAPHQL_PERSISTED_QUERY_MAX_LENGTH = settings.graphql_persisted_query_max_length
+GRAPHQL_PERSISTED_QUERY_REGISTRATIONS = settings.graphql_persisted_query_registrations
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+class PersistedQueryError(Exception):
+    """A persisted query request that cannot be run, reported as a GraphQL error"""
+
+    def __init__(self, message: str, code: str):
+        super().__init__(message)
+        self.code = code
+
+    def as_graphql_error(self) -> GraphQLError:
+        return GraphQLError(str(self), extensions={"code": self.code})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"message": str(self), "extensions": {"code": self.code}}
+
+
+class PersistedQueryStore:
+    def __init__(self, maxsize: int = GRAPHQL_PERSISTED_QUERY_CACHE_SIZE, ttl: int = GRAPHQL_PERSISTED_QUERY_TTL):
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.registered = 0
+        self.rejected = 0
+        self.not_found = 0
+
+    async def resolve(self, query: Optional[str], extensions: Optional[Dict[str, Any]],
+                      client: Optional[str] = None) -> Optional[str]:
+        """
+        The query text to run for a request.
+
+        Args:
+            query: The request's ``query``, if it sent one
+            extensions: The request's ``extensions`` object
+            client: Rate limit identity of the sender; registrations are
+                limited per client
+
+        Returns:
+            ``query``, or the stored document when only a hash was sent
+
+        Raises:
+            PersistedQueryError: Unknown hash, mismatched hash or bad version
+        """
+        persisted = (extensions or {}).get("persistedQuery") if isinstance(extensions, dict) else None
+        if not persisted:
+            return query
+        if not isinstance(persisted, dict) or persisted.get("version") != 1:
+            raise PersistedQueryError("Unsupported persisted query version", "PERSISTED_QUERY_NOT_SUPPORTED")
+        digest = persisted.get("sha256Hash")
+        if not isinstance(digest, str):
+            raise PersistedQueryError("Missing sha256Hash", "BAD_USER_INPUT")
+
+        if query:
+            if query_hash(query) != digest:
+                raise PersistedQueryError("provided sha does not match query", "BAD_USER_INPUT")
+            await self.register(digest, query, client)
+            return query
+
+        stored = await self.lookup(digest)
+        if stored is None:
+            self.not_found += 1
+            raise PersistedQueryError("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+        return stored
+
+    async def register(self, digest: str, query: str, client: Optional[str] = None) -> None:
+        if len(query) > GRAPHQL_PERSISTED_QUERY_MAX_LENGTH:
+            raise PersistedQueryError("Query is too long to persist", "BAD_USER_INPUT")
+        if digest in self.local:
+            return
+        if client is not None:
+            from backend.security import limiter
+
+            result = await limiter.hit(f"persisted_query:{client}", GRAPHQL_PERSISTED_QUERY_REGISTRATIONS)
+            if not result.allowed:
+                self.rejected += 1
+                logger.info("Not persisting query %s: %s registered too many", digest, client)
+                return
+        self.local.set(digest, query)
+        self.registered += 1
+        try:
+            await async_redis_client.set_persisted_query(digest, query, self.ttl)
+        except Exception as e:
+            logger.debug("Could not store persisted query %s in Redis: %s", digest, e)
+
+    async def lookup(self, digest: str) -> Optional[str]:
+        query = self.local.get(digest)
+        if query is not None:
+            return query
+        try:
+            query = await async_redis_client.get_persisted_query(digest)
+        except Exception as e:
+            logger.debug("Could not read persisted query %s from Redis: %s", digest, e)
+            return None
+        # Another worker's registration; keep the copy only if it is genuine
+        if query is not None and query_hash(query) == digest:
+            self.local.set(digest, query)
+            return query
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.local.stats(),
+            "registered": self.registered,
+            "rejected": self.rejected,
+            "not_found": self.not_found,
+        }
+
+
+persisted_queries = PersistedQueryStore()
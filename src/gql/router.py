@@ -2,9 +2,11 @@ from fastapi import Request, Depends, HTTPException, status, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import JSONResponse
 from strawberry.fastapi import GraphQLRouter
+from strawberry.http import GraphQLRequestData
+from strawberry.types import ExecutionResult
 import strawberry
-from typing import Any, Dict, Optional, List, Union, Callable, Awaitable
-from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Optional, List, Union, Callable, Awaitable
+from contextlib import asynccontextmanager, contextmanager
 import json
 from jose import JWTError, jwt
 import os
@@ -14,19 +16,34 @@ import logging
 logger = logging.getLogger(__name__)
 
 # Import database session
-from backend.database import get_db, SessionLocal
-from backend.auth import SECRET_KEY, ALGORITHM, verify_token
-from backend import models
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import get_db, get_async_db, SessionLocal, AsyncSessionLocal, replica_router
+from backend.auth import SECRET_KEY, ALGORITHM, verify_token, load_principal
+from backend.rate_limiter import client_identity
+from backend import connection_leaks, models
 
 # Import schema components
 try:
     from .schema import Query, Mutation
+    from .cost import QueryCostExtension, charge_request
+    from .extensions import DocumentCacheExtension, SQLMonitorExtension
+    from .loaders import Loaders
+    from .unit_of_work import RequestContext, UnitOfWork, UnitOfWorkExtension
+    from .persisted_queries import PersistedQueryError, persisted_queries
 except ImportError:
     # Fallback for direct execution
     from gql.schema import Query, Mutation
+    from gql.cost import QueryCostExtension, charge_request
+    from gql.extensions import DocumentCacheExtension, SQLMonitorExtension
+    from gql.loaders import Loaders
+    from gql.unit_of_work import RequestContext, UnitOfWork, UnitOfWorkExtension
+    from gql.persisted_queries import PersistedQueryError, persisted_queries
 
-# Create schema
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+# The one schema instance; everything that executes GraphQL imports it from here
+schema = strawberry.Schema(
+    query=Query, mutation=Mutation,
+    extensions=[SQLMonitorExtension, DocumentCacheExtension, QueryCostExtension, UnitOfWorkExtension],
+)
 
 # JWT Authentication
 security = HTTPBearer()
@@ -44,7 +61,7 @@ async def get_current_user_from_token(token: str, db: SessionLocal) -> models.Us
     """Get the current user from the JWT token."""
     try:
         # Use the existing verify_token function which includes all the security checks
-        payload = verify_token(token)
+        payload = await verify_token(token)
         if not payload or "sub" not in payload:
             logger.warning("Invalid token: No 'sub' in payload")
             raise HTTPException(
@@ -54,7 +71,8 @@ async def get_current_user_from_token(token: str, db: SessionLocal) -> models.Us
             )
             
         user_id = payload["sub"]
-        user = db.query(models.User).filter(models.User.id == user_id).first()
+        user = load_principal(db, user_id, token_exp=payload.get("exp"), active_only=False)
+        replica_router.identify(f"user:{user_id}")
         
         if not user:
             logger.warning(f"User not found for ID: {user_id}")
@@ -83,9 +101,29 @@ async def get_current_user_from_token(token: str, db: SessionLocal) -> models.Us
             detail="Internal server error during authentication",
         )
 
-async def get_context(request: Request) -> Dict[str, Any]:
-    """Create a context for each GraphQL request with authentication."""
-    db = next(get_db())
+async def get_context(request: Request, async_db: AsyncSession = Depends(get_async_db)) -> AsyncIterator[Dict[str, Any]]:
+    """Create a context for each GraphQL request with authentication.
+
+    Mutations and nested fields use ``async_db``, or ``db``, the sync session
+    kept for code that has not moved to the async engine. Top-level queries
+    await ``read_session(info.context)``, which the replica router points at
+    the read replica unless the user has just written. Relationship fields
+    batch their lookups through ``loaders`` (see gql/loaders.py). The sync
+    and read sessions open on first use, and every session is committed once
+    and closed by the request's unit of work (see gql/unit_of_work.py).
+    """
+    leaks, leaks_token = connection_leaks.start(f"graphql {request.method} {request.url.path}")
+    unit_of_work = UnitOfWork(async_db)
+    try:
+        context = await _build_context(request, unit_of_work)
+        context["loaders"] = Loaders(async_db)
+        yield context
+    finally:
+        await unit_of_work.close()
+        connection_leaks.finish(leaks, leaks_token)
+
+async def _build_context(request: Request, unit_of_work: UnitOfWork) -> RequestContext:
+    """Authenticate the request and collect the primary sessions."""
     current_user = None
     
     try:
@@ -96,7 +134,7 @@ async def get_context(request: Request) -> Dict[str, Any]:
             token = auth_header.split(" ")[1]
             if token:
                 try:
-                    current_user = await get_current_user_from_token(token, db)
+                    current_user = await get_current_user_from_token(token, unit_of_work.db)
                 except HTTPException as e:
                     if e.status_code == status.HTTP_401_UNAUTHORIZED:
                         logger.warning("Invalid/expired token provided")
@@ -105,23 +143,53 @@ async def get_context(request: Request) -> Dict[str, Any]:
                     else:
                         logger.error(f"Error getting current user: {str(e)}")
         
-        return {
-            "request": request,
-            "db": db,
-            "current_user": current_user
-        }
-        
     except Exception as e:
         logger.error(f"Error in get_context: {str(e)}")
-        # Return a basic context without user if there's an error
-        return {
-            "request": request,
-            "db": db,
-            "current_user": None
-        }
+        # Continue with a basic context without user if there's an error
+        current_user = None
+    
+    return RequestContext(
+        request=request,
+        async_db=unit_of_work.async_db,
+        current_user=current_user,
+        unit_of_work=unit_of_work,
+    )
+
+class PersistedQueryRouter(GraphQLRouter):
+    """GraphQLRouter that accepts automatic persisted queries (see gql/persisted_queries.py)"""
+
+    def should_render_graphiql(self, request) -> bool:
+        # A hash-only GET has no ``query`` param but is still an operation
+        return super().should_render_graphiql(request) and "extensions" not in request.query_params
+
+    async def parse_http_body(self, request) -> GraphQLRequestData:
+        request_data = await super().parse_http_body(request)
+        if request.method == "GET":
+            extensions = request.query_params.get("extensions")
+            extensions = self.parse_json(extensions) if extensions else None
+        elif "application/json" in (request.content_type or ""):
+            # The body is cached by Starlette, so this does not read it twice
+            extensions = self.parse_json(await request.get_body()).get("extensions")
+        else:
+            extensions = None
+        # ``request`` is Strawberry's adapter around the Starlette request
+        request_data.query = await persisted_queries.resolve(
+            request_data.query, extensions, client_identity(request.request)
+        )
+        return request_data
+
+    async def execute_operation(self, request, context, root_value) -> ExecutionResult:
+        # Charged before parsing, so requests that never execute are not free
+        rejected = await charge_request(context)
+        if rejected is not None:
+            return ExecutionResult(data=None, errors=[rejected])
+        try:
+            return await super().execute_operation(request, context, root_value)
+        except PersistedQueryError as e:
+            return ExecutionResult(data=None, errors=[e.as_graphql_error()])
 
 # Create GraphQL router
-router = GraphQLRouter(
+router = PersistedQueryRouter(
     schema,
     graphiql=True,
     context_getter=get_context
@@ -132,26 +200,38 @@ async def graphql_post(request: Request):
     """Handle GraphQL POST requests."""
     try:
         data = await request.json()
-        query = data.get("query")
         variables = data.get("variables", {})
         operation_name = data.get("operationName")
-        
-        if not query:
-            raise HTTPException(status_code=400, detail="No query provided")
             
-        result = await schema.execute(
-            query,
-            variable_values=variables,
-            operation_name=operation_name,
-            context_value=await get_context(request)
-        )
+        async with AsyncSessionLocal() as async_db:
+            async with asynccontextmanager(get_context)(request, async_db) as context:
+                rejected = await charge_request(context)
+                if rejected is not None:
+                    return {"data": None, "errors": [{"message": rejected.message, "extensions": rejected.extensions}]}
+                try:
+                    query = await persisted_queries.resolve(
+                        data.get("query"), data.get("extensions"), client_identity(request)
+                    )
+                except PersistedQueryError as e:
+                    return {"data": None, "errors": [e.as_dict()]}
+
+                if not query:
+                    raise HTTPException(status_code=400, detail="No query provided")
+
+                result = await schema.execute(
+                    query,
+                    variable_values=variables,
+                    operation_name=operation_name,
+                    context_value=context
+                )
         
         return {
             "data": result.data,
             "errors": [
                 {"message": str(error), "locations": getattr(error, "locations", None)}
                 for error in result.errors or []
-            ] if result.errors else None
+            ] if result.errors else None,
+            "extensions": result.extensions
         }
         
     except json.JSONDecodeError:
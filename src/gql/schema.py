@@ -1,14 +1,20 @@
 import enum
+import logging
 from enum import Enum
 import strawberry
 from typing import List, Optional, Type, TypeVar, Any, Dict, Union
 from datetime import datetime, timedelta, timezone
 from strawberry.types import Info
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, declarative_base, joinedload
-from backend.database import get_db
 import backend.models as models
 from backend.contact_models import Contact as ContactModel
 from backend.models.message_models import Message as MessageModel, MessageRecipient as MessageRecipientModel, MessageStatus, MessageType, MessageRecipientType
+from backend.gql.pagination import Connection, empty_connection, paginate
+from backend.gql.unit_of_work import read_session
+
+logger = logging.getLogger(__name__)
 
 # Helper functions
 def parse_date_range(start_date: str, end_date: str):
@@ -89,6 +95,20 @@ class UserType:
     created_at: datetime = strawberry.field(name="createdAt")
     updated_at: datetime = strawberry.field(name="updatedAt")
 
+def user_type(user) -> Optional[UserType]:
+    """UserType from a User, or a row of its columns"""
+    if user is None:
+        return None
+    return UserType(
+        id=user.id,
+        email=user.email,
+        full_name=user.full_name,
+        phone=user.phone,
+        role=user.role,
+        created_at=user.created_at,
+        updated_at=user.updated_at
+    )
+
 @strawberry.type
 class AppointmentType:
     def __init__(self, **kwargs):
@@ -132,29 +152,9 @@ class AppointmentType:
     
     @strawberry.field
     async def user(self, info: Info) -> Optional[UserType]:
-        db: Session = info.context["db"]
-        # Explicitly select only the fields we need to avoid loading is_active
-        user = db.query(
-            models.User.id,
-            models.User.email,
-            models.User.full_name,
-            models.User.phone,
-            models.User.role,
-            models.User.created_at,
-            models.User.updated_at
-        ).filter(models.User.id == self.user_id).first()
-        
-        if user:
-            return UserType(
-                id=user.id,
-                email=user.email,
-                full_name=user.full_name,
-                phone=user.phone,
-                role=user.role,
-                created_at=user.created_at,
-                updated_at=user.updated_at
-            )
-        return None
+        if self.user_id is None:
+            return None
+        return user_type(await info.context["loaders"].users.load(self.user_id))
 
 # Message Types
 @strawberry.enum
@@ -222,54 +222,18 @@ class MessageType:
     updated_at: datetime = strawberry.field(name="updatedAt")
     
     @strawberry.field
-    async def sender(self, info: Info) -> Optional['UserType']:
-        db = info.context["db"]
-        user = db.query(models.User).filter(models.User.id == self.sender_id).first()
-        if not user:
-            return None
-        return UserType(
-            id=user.id,
-            email=user.email,
-            full_name=user.full_name,
-            phone=user.phone,
-            role=user.role,
-            created_at=user.created_at,
-            updated_at=user.updated_at
-        )
+    async def sender(self, info: Info) -> 'UserType':
+        return user_type(await info.context["loaders"].users.load(self.sender_id))
     
     @strawberry.field
     async def contact(self, info: Info) -> Optional['ContactType']:
-        db = info.context["db"]
-        from ..contact_models import Contact as ContactModel
-        
-        if not hasattr(self, '_sender_email') and not hasattr(self, '_sender_phone'):
-            return None
-            
-        query = db.query(ContactModel)
-        if hasattr(self, '_sender_email') and self._sender_email:
-            query = query.filter(ContactModel.email == self._sender_email)
-        if hasattr(self, '_sender_phone') and self._sender_phone:
-            query = query.filter(ContactModel.phone == self._sender_phone)
-            
-        contact = query.order_by(ContactModel.created_at.desc()).first()
+        contact = await info.context["loaders"].contacts.load((self._sender_email, self._sender_phone))
         return ContactType.from_db(contact) if contact else None
     
     @strawberry.field
     async def appointment(self, info: Info) -> Optional['AppointmentType']:
         """Get related appointment information if this message is associated with an appointment."""
-        db = info.context["db"]
-        from ..models.appointment import Appointment as AppointmentModel
-        
-        if not hasattr(self, '_sender_email') and not hasattr(self, '_sender_phone'):
-            return None
-            
-        query = db.query(AppointmentModel)
-        if hasattr(self, '_sender_email') and self._sender_email:
-            query = query.filter(AppointmentModel.email == self._sender_email)
-        if hasattr(self, '_sender_phone') and self._sender_phone:
-            query = query.filter(AppointmentModel.phone == self._sender_phone)
-            
-        appointment = query.order_by(AppointmentModel.created_at.desc()).first()
+        appointment = await info.context["loaders"].appointments.load((self._sender_email, self._sender_phone))
         if not appointment:
             return None
             
@@ -291,17 +255,9 @@ class MessageType:
             updated_at=appointment.updated_at
         )
     
-    @strawberry.field
-    async def sender(self, info: Info) -> 'UserType':
-        db = info.context["db"]
-        return db.query(models.User).filter(models.User.id == self.sender_id).first()
-    
     @strawberry.field
     async def recipients(self, info: Info) -> List['MessageRecipientType']:
-        db = info.context["db"]
-        recipients = db.query(MessageRecipientModel).filter(
-            MessageRecipientModel.message_id == self.id
-        ).all()
+        recipients = await info.context["loaders"].recipients.load(self.id)
         return [MessageRecipientType.from_db(r) for r in recipients]
 
 @strawberry.type
@@ -432,27 +388,135 @@ class MessageInput:
     scheduled_at: Optional[datetime] = strawberry.field(name="scheduledAt", default=None)
 
 # Query type
+def appointment_from_db(appointment) -> AppointmentType:
+    return AppointmentType(
+        id=appointment.id,
+        user_id=appointment.user_id,
+        service=appointment.service,
+        appointment_date=appointment.appointment_date,
+        status=appointment.status,
+        notes=appointment.notes,
+        document_signed=appointment.document_signed or False,
+        envelope_id=appointment.envelope_id,
+        document_url=appointment.document_url,
+        first_name=appointment.first_name,
+        last_name=appointment.last_name,
+        email=appointment.email,
+        phone=appointment.phone,
+        created_at=appointment.created_at,
+        updated_at=appointment.updated_at or appointment.created_at
+    )
+
+def messages_query(current_user, type: Optional[str], message_type: Optional[str]):
+    """select() of the messages ``current_user`` may list, filtered like Query.messages"""
+    # Convert message_type to uppercase for consistent comparison
+    if message_type is not None:
+        message_type = message_type.upper()
+        
+        # Map common variations to standard values
+        message_type_mapping = {
+            'EMAIL': 'EMAIL',
+            'SMS': 'SMS',
+            'PUSH': 'PUSH',
+            'PUSH_NOTIFICATION': 'PUSH',
+            'IN_APP': 'IN_APP',
+            'INAPP': 'IN_APP',
+            'IN_APP_MESSAGE': 'IN_APP'
+        }
+        
+        # Use the mapped value if it exists, otherwise use the uppercase value
+        message_type = message_type_mapping.get(message_type, message_type)
+        
+        # Validate against allowed message types
+        valid_message_types = ['EMAIL', 'SMS', 'PUSH', 'IN_APP']
+        if message_type not in valid_message_types:
+            raise ValueError(f"Invalid message type: {message_type}. Must be one of: {', '.join(valid_message_types)}")
+    
+    # Start with base query
+    query = select(MessageModel)
+    
+    # Apply message type filter if provided
+    if message_type:
+        query = query.where(MessageModel.message_type == message_type.upper())
+    
+    # Apply filters based on message type (inbox, sent, all)
+    if type == 'inbox':
+        # Get messages where current user is a recipient
+        logger.debug("Fetching inbox messages for user %s", current_user.id)
+        query = query.join(
+            models.MessageRecipient,
+            models.MessageRecipient.message_id == MessageModel.id
+        ).where(
+            models.MessageRecipient.recipient_id == current_user.id
+        )
+    elif type == 'sent':
+        # Get messages sent by current user
+        logger.debug("Fetching sent messages for user %s", current_user.id)
+        query = query.where(MessageModel.sender_id == current_user.id)
+    else:  # 'all' or any other value
+        # Get all messages where user is either sender or recipient
+        logger.debug("Fetching all messages for user %s", current_user.id)
+        subquery = select(models.MessageRecipient.message_id).where(
+            models.MessageRecipient.recipient_id == current_user.id
+        )
+        
+        query = query.where(
+            (MessageModel.sender_id == current_user.id) |
+            (MessageModel.id.in_(subquery))
+        )
+    
+    return query
+
+def message_from_db(msg, sender) -> 'MessageType':
+    """MessageType from a Message row and its sender (a User or user row)"""
+    # Ensure message_type is a string and in the correct case
+    msg_type = msg.message_type
+    if hasattr(msg_type, 'value'):
+        msg_type = msg_type.value
+    msg_type = str(msg_type).upper()
+    
+    # Create message dict with all required fields
+    message_dict = {
+        'id': msg.id,
+        'sender_id': msg.sender_id,
+        'sender_email': sender.email if sender else None,
+        'sender_phone': sender.phone if sender else None,
+        'subject': msg.subject,
+        'content': msg.content,
+        'message_type': msg_type,
+        'status': msg.status.value if hasattr(msg.status, 'value') else str(msg.status),
+        'recipient_type': msg.recipient_type.value if hasattr(msg.recipient_type, 'value') else str(msg.recipient_type),
+        'recipient_id': msg.recipient_id,
+        'scheduled_at': msg.scheduled_at,
+        'sent_at': msg.sent_at,
+        'created_at': msg.created_at,
+        'updated_at': msg.updated_at
+    }
+    
+    return MessageType(**message_dict)
+
 @strawberry.type
 class Query:
     @strawberry.field
     async def appointment(self, info: Info, appointment_id: int) -> Optional[AppointmentType]:
-        db: Session = info.context["db"]
-        appointment = db.query(models.Appointment).get(appointment_id)
+        db: AsyncSession = await read_session(info.context)
+        appointment = await db.get(models.Appointment, appointment_id)
         if appointment:
             return AppointmentType(**appointment.__dict__)
         return None
         
-    @strawberry.field
+    @strawberry.field(deprecation_reason="Unbounded; use userAppointmentsConnection")
     async def userAppointments(self, info: Info, userId: int) -> List[AppointmentType]:
-        db: Session = info.context["db"]
-        print(f"[DEBUG] Fetching appointments for user ID: {userId}")
+        db: AsyncSession = await read_session(info.context)
+        logger.debug("Fetching appointments for user ID: %s", userId)
         
         # Get all appointments for the user
-        appointments = db.query(models.Appointment).filter(
+        result = await db.execute(select(models.Appointment).where(
             models.Appointment.user_id == userId
-        ).order_by(models.Appointment.appointment_date.desc()).all()
+        ).order_by(models.Appointment.appointment_date.desc()))
+        appointments = result.scalars().all()
         
-        print(f"[DEBUG] Found {len(appointments)} appointments for user {userId}")
+        logger.debug("Found %s appointments for user %s", len(appointments), userId)
         
         # Convert to GraphQL types using keyword arguments that match the model
         result = []
@@ -488,19 +552,18 @@ class Query:
                 result.append(appointment_type)
                 
             except Exception as e:
-                print(f"[ERROR] Error creating AppointmentType for appointment {appointment.id}: {str(e)}")
+                logger.error("Error creating AppointmentType for appointment %s: %s", appointment.id, e)
                 continue
         
-        print(f"[DEBUG] Successfully created {len(result)} appointment types")
+        logger.debug("Successfully created %s appointment types", len(result))
         return result
     
     @strawberry.field
     async def user(self, info: Info, user_id: int) -> Optional[UserType]:
-        db: Session = info.context["db"]
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        return user
+        db: AsyncSession = await read_session(info.context)
+        return await db.get(models.User, user_id)
         
-    @strawberry.field
+    @strawberry.field(deprecation_reason="OFFSET pagination; use messagesConnection")
     async def messages(
         self, 
         info: Info, 
@@ -509,130 +572,46 @@ class Query:
         page: int = 1,
         limit: int = 10
     ) -> MessagesResponse:
-        db = info.context["db"]
+        db: AsyncSession = await read_session(info.context)
         current_user = info.context.get("current_user")
         
         # Debug logging
-        print(f"[DEBUG] Fetching messages. Type: {type}, Message Type: {message_type}, User ID: {current_user.id if current_user else 'None'}")
+        logger.debug("Fetching messages. Type: %s, Message Type: %s, User ID: %s", type, message_type, current_user.id if current_user else 'None')
         
         # Require authentication
         if not current_user:
-            print("[WARNING] No authenticated user. Returning empty message list.")
+            logger.warning("No authenticated user. Returning empty message list.")
             return MessagesResponse(messages=[], total_count=0)
             
-        # Convert message_type to uppercase for consistent comparison
-        if message_type is not None:
-            message_type = message_type.upper()
-            
-            # Map common variations to standard values
-            message_type_mapping = {
-                'EMAIL': 'EMAIL',
-                'SMS': 'SMS',
-                'PUSH': 'PUSH',
-                'PUSH_NOTIFICATION': 'PUSH',
-                'IN_APP': 'IN_APP',
-                'INAPP': 'IN_APP',
-                'IN_APP_MESSAGE': 'IN_APP'
-            }
-            
-            # Use the mapped value if it exists, otherwise use the uppercase value
-            message_type = message_type_mapping.get(message_type, message_type)
-            
-            # Validate against allowed message types
-            valid_message_types = ['EMAIL', 'SMS', 'PUSH', 'IN_APP']
-            if message_type not in valid_message_types:
-                raise ValueError(f"Invalid message type: {message_type}. Must be one of: {', '.join(valid_message_types)}")
+        query = messages_query(current_user, type, message_type)
         
-        # Require authentication for all message queries
-        if not current_user:
-            print("[WARNING] No authenticated user. Returning empty message list.")
-            return MessagesResponse(messages=[], total_count=0)
-        
-        # Start with base query
-        query = db.query(MessageModel)
-        
-        # Apply message type filter if provided
-        if message_type:
-            query = query.filter(MessageModel.message_type == message_type.upper())
-        
-        # Apply filters based on message type (inbox, sent, all)
-        if type == 'inbox':
-            # Get messages where current user is a recipient
-            print(f"[DEBUG] Fetching inbox messages for user {current_user.id}")
-            query = query.join(
-                models.MessageRecipient,
-                models.MessageRecipient.message_id == MessageModel.id
-            ).filter(
-                models.MessageRecipient.recipient_id == current_user.id
-            )
-        elif type == 'sent':
-            # Get messages sent by current user
-            print(f"[DEBUG] Fetching sent messages for user {current_user.id}")
-            query = query.filter(MessageModel.sender_id == current_user.id)
-        else:  # 'all' or any other value
-            # Get all messages where user is either sender or recipient
-            print(f"[DEBUG] Fetching all messages for user {current_user.id}")
-            subquery = db.query(models.MessageRecipient.message_id).filter(
-                models.MessageRecipient.recipient_id == current_user.id
-            ).subquery()
-            
-            query = query.filter(
-                (MessageModel.sender_id == current_user.id) |
-                (MessageModel.id.in_(subquery))
-            )
+        # Get total count before pagination
+        total_count = (await db.execute(
+            select(func.count()).select_from(query.subquery())
+        )).scalar_one()
+        logger.debug("Found %s messages", total_count)
         
         # Order by creation date, newest first
         query = query.order_by(MessageModel.created_at.desc())
         
-        # Get total count before pagination
-        total_count = query.count()
-        print(f"[DEBUG] Found {total_count} messages")
-        
         # Apply pagination
         if page < 1:
             page = 1
         offset = (page - 1) * limit
-        messages = query.offset(offset).limit(limit).all()
+        messages = (await db.execute(query.offset(offset).limit(limit))).scalars().all()
+        
+        logger.debug("Retrieved %s messages after pagination", len(messages))
         
-        print(f"[DEBUG] Retrieved {len(messages)} messages after pagination")
+        # Load every sender in one query; the nested sender field reuses them
+        senders = await info.context["loaders"].users.load_many([msg.sender_id for msg in messages])
         
         # Convert to GraphQL types
         message_types = []
-        for msg in messages:
+        for msg, sender in zip(messages, senders):
             try:
-                # Get sender information
-                sender = db.query(models.User).filter(models.User.id == msg.sender_id).first()
-                
-                # Ensure message_type is a string and in the correct case
-                msg_type = msg.message_type
-                if hasattr(msg_type, 'value'):
-                    msg_type = msg_type.value
-                msg_type = str(msg_type).upper()
-                
-                # Create message dict with all required fields
-                message_dict = {
-                    'id': msg.id,
-                    'sender_id': msg.sender_id,
-                    'sender_email': sender.email if sender else None,
-                    'sender_phone': sender.phone if sender else None,
-                    'subject': msg.subject,
-                    'content': msg.content,
-                    'message_type': msg_type,
-                    'status': msg.status.value if hasattr(msg.status, 'value') else str(msg.status),
-                    'recipient_type': msg.recipient_type.value if hasattr(msg.recipient_type, 'value') else str(msg.recipient_type),
-                    'recipient_id': msg.recipient_id,
-                    'scheduled_at': msg.scheduled_at,
-                    'sent_at': msg.sent_at,
-                    'created_at': msg.created_at,
-                    'updated_at': msg.updated_at
-                }
-                
-                message_types.append(MessageType(**message_dict))
-                
+                message_types.append(message_from_db(msg, sender))
             except Exception as e:
-                import traceback
-                print(f"[ERROR] Error creating MessageType for message {msg.id if hasattr(msg, 'id') else 'unknown'}: {str(e)}")
-                print(traceback.format_exc())
+                logger.exception("Error creating MessageType for message %s: %s", getattr(msg, 'id', 'unknown'), e)
                 continue
         
         return MessagesResponse(
@@ -640,31 +619,32 @@ class Query:
             total_count=total_count
         )
         
-    @strawberry.field
+    @strawberry.field(deprecation_reason="Unbounded; use contactsConnection")
     async def contacts(self, info: Info) -> List[ContactType]:
         """
         Get all contact form submissions.
         Note: In a production environment, consider adding access control.
         """
-        db: Session = info.context["db"]
-        contacts = db.query(ContactModel).order_by(ContactModel.created_at.desc()).all()
-        return [ContactType.from_db(contact) for contact in contacts]
+        db: AsyncSession = await read_session(info.context)
+        result = await db.execute(select(ContactModel).order_by(ContactModel.created_at.desc()))
+        return [ContactType.from_db(contact) for contact in result.scalars()]
         
-    @strawberry.field
+    @strawberry.field(deprecation_reason="Unbounded; use appointmentsConnection")
     async def appointments(self, info: Info) -> List[AppointmentType]:
         """
         Get all appointments in the system.
         Note: In a production environment, consider adding pagination and access control.
         """
-        db: Session = info.context["db"]
-        print("[DEBUG] Fetching all appointments")
+        db: AsyncSession = await read_session(info.context)
+        logger.debug("Fetching all appointments")
         
         # Get all appointments ordered by date (newest first)
-        appointments = db.query(models.Appointment).order_by(
+        result = await db.execute(select(models.Appointment).order_by(
             models.Appointment.appointment_date.desc()
-        ).all()
+        ))
+        appointments = result.scalars().all()
         
-        print(f"[DEBUG] Found {len(appointments)} total appointments")
+        logger.debug("Found %s total appointments", len(appointments))
         
         # Convert to GraphQL types using the same pattern as userAppointments
         result = []
@@ -697,39 +677,29 @@ class Query:
                 result.append(appointment_type)
                 
             except Exception as e:
-                print(f"[ERROR] Error creating AppointmentType for appointment {appointment.id}: {str(e)}")
+                logger.error("Error creating AppointmentType for appointment %s: %s", appointment.id, e)
                 continue
         
-        print(f"[DEBUG] Successfully created {len(result)} appointment types")
+        logger.debug("Successfully created %s appointment types", len(result))
         return result
     
-    @strawberry.field
+    @strawberry.field(deprecation_reason="Unbounded; use appointmentsConnection")
     async def allAppointments(self, info: Info) -> List[AppointmentType]:
         """Get all appointments in the system. Requires admin access."""
-        db: Session = info.context["db"]
-        print("[DEBUG] Fetching all appointments...")
+        db: AsyncSession = await read_session(info.context)
+        logger.debug("Fetching all appointments...")
         
         try:
-            # First, check if the table exists
-            from sqlalchemy import inspect
-            inspector = inspect(db.get_bind())
-            if 'appointments' not in inspector.get_table_names():
-                print("[ERROR] 'appointments' table does not exist in the database")
-                return []
-                
-            # Count total appointments
-            total_appointments = db.query(models.Appointment).count()
-            print(f"[DEBUG] Found {total_appointments} appointments in the database")
-            
-            # Fetch all appointments with explicit column selection
-            from sqlalchemy import or_
-            appointments = db.query(
+            # A missing table raises here and is reported by the handler below,
+            # so there is no separate catalog lookup or COUNT(*) per request
+            result = await db.execute(select(
                 models.Appointment
             ).order_by(
                 models.Appointment.appointment_date.desc()
-            ).all()
+            ))
+            appointments = result.scalars().all()
             
-            print(f"[DEBUG] Retrieved {len(appointments)} appointments")
+            logger.debug("Retrieved %s appointments", len(appointments))
             
             # Convert to dictionary with explicit field mapping
             result = []
@@ -755,47 +725,98 @@ class Query:
                 
                 # Log first few appointments for debugging
                 if len(result) <= 3:
-                    print(f"[DEBUG] Processed appointment: ID={appointment.id}, "
-                          f"Date={appointment.appointment_date}, "
-                          f"Status={appointment.status}, "
-                          f"CreatedAt={appointment.created_at}")
+                    logger.debug(
+                        "Processed appointment: ID=%s, Date=%s, Status=%s, CreatedAt=%s",
+                        appointment.id, appointment.appointment_date, appointment.status, appointment.created_at
+                    )
             
             return result
             
         except Exception as e:
-            print(f"[ERROR] Error in allAppointments: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error in allAppointments: %s", e)
             return []
         
-    @strawberry.field
+    @strawberry.field(deprecation_reason="Unbounded; use contactsConnection")
     async def allContacts(self, info: Info) -> List[ContactType]:
         """Get all contact form submissions. Requires admin access."""
-        db: Session = info.context["db"]
+        db: AsyncSession = await read_session(info.context)
         # In production, add authentication check here
-        contacts = db.query(ContactModel).order_by(ContactModel.created_at.desc()).all()
-        return [ContactType.from_db(contact) for contact in contacts]
+        result = await db.execute(select(ContactModel).order_by(ContactModel.created_at.desc()))
+        return [ContactType.from_db(contact) for contact in result.scalars()]
         
-    @strawberry.field
+    @strawberry.field(deprecation_reason="Unbounded; use contactsConnection")
     async def all_contacts(self, info: Info) -> List[ContactType]:
         """Get all contact form submissions. Requires admin access."""
-        db: Session = info.context["db"]
-        contacts = db.query(ContactModel).all()
-        return [ContactType.from_db(contact) for contact in contacts]
+        db: AsyncSession = await read_session(info.context)
+        result = await db.execute(select(ContactModel))
+        return [ContactType.from_db(contact) for contact in result.scalars()]
         
         
     @strawberry.field
-    def get_appointment_stats(self, info: Info, start_date: str, end_date: str) -> AppointmentStats:
-        """Get appointment statistics for the given date range."""
-        from sqlalchemy import func, extract, and_
+    async def appointments_connection(
+        self, info: Info, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[AppointmentType]:
+        """All appointments, latest appointment date first."""
+        db: AsyncSession = await read_session(info.context)
+        return await paginate(
+            db, select(models.Appointment),
+            (models.Appointment.appointment_date, models.Appointment.id),
+            appointment_from_db, first, after,
+        )
+    
+    @strawberry.field
+    async def user_appointments_connection(
+        self, info: Info, user_id: int, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[AppointmentType]:
+        """A user's appointments, latest appointment date first."""
+        db: AsyncSession = await read_session(info.context)
+        return await paginate(
+            db, select(models.Appointment).where(models.Appointment.user_id == user_id),
+            (models.Appointment.appointment_date, models.Appointment.id),
+            appointment_from_db, first, after,
+        )
+    
+    @strawberry.field
+    async def contacts_connection(
+        self, info: Info, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[ContactType]:
+        """Contact form submissions, newest first."""
+        db: AsyncSession = await read_session(info.context)
+        return await paginate(
+            db, select(ContactModel), (ContactModel.created_at, ContactModel.id),
+            ContactType.from_db, first, after,
+        )
+    
+    @strawberry.field
+    async def messages_connection(
+        self,
+        info: Info,
+        type: Optional[str] = 'all',  # 'inbox', 'sent', or 'all'
+        message_type: Optional[str] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> Connection[MessageType]:
+        """The current user's messages, newest first, filtered like ``messages``."""
+        db: AsyncSession = await read_session(info.context)
+        current_user = info.context.get("current_user")
+        if not current_user:
+            logger.warning("No authenticated user. Returning empty message list.")
+            return empty_connection()
         
-        db: Session = info.context["db"]
-        start, end = parse_date_range(start_date, end_date)
+        connection = await paginate(
+            db, messages_query(current_user, type, message_type),
+            (MessageModel.created_at, MessageModel.id), lambda msg: msg, first, after,
+        )
+        senders = await info.context["loaders"].users.load_many([edge.node.sender_id for edge in connection.edges])
+        for edge, sender in zip(connection.edges, senders):
+            edge.node = message_from_db(edge.node, sender)
+        return connection
         
-        # Total appointments in date range
-        total_appointments = db.query(models.Appointment).filter(
-            models.Appointment.appointment_date.between(start, end)
-        ).count()
+    @strawberry.field
+    async def get_appointment_stats(self, info: Info, start_date: str, end_date: str) -> AppointmentStats:
+        """Get appointment statistics for the given date range."""
+        db: AsyncSession = await read_session(info.context)
+        start, end = parse_date_range(start_date, end_date)
         
         # Define default prices for services (adjust as needed)
         service_prices = {
@@ -805,50 +826,43 @@ class Query:
             'other': 0.0
         }
         
-        # Get all appointments in date range
-        appointments = db.query(
-            models.Appointment.status,
-            models.Appointment.service
-        ).filter(
-            models.Appointment.appointment_date.between(start, end)
-        ).all()
+        # Appointments in date range, counted per status and service
+        rows = (await db.execute(
+            select(models.Appointment.status, models.Appointment.service, func.count())
+            .where(models.Appointment.appointment_date.between(start, end))
+            .group_by(models.Appointment.status, models.Appointment.service)
+        )).all()
         
         # Calculate counts and revenue by status
+        total_appointments = 0
         status_data = {}
-        for status, service in appointments:
+        for status, service, count in rows:
             # Get price for service, default to 0.0 if not found
             price = service_prices.get(service.lower().replace(' ', '_'), service_prices['other'])
             
             if status not in status_data:
                 status_data[status] = {'count': 0, 'revenue': 0.0}
                 
-            status_data[status]['count'] += 1
-            status_data[status]['revenue'] += price
-        
-        # Convert to list of AppointmentStatusCount objects
-        by_status = [
-            (status, data['count'], data['revenue'])
-            for status, data in status_data.items()
-        ]
+            status_data[status]['count'] += count
+            status_data[status]['revenue'] += price * count
+            total_appointments += count
         
         return AppointmentStats(
             totalAppointments=total_appointments,
             byStatus=[
                 AppointmentStatusCount(
                     status=status, 
-                    count=count,
-                    revenue=float(revenue)  # Convert Decimal to float for Strawberry
+                    count=data['count'],
+                    revenue=float(data['revenue'])  # Convert Decimal to float for Strawberry
                 ) 
-                for status, count, revenue in by_status
+                for status, data in status_data.items()
             ]
         )
         
     @strawberry.field
-    def get_revenue_stats(self, info: Info, start_date: str, end_date: str) -> RevenueStats:
+    async def get_revenue_stats(self, info: Info, start_date: str, end_date: str) -> RevenueStats:
         """Get revenue statistics for the given date range."""
-        from sqlalchemy import func, extract, and_
-        
-        db: Session = info.context["db"]
+        db: AsyncSession = await read_session(info.context)
         start, end = parse_date_range(start_date, end_date)
         
         # Define default prices for services (same as in get_appointment_stats)
@@ -859,125 +873,103 @@ class Query:
             'other': 0.0
         }
         
-        # Get all appointments in date range with service and date
-        appointments = db.query(
-            models.Appointment.service,
-            models.Appointment.appointment_date
-        ).filter(
-            models.Appointment.appointment_date.between(start, end)
-        ).all()
+        # Appointments in date range, counted per service and day
+        day = func.date(models.Appointment.appointment_date)
+        rows = (await db.execute(
+            select(models.Appointment.service, day, func.count())
+            .where(models.Appointment.appointment_date.between(start, end))
+            .group_by(models.Appointment.service, day)
+        )).all()
         
         # Initialize data structures
         monthly_revenue_data = {}
         service_revenue = {}
         total_revenue = 0.0
         
-        # Process each appointment
-        for service, appt_date in appointments:
+        for service, appt_day, count in rows:
             # Get price for service, default to 0.0 if not found
-            price = service_prices.get(service.lower().replace(' ', '_'), service_prices['other'])
-            
-            # Update total revenue
-            total_revenue += price
+            revenue = count * service_prices.get(service.lower().replace(' ', '_'), service_prices['other'])
+            total_revenue += revenue
             
-            # Update monthly revenue
-            month_key = f"{appt_date.year}-{appt_date.month:02d}"
+            # DATE() is a date on PostgreSQL and a 'YYYY-MM-DD' string on SQLite
+            month_key = str(appt_day)[:7]
             if month_key not in monthly_revenue_data:
                 monthly_revenue_data[month_key] = {'revenue': 0.0, 'count': 0}
-            monthly_revenue_data[month_key]['revenue'] += price
-            monthly_revenue_data[month_key]['count'] += 1
+            monthly_revenue_data[month_key]['revenue'] += revenue
+            monthly_revenue_data[month_key]['count'] += count
             
-            # Update service revenue
             if service not in service_revenue:
                 service_revenue[service] = {'revenue': 0.0, 'count': 0}
-            service_revenue[service]['revenue'] += price
-            service_revenue[service]['count'] += 1
-        
-        # Format monthly revenue data as a list of dictionaries
-        monthly_revenue_list = [
-            {
-                'month': month,
-                'revenue': data['revenue'],
-                'count': data['count']
-            }
-            for month, data in monthly_revenue_data.items()
-        ]
-        
-        # Format service revenue data as a list of dictionaries
-        by_service_list = [
-            {
-                'service': service,
-                'revenue': data['revenue'],
-                'count': data['count']
-            }
-            for service, data in service_revenue.items()
-        ]
+            service_revenue[service]['revenue'] += revenue
+            service_revenue[service]['count'] += count
         
         return RevenueStats(
             totalRevenue=total_revenue,
             monthlyRevenue=[
                 MonthlyRevenue(
-                    month=item['month'],
-                    revenue=float(item['revenue']),
-                    count=item['count']
-                ) for item in monthly_revenue_list
+                    month=month,
+                    revenue=float(data['revenue']),
+                    count=data['count']
+                ) for month, data in sorted(monthly_revenue_data.items())
             ],
             byService=[
                 ServiceRevenue(
-                    service=item['service'],
-                    revenue=float(item['revenue']),
-                    count=item['count']
-                ) for item in by_service_list
+                    service=service,
+                    revenue=float(data['revenue']),
+                    count=data['count']
+                ) for service, data in service_revenue.items()
             ]
         )
         
     @strawberry.field
-    def get_user_activity_stats(self, info: Info, start_date: str, end_date: str) -> UserActivityStats:
+    async def get_user_activity_stats(self, info: Info, start_date: str, end_date: str) -> UserActivityStats:
         """Get user activity statistics for the given date range."""
-        from datetime import timedelta
-        from sqlalchemy import func, extract, and_
-        
-        db: Session = info.context["db"]
+        db: AsyncSession = await read_session(info.context)
         start, end = parse_date_range(start_date, end_date)
         
         # Active users (users with at least one login in the period)
         # Note: You'll need to implement user login tracking for this
         active_users = 0
         
-        # User activity over time
+        # Appointments per day, in one query for the whole range
+        day = func.date(models.Appointment.appointment_date)
+        end_of_range = end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        rows = (await db.execute(
+            select(day, func.count())
+            .where(
+                models.Appointment.appointment_date >= start,
+                models.Appointment.appointment_date < end_of_range,
+            )
+            .group_by(day)
+        )).all()
+        # DATE() is a date on PostgreSQL and a 'YYYY-MM-DD' string on SQLite
+        appointments_per_day = {str(appt_day)[:10]: count for appt_day, count in rows}
+        
+        # User activity over time, one entry per day including empty ones
         activity = []
         current_date = start
         while current_date <= end:
-            next_date = current_date + timedelta(days=1)
-            # Count logins and appointments for each day
+            date_key = current_date.strftime('%Y-%m-%d')
             # You'll need to implement login tracking for accurate login counts
-            login_count = 0
-            appointment_count = db.query(func.count(models.Appointment.id)).filter(
-                and_(
-                    models.Appointment.appointment_date >= current_date,
-                    models.Appointment.appointment_date < next_date
-                )
-            ).scalar()
-            
             activity.append(DailyActivity(
-                date=current_date.strftime('%Y-%m-%d'),
-                logins=login_count,
-                appointments=appointment_count
+                date=date_key,
+                logins=0,
+                appointments=appointments_per_day.get(date_key, 0)
             ))
-            
-            current_date = next_date
+            current_date += timedelta(days=1)
         
         return UserActivityStats(
             activeUsers=active_users,
             activity=activity
         )
 
-# Mutation type
+# Mutation type. Mutations flush their changes; the request's unit of work
+# commits them once the operation has run (see gql/unit_of_work.py)
 @strawberry.type
 class Mutation:
     @strawberry.mutation(name="createContact")
     def create_contact(self, info: Info, input: ContactInput) -> ContactType:
-        db = next(get_db())
+        db = info.context["db"]
         try:
             contact = ContactModel(
                 name=input.name,
@@ -989,15 +981,12 @@ class Mutation:
                 created_at=datetime.utcnow()
             )
             db.add(contact)
-            db.commit()
+            db.flush()
             db.refresh(contact)
             return ContactType.from_db(contact)
         except Exception as e:
-            db.rollback()
-            print(f"[ERROR] Error creating contact: {str(e)}")
+            logger.error("Error creating contact: %s", e)
             raise Exception(f"Failed to create contact: {str(e)}")
-        finally:
-            db.close()
             
     @strawberry.mutation(name="updateContactStatus")
     def update_contact_status(self, info: Info, contact_id: int, status: str) -> ContactType:
@@ -1022,16 +1011,13 @@ class Mutation:
                 
             # Update status (always store in lowercase)
             contact.status = status_lower
-            db.commit()
+            db.flush()
             db.refresh(contact)
             return ContactType.from_db(contact)
             
         except Exception as e:
-            db.rollback()
-            print(f"[ERROR] Error updating contact status: {str(e)}")
+            logger.error("Error updating contact status: %s", e)
             raise Exception(f"Failed to update contact status: {str(e)}")
-        finally:
-            db.close()
             
     @strawberry.mutation
     async def create_appointment(self, info: Info, input: CreateAppointmentInput) -> AppointmentType:
@@ -1043,7 +1029,7 @@ class Mutation:
         db: Session = info.context["db"]
         
         # Debug log the input data
-        print(f"[DEBUG] Creating appointment with data: {input}")
+        logger.debug("Creating appointment with data: %s", input)
         
         from sqlalchemy import text
         
@@ -1069,7 +1055,6 @@ class Mutation:
                     "role": models.Role.CLIENT.value.upper()  # Convert to uppercase for database
                 }
             )
-            db.commit()
             
             # Get the new user's ID
             result = db.execute(
@@ -1150,12 +1135,12 @@ class Mutation:
         
         try:
             db.add(db_appointment)
-            db.commit()
+            db.flush()
             db.refresh(db_appointment)
             
             # Debug log the created appointment
-            print(f"[DEBUG] Created appointment object: {db_appointment}")
-            print(f"[DEBUG] Created at: {db_appointment.created_at}, Updated at: {db_appointment.updated_at}")
+            logger.debug("Created appointment object: %s", db_appointment)
+            logger.debug("Created at: %s, Updated at: %s", db_appointment.created_at, db_appointment.updated_at)
             
             # Convert SQLAlchemy model to a dictionary and create AppointmentType
             appointment_dict = {
@@ -1177,10 +1162,7 @@ class Mutation:
             }
             return AppointmentType(**appointment_dict)
         except Exception as e:
-            db.rollback()
             raise Exception(f"Failed to create contact: {str(e)}")
-        finally:
-            db.close()
 
     @strawberry.mutation
     async def create_user(self, info: Info, input: UserInput) -> UserType:
@@ -1200,7 +1182,7 @@ class Mutation:
         )
         
         db.add(db_user)
-        db.commit()
+        db.flush()
         db.refresh(db_user)
         
         return db_user
@@ -1250,7 +1232,7 @@ class Mutation:
             
         appointment.updated_at = datetime.utcnow()
         
-        db.commit()
+        db.flush()
         db.refresh(appointment)
         
         # Convert to dictionary for AppointmentType
@@ -1282,28 +1264,28 @@ class Mutation:
             # Import text from sqlalchemy
             from sqlalchemy import text
             
-            # Try to get and delete the appointment using text()
-            result = db.execute(
-                text("""
-                    DELETE FROM appointments 
-                    WHERE id = :id
-                    RETURNING id
-                """),
-                {'id': input.id}
-            )
+            # A savepoint, so a failed delete does not roll back the changes
+            # earlier mutations of the operation flushed to the same session
+            with db.begin_nested():
+                # Try to get and delete the appointment using text()
+                deleted = db.execute(
+                    text("""
+                        DELETE FROM appointments 
+                        WHERE id = :id
+                        RETURNING id
+                    """),
+                    {'id': input.id}
+                ).fetchone()
             
-            deleted = result.fetchone()
             if not deleted:
                 # If no rows were deleted, the appointment didn't exist
-                print(f"Warning: Tried to delete non-existent appointment with ID {input.id}")
+                logger.warning("Tried to delete non-existent appointment with ID %s", input.id)
                 return False
                 
-            db.commit()
             return True
             
         except Exception as e:
-            db.rollback()
-            print(f"Error deleting appointment {input.id}: {str(e)}")
+            logger.error("Error deleting appointment %s: %s", input.id, e)
             return False
         
     @strawberry.mutation
@@ -1339,12 +1321,11 @@ class Mutation:
         appointment.updated_at = datetime.utcnow()
         
         try:
-            db.commit()
+            db.flush()
             db.refresh(appointment)
             return appointment
         except Exception as e:
-            db.rollback()
-            print(f"Error updating appointment status: {str(e)}")
+            logger.error("Error updating appointment status: %s", e)
             raise Exception("Failed to update appointment status")
     
     @strawberry.mutation
@@ -1375,7 +1356,7 @@ class Mutation:
         )
         
         db.add(message)
-        db.commit()
+        db.flush()
         db.refresh(message)
         
         # Get recipients based on recipient type
@@ -1423,7 +1404,7 @@ class Mutation:
                 MessageRecipientModel.message_id == message.id
             ).update({"status": MessageStatus.SENT})
         
-        db.commit()
+        db.flush()
         db.refresh(message)
         
         # TODO: Add actual message sending logic (email, SMS, etc.)
@@ -1520,8 +1501,5 @@ class Mutation:
         
         return AppointmentType(**appointment_dict)
 
-# Export the query and mutation types
+# Export the query and mutation types; the schema is built in gql/router.py
 __all__ = ['Query', 'Mutation']
-
-# Create schema - this will be recreated in main.py
-schema = strawberry.Schema(query=Query, mutation=Mutation)
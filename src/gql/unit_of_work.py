@@ -0,0 +1,137 @@
+"""
+The database sessions of one GraphQL request.
+
+Resolvers keep taking their sessions from the context (``db``, ``async_db``),
+but the sync session is only opened when a resolver first asks for one, so
+operations served by the async engine never check out a sync connection.
+Read-only resolvers await ``read_session(info.context)``, which picks the
+replica or the primary on first use, so mutations and requests rejected
+before execution never touch the replica. Mutations flush their changes;
+once the operation has run, UnitOfWorkExtension commits them in one
+transaction, or rolls everything back if the operation reported errors. The
+context getter then closes every session, whatever happened, and
+connection_leaks logs any connection the request checked out and did not
+return.
+"""
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from graphql import GraphQLError
+from graphql.execution import ExecutionResult as GraphQLExecutionResult
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from strawberry.extensions import SchemaExtension
+
+from backend.database import SessionLocal, replica_router
+
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWork:
+    """Opens, commits and closes the sessions of one request"""
+
+    def __init__(self, async_db: AsyncSession, session_factory: Optional[Callable[[], Session]] = None):
+        self.async_db = async_db
+        # Not the thread-local SessionLocal: concurrent requests share the event loop thread
+        self.session_factory = session_factory or SessionLocal.session_factory
+        self.finished = False
+        self._db: Optional[Session] = None
+        self._async_read_db: Optional[AsyncSession] = None
+        # Resolvers run concurrently; only the first one may pick the session
+        self._read_lock = asyncio.Lock()
+
+    @property
+    def db(self) -> Session:
+        if self._db is None:
+            self._db = self.session_factory()
+        return self._db
+
+    async def read_session(self) -> AsyncSession:
+        """The session for reads: the replica unless the request must read its own writes"""
+        async with self._read_lock:
+            if self._async_read_db is None:
+                self._async_read_db = await replica_router.async_read_session(self.async_db)
+        return self._async_read_db
+
+    async def finish(self, failed: bool) -> None:
+        """
+        Commit the request's changes, or roll them all back.
+
+        Args:
+            failed: Roll back instead, e.g. because the operation had errors
+
+        Raises:
+            Exception: The commit failed; everything has been rolled back
+        """
+        if self.finished:
+            return
+        self.finished = True
+        try:
+            if failed:
+                if self._db is not None:
+                    self._db.rollback()
+                await self.async_db.rollback()
+            else:
+                if self._db is not None and self._db.in_transaction():
+                    self._db.commit()
+                if self.async_db.in_transaction():
+                    await self.async_db.commit()
+        except Exception:
+            await self.close()
+            raise
+
+    async def close(self) -> None:
+        """Return every connection; anything not committed is rolled back"""
+        if self._db is not None:
+            self._db.close()
+        if self._async_read_db is not None and self._async_read_db is not self.async_db:
+            await self._async_read_db.close()
+        await self.async_db.close()
+
+
+class RequestContext(dict):
+    """
+    GraphQL context dict whose ``db`` opens on first access.
+
+    Resolvers must index it (``info.context["db"]``); ``get`` does not open
+    sessions.
+    """
+
+    def __missing__(self, key):
+        if key == "db":
+            return self["unit_of_work"].db
+        raise KeyError(key)
+
+
+async def read_session(context) -> AsyncSession:
+    """
+    The async session read-only resolvers use.
+
+    Contexts built without a unit of work (tests, scripts) pass their read
+    session as ``async_read_db``.
+    """
+    unit_of_work = context.get("unit_of_work")
+    if unit_of_work is None:
+        return context["async_read_db"]
+    return await unit_of_work.read_session()
+
+
+class UnitOfWorkExtension(SchemaExtension):
+    """Commit or roll back the request's unit of work once the operation has run."""
+
+    async def on_execute(self):
+        yield
+        context = self.execution_context
+        unit_of_work = context.context.get("unit_of_work") if isinstance(context.context, dict) else None
+        if unit_of_work is None:
+            return
+        try:
+            # A result set before execution (see gql/cost.py) carries its errors there
+            failed = bool(context.errors or (context.result is not None and context.result.errors))
+            await unit_of_work.finish(failed=failed)
+        except Exception as e:
+            logger.exception("Could not commit GraphQL operation %s: %s", context.operation_name, e)
+            context.result = GraphQLExecutionResult(
+                data=None, errors=[GraphQLError("Could not save changes. Please try again.")]
+            )
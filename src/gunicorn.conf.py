@@ -0,0 +1,63 @@
+"""
+Gunicorn configuration for the API: ``gunicorn -c gunicorn.conf.py main:app``.
+
+The app is imported once in the master (``preload_app``) together with the
+SDKs it otherwise loads on first use, and everything is moved into the
+permanent GC generation with ``gc.freeze()`` before the workers fork. The
+workers then share those pages copy-on-write instead of each holding its
+own copy of FastAPI, Strawberry, SQLAlchemy, DocuSign and reportlab.
+
+Nothing opens a socket at import: each worker replaces the database pools
+after the fork (database.dispose_after_fork), redis-py pools reset
+themselves when they see a new pid, and the lifespan (init_db, Redis ping,
+blacklist sync) runs in every worker.
+
+Environment:
+    PORT                      port to bind (default 8000)
+    WEB_CONCURRENCY           number of workers (default 1)
+    GUNICORN_PRELOAD          "false" imports the app in each worker instead
+    GUNICORN_PRELOAD_MODULES  lazily imported modules to load in the master
+"""
+import gc
+import importlib
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() != "false"
+timeout = 120
+keepalive = 5
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+accesslog = "-"
+errorlog = "-"
+
+PRELOAD_MODULES = [
+    name.strip() for name in os.getenv(
+        "GUNICORN_PRELOAD_MODULES",
+        "docusign_esign,reportlab.pdfgen.canvas,reportlab.platypus,reportlab.lib.pagesizes",
+    ).split(",") if name.strip()
+]
+
+# A collection in the master writes to every object it visits, which would
+# un-share the preloaded pages; the workers turn it back on after the fork
+gc.disable()
+
+
+def when_ready(server):
+    if not preload_app:
+        gc.enable()
+        return
+    for name in PRELOAD_MODULES:
+        try:
+            module = importlib.import_module(name)
+            # Touching an attribute runs modules main.py registered as lazy
+            getattr(module, "__file__", None)
+        except ImportError as e:
+            server.log.warning("Could not preload %s: %s", name, e)
+    gc.freeze()
+    server.log.info("Froze %d objects in the master before forking workers", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    gc.enable()
@@ -1,27 +1,247 @@
-import logging
+"""
+Application logging.
+
+Records are handed to a queue by a ``QueueHandler`` and written by a
+``QueueListener`` thread, so request handlers never wait on stdout or disk.
+Output is one JSON object per line (``LOG_FORMAT=text`` for a human readable
+format during development).
+
+Environment:
+    LOG_LEVEL            root level (default INFO)
+    LOG_LEVELS           per-logger levels, e.g.
+                         "sqlalchemy.engine=WARNING,backend.routers.auth=DEBUG"
+    LOG_FORMAT           "json" (default) or "text"
+    LOG_FILE             optional file to write to in addition to stdout
+    LOG_SAMPLE_RATE      records per second allowed from a single call site
+                         at or below LOG_SAMPLE_LEVEL (default 10, 0 disables)
+    LOG_SAMPLE_BURST     burst size for the above (default 20)
+    LOG_SAMPLE_LEVEL     highest level that is sampled (default DEBUG)
+
+Use %-style arguments (``logger.debug("user %s", user_id)``) rather than
+f-strings on hot paths: the message is then only built if the record is
+actually emitted, and for plain arguments it is built on the listener
+thread. Wrap large structures in :class:`LazyJSON` to serialise them only
+when the record is written.
+"""
+import os
 import sys
-from pathlib import Path
-
-# Create logs directory if it doesn't exist
-log_dir = Path("logs")
-log_dir.mkdir(exist_ok=True)
-
-# Configure root logger
-logging.basicConfig(
-    level=logging.DEBUG,  # Set to DEBUG to capture all logs
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),  # Log to console
-        logging.FileHandler('logs/app.log')  # Log to file
-    ]
-)
-
-# Set log levels for specific loggers
-logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)  # Reduce SQLAlchemy log verbosity
-logging.getLogger('passlib').setLevel(logging.WARNING)  # Reduce passlib log verbosity
-
-# Get logger for this module
-logger = logging.getLogger(__name__)
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
+from typing import Dict, Optional
+
+from backend.settings import get_settings
+
+# Loggers that are too chatty at the root level
+DEFAULT_LEVELS = {
+    "sqlalchemy.engine": "WARNING",
+    "passlib": "WARNING",
+}
+
+# Argument types that are safe to format later on the listener thread
+_IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_lock = threading.Lock()
+
+
+class LazyJSON:
+    """Serialises ``value`` to JSON only when the log message is rendered.
+
+    The value is read on the listener thread, so it must not be mutated
+    after it is logged.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        try:
+            return json.dumps(self.value, default=str, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return repr(self.value)
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, including ``extra`` fields"""
+
+    converter = time.gmtime
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class SamplingFilter(logging.Filter):
+    """Rate limits records per call site with a token bucket.
+
+    Only records at or below ``max_level`` are sampled. When a call site
+    is allowed to log again, its record carries ``sampled_out`` with the
+    number of records that were dropped in between.
+    """
+
+    def __init__(self, rate: float, burst: int, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_level = max_level
+        self._buckets: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or self.rate <= 0:
+            return True
+        site = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(site)
+            if bucket is None:
+                # tokens, last refill, records dropped since the last one emitted
+                bucket = self._buckets[site] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            dropped, bucket[2] = bucket[2], 0
+        if dropped:
+            record.sampled_out = dropped
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that defers message formatting to the listener thread.
+
+    The stock handler formats every record in the calling thread. Here the
+    record is only rendered eagerly when its arguments are mutable (they
+    could change before the listener runs) or it carries a traceback.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        args = record.args
+        deferrable = not args or (
+            isinstance(args, tuple)
+            and all(isinstance(arg, _IMMUTABLE_ARGS + (LazyJSON,)) for arg in args)
+        )
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if not deferrable:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def parse_levels(value: str) -> Dict[str, str]:
+    """Parse "name=LEVEL,other=LEVEL" into a dict"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, level = item.partition("=")
+        if not level:
+            raise ValueError(f"Invalid LOG_LEVELS entry: {item!r}")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """Configure the root logger once per process; later calls are no-ops"""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return
+
+        settings = get_settings()
+        if settings.log_format.lower() == "text":
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        else:
+            formatter = JSONFormatter()
+
+        handlers = [logging.StreamHandler(sys.stdout)]
+        log_file = settings.log_file
+        if log_file:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = LazyQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(
+            rate=settings.log_sample_rate,
+            burst=settings.log_sample_burst,
+            max_level=logging.getLevelName(settings.log_sample_level.upper()),
+        ))
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(settings.log_level.upper())
+
+        levels = dict(DEFAULT_LEVELS)
+        levels.update(parse_levels(settings.log_levels))
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level)
+
+        _queue_handler = queue_handler
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def _restart_after_fork() -> None:
+    # A worker forked from a preloading master inherits the listener but not
+    # its thread. Start one on a fresh queue; records still queued in the
+    # master are the master's to write.
+    global _lock
+    _lock = threading.Lock()
+    if _listener is None:
+        return
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener.queue = log_queue
+    _listener._thread = None
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
 
 def get_logger(name):
     """Get a logger with the specified name."""
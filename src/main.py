@@ -3,26 +3,27 @@ import sys
 import json
 import logging
 import base64
-import requests
 import datetime
+import importlib.util
 from typing import Any, Dict, List, Optional, Union, Callable, Awaitable
 from contextlib import asynccontextmanager
+from functools import lru_cache
 
 # Add the project root to the Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
 # Load environment variables first
-from dotenv import load_dotenv
-load_dotenv()
+from backend.settings import get_settings
+settings = get_settings()
 
 # Configure logging
-logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
+from backend.logging_config import setup_logging, LazyJSON
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # FastAPI and related imports
 from fastapi import FastAPI, Request, Depends, HTTPException, status
-from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
@@ -30,63 +31,47 @@ from fastapi.exceptions import RequestValidationError, HTTPException as FastAPIH
 from fastapi.responses import JSONResponse, RedirectResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 import os
-from starlette.middleware.sessions import SessionMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.middleware.authentication import AuthenticationMiddleware
+from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
 from pydantic import BaseModel, EmailStr, validator, root_validator
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
 
 # Security imports
 from backend.security import setup_security, limiter
-from backend.redis_client import redis_client
+from backend.redis_client import async_redis_client
+from backend.password_hasher import password_hasher
 
 # GraphQL imports will be done after app initialization to avoid circular imports
 
 # Local imports
+from backend import models, crud
 from backend.auth import oauth2_scheme, get_current_active_user
-from backend.database import get_db, init_db, SessionLocal
+from backend.database import (
+    get_db, get_async_db, get_async_read_db, init_db, SessionLocal, engine, async_engine,
+    replica_engine, async_replica_engine, replica_router, pool_stats
+)
+from backend.server_timing import instrument_engine, timed_call, TimedJSONResponse
+from backend import connection_leaks, sql_monitor
 from backend.contact_routes import router as contact_router
 from backend.routers.auth import router as auth_router
 from backend.routers.profile import router as profile_router
 
-# Import the DocuSign SDK
-import docusign_esign as docusign
-from docusign_esign import (
-    ApiClient,
-    EnvelopesApi,
-    EnvelopeDefinition,
-    Document,
-    Signer,
-    Tabs,
-    SignHere,
-    DateSigned,
-    EventNotification, 
-    CustomFields, 
-    TextCustomField, 
-    RecipientEmailNotification,
-    Notification, 
-    Expirations, 
-    Reminders,
-    Recipients,
-    RecipientViewRequest,
-    AccountsApi,
-    ApiException
-)
+# The DocuSign SDK imports ~500 model modules; load it on first use
+def _lazy_module(name: str):
+    """Return module ``name``, executing it on first attribute access"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
 
-# For backward compatibility
-try:
-    from docusign_esign.rest import ApiException as DocusignApiException
-except ImportError:
-    DocusignApiException = Exception
 
-# ----------------------------------------------------------------------
-# Logging & env
-# ----------------------------------------------------------------------
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-load_dotenv(override=True)
+docusign = _lazy_module("docusign_esign")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -103,17 +88,34 @@ async def lifespan(app: FastAPI):
     
     # Check Redis connection
     try:
-        if redis_client.is_healthy():
+        if await async_redis_client.ping():
             logger.info("Redis connection established successfully")
         else:
             logger.warning("Redis connection failed, some features may be limited")
     except Exception as e:
         logger.error(f"Redis connection error: {str(e)}")
+
+    # Index sessions and refresh tokens issued before the per-user indexes
+    # existed, so revoking a user's tokens also reaches them
+    try:
+        added = await async_redis_client.run_backfill("user_indexes", async_redis_client.backfill_user_indexes)
+        if added:
+            logger.info(f"Indexed {added} sessions and refresh tokens issued before the user indexes existed")
+    except Exception as e:
+        logger.error(f"Could not backfill the user indexes: {str(e)}")
+
+    # Keep this worker's copy of the token blacklist in sync
+    async_redis_client.start_blacklist_sync()
     
     yield
     
     # Shutdown
     logger.info("Shutting down...")
+    await async_redis_client.close()
+    await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
+    password_hasher.shutdown()
 
 async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
@@ -171,56 +173,41 @@ app = FastAPI(
             "description": "Document signing and management"
         }
     ],
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse
 )
 
 # Setup security middleware
 setup_security(app)
 
-# Add session middleware
-if not os.getenv("SESSION_SECRET"):
-    logger.warning("SESSION_SECRET not set. Using a temporary secret key. This is not recommended for production.")
-
-app.add_middleware(
-    SessionMiddleware,
-    secret_key=os.getenv("SESSION_SECRET", os.urandom(32).hex()),
-    session_cookie="sessionid",
-    max_age=14 * 24 * 60 * 60,  # 14 days
-)
+# Report SQL time in Server-Timing
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+# Count statements per request and GraphQL operation, warn about N+1 loops
+sql_monitor.instrument_engine(engine)
+sql_monitor.instrument_engine(async_engine.sync_engine)
+# Log connections a GraphQL request checks out and never returns
+connection_leaks.instrument_engine(engine, "sync")
+connection_leaks.instrument_engine(async_engine.sync_engine, "async")
+if replica_router.enabled:
+    instrument_engine(replica_engine, "replica")
+    instrument_engine(async_replica_engine.sync_engine, "replica")
+    sql_monitor.instrument_engine(replica_engine)
+    sql_monitor.instrument_engine(async_replica_engine.sync_engine)
+    connection_leaks.instrument_engine(replica_engine, "replica")
+    connection_leaks.instrument_engine(async_replica_engine.sync_engine, "async_replica")
+    # Read-your-writes windows are shared by all workers through Redis
+    replica_router.track_writes(async_redis_client.mark_recent_write, async_redis_client.has_recent_write)
 
 # In production, enable HTTPS redirection
-if os.getenv("ENV") == "production":
+if settings.env == "production":
     app.add_middleware(HTTPSRedirectMiddleware)
 
-# CORS configuration is now handled in security.py
-
-# Add CORS middleware to allow requests from the frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# CORS, security headers and rate limiting are handled in security.py
 
 # Import GraphQL router after app is initialized
 from backend.gql.router import router as graphql_router
 
-# Create GraphQL application with proper configuration
-class GraphQLConfig:
-    def __init__(self, db_session: SessionLocal):
-        self.db = db_session
-
-def get_context_value(request: Request, data: Dict[str, Any]) -> Dict[str, Any]:
-    # This function creates a context for each GraphQL request
-    # You can add authentication here if needed for specific operations
-    db = next(get_db())
-    return {
-        "request": request,
-        "db": db,
-        "user": None  # No user by default, can be set by auth middleware if needed
-    }
-
 # Add a test endpoint for basic GraphQL functionality
 @app.get("/graphql/test")
 @limiter.limit("5/minute")
@@ -234,8 +221,6 @@ app.include_router(profile_router)
 # Mount GraphQL router at /graphql
 app.include_router(graphql_router, prefix="/graphql")
 
-# CORS middleware is now added before the GraphQL router
-
 # Add a route for the root path to redirect to GraphiQL
 @app.get("/")
 async def root():
@@ -379,14 +364,20 @@ class WebhookNotification(BaseModel):
 # ----------------------------------------------------------------------
 # DocuSign configuration
 # ----------------------------------------------------------------------
+@lru_cache()
 def get_ds_config() -> Dict[str, Any]:
-    """Load DocuSign config and private key from .env + file."""
+    """
+    Load DocuSign config and private key from the settings + key file.
+
+    Loaded on the first DocuSign call rather than at import, so workers boot
+    without reading the key; a failed load is retried on the next call.
+    """
     try:
-        client_id = os.getenv("DOCUSIGN_CLIENT_ID")
-        user_id = os.getenv("DOCUSIGN_USER_ID")  # GUID (API Username)
-        account_id = os.getenv("DOCUSIGN_ACCOUNT_ID")  # for info only
-        redirect_uri = os.getenv("DOCUSIGN_REDIRECT_URI")
-        auth_server = os.getenv("DOCUSIGN_AUTH_SERVER") or "account-d.docusign.com"
+        client_id = settings.docusign_client_id
+        user_id = settings.docusign_user_id  # GUID (API Username)
+        account_id = settings.docusign_account_id  # for info only
+        redirect_uri = settings.docusign_redirect_uri
+        auth_server = settings.docusign_auth_server or "account-d.docusign.com"
 
         logger.info("Loading DocuSign configuration...")
         logger.info(f"Client ID: {'*' * 8 + client_id[-4:] if client_id else 'Not set'}")
@@ -395,24 +386,14 @@ def get_ds_config() -> Dict[str, Any]:
         logger.info(f"Auth Server: {auth_server}")
         logger.info(f"Redirect URI: {redirect_uri}")
 
-        missing = []
-        if not client_id:
-            missing.append("DOCUSIGN_CLIENT_ID")
-        if not user_id:
-            missing.append("DOCUSIGN_USER_ID")
-        if not account_id:
-            missing.append("DOCUSIGN_ACCOUNT_ID")
-        if not redirect_uri:
-            missing.append("DOCUSIGN_REDIRECT_URI")
+        missing = settings.docusign_missing
 
         if missing:
             error_msg = f"Missing required environment variables: {', '.join(missing)}"
             logger.error(error_msg)
             raise ValueError(error_msg)
 
-        private_key_path = os.path.join(
-            os.path.dirname(__file__), "keys", "docusign_private_key.pem"
-        )
+        private_key_path = settings.docusign_private_key_path
         logger.info(f"Loading private key from: {private_key_path}")
         
         try:
@@ -454,12 +435,24 @@ def get_ds_config() -> Dict[str, Any]:
         raise
 
 
-DS_CONFIG = get_ds_config()
 
 
 # ----------------------------------------------------------------------
 # DocuSign client + account discovery
 # ----------------------------------------------------------------------
+@lru_cache()
+def timed_api_client_class() -> type:
+    """DocuSign ApiClient whose HTTP calls show up in Server-Timing"""
+
+    class TimedApiClient(docusign.ApiClient):
+        @timed_call("docusign")
+        def request(self, *args, **kwargs):
+            # Every SDK call, including the OAuth token and user info requests, goes through here
+            return super().request(*args, **kwargs)
+
+    return TimedApiClient
+
+
 def get_docusign_client_and_account():
     """
     Create a DocuSign ApiClient with JWT auth and discover the correct
@@ -469,7 +462,8 @@ def get_docusign_client_and_account():
         (api_client, account_id)
     """
     try:
-        env = os.getenv("DOCUSIGN_ENVIRONMENT", "demo").lower()  # "demo" or "prod"
+        DS_CONFIG = get_ds_config()
+        env = settings.docusign_environment.lower()  # "demo" or "prod"
         oauth_host = DS_CONFIG.get("ds_auth_server") or ("account.docusign.com" if env == "prod" else "account-d.docusign.com")
         
         logger.info(f"Initializing DocuSign client for {env} environment")
@@ -482,7 +476,7 @@ def get_docusign_client_and_account():
         logger.info(f"Account ID (.env): {account_id}")
 
         # Initialize API client
-        api_client = docusign.ApiClient()
+        api_client = timed_api_client_class()()
         
         # Set the base URL based on the environment
         if env == 'demo':
@@ -565,7 +559,7 @@ def get_docusign_client_and_account():
         logger.info("Verifying account access...")
         try:
             # Initialize Accounts API with the configured base path
-            accounts_api = AccountsApi(api_client)
+            accounts_api = docusign.AccountsApi(api_client)
             
             # Get account information
             account_info = accounts_api.get_account_information(account_id=account_id)
@@ -606,7 +600,7 @@ def get_docusign_client_and_account():
             logger.error(error_msg)
             raise Exception(f"DocuSign API error: {error_msg}")
             
-    except DocusignApiException as e:
+    except docusign.ApiException as e:
         error_msg = f"DocuSign API exception: {str(e)}"
         if hasattr(e, 'body'):
             try:
@@ -651,7 +645,15 @@ async def health_check():
         db.close()
         return {
             "status": "ok",
-            "database": "connected"
+            "database": "connected",
+            "database_pool": pool_stats(),
+            "read_replica": replica_router.stats(),
+            "password_hasher": password_hasher.stats(),
+            "blacklist_mirror": {
+                "ready": async_redis_client.blacklist_mirror.ready,
+                "size": len(async_redis_client.blacklist_mirror),
+            },
+            "redis": async_redis_client.breaker.stats()
         }
     except Exception as e:
         logger.error(f"Database connection error: {str(e)}")
@@ -668,10 +670,10 @@ async def get_consent_url():
     This URL should be opened in a browser to grant consent.
     """
     try:
-        env = os.getenv("DOCUSIGN_ENVIRONMENT", "demo").lower()
+        env = settings.docusign_environment.lower()
         oauth_host = "account-d.docusign.com" if env == "demo" else "account.docusign.com"
-        client_id = os.getenv("DOCUSIGN_CLIENT_ID")
-        redirect_uri = os.getenv("DOCUSIGN_REDIRECT_URI")
+        client_id = settings.docusign_client_id
+        redirect_uri = settings.docusign_redirect_uri
         
         if not client_id or not redirect_uri:
             raise HTTPException(
@@ -715,7 +717,7 @@ async def docusign_webhook(notification: Dict[str, Any]):
     """
     try:
         logger.info("Received DocuSign webhook notification")
-        logger.debug(f"Webhook payload: {json.dumps(notification, indent=2)}")
+        logger.debug("Webhook payload: %s", LazyJSON(notification))
 
         envelope_id = notification.get("envelopeId")
         status_str = notification.get("status", "").lower()
@@ -731,7 +733,7 @@ async def docusign_webhook(notification: Dict[str, Any]):
         if status_str == "completed":
             try:
                 api_client, account_id = get_docusign_client_and_account()
-                envelopes_api = EnvelopesApi(api_client)
+                envelopes_api = docusign.EnvelopesApi(api_client)
 
                 envelope = envelopes_api.get_envelope(
                     account_id=account_id, envelope_id=envelope_id
@@ -771,10 +773,7 @@ async def docusign_webhook(notification: Dict[str, Any]):
 async def test_docusign_config():
     """Test endpoint to check DocuSign configuration and JWT."""
     try:
-        private_key_path = os.path.join(
-            os.path.dirname(__file__), "keys", "docusign_private_key.pem"
-        )
-        private_key_exists = os.path.exists(private_key_path)
+        private_key_exists = os.path.exists(settings.docusign_private_key_path)
 
         try:
             api_client, discovered_account_id = get_docusign_client_and_account()
@@ -820,7 +819,7 @@ async def test_docusign_config():
                     account_info = None
                 
                 # Then try to list envelopes
-                envelopes_api = EnvelopesApi(api_client)
+                envelopes_api = docusign.EnvelopesApi(api_client)
                 from_date = (datetime.datetime.utcnow() - datetime.timedelta(days=30)).strftime(
                     "%Y-%m-%dT%H:%M:%SZ"
                 )
@@ -846,7 +845,7 @@ async def test_docusign_config():
                         except:
                             error_details['envelope_body'] = str(env_e.body)
                 
-            except ApiException as e:
+            except docusign.ApiException as e:
                 esign_status = f"error: {e.status}"
                 error_details = {
                     "status": e.status,
@@ -866,17 +865,17 @@ async def test_docusign_config():
                 "esign_status": esign_status,
                 "user_accounts": user_accounts,
                 "config": {
-                    "client_id": os.getenv("DOCUSIGN_CLIENT_ID")[:5] + "..."
-                    if os.getenv("DOCUSIGN_CLIENT_ID")
+                    "client_id": settings.docusign_client_id[:5] + "..."
+                    if settings.docusign_client_id
                     else "Missing",
-                    "user_id": os.getenv("DOCUSIGN_USER_ID"),
-                    "account_id_from_env": os.getenv("DOCUSIGN_ACCOUNT_ID"),
+                    "user_id": settings.docusign_user_id,
+                    "account_id_from_env": settings.docusign_account_id,
                     "account_id_discovered": discovered_account_id,
                     "private_key": "Found in file"
                     if private_key_exists
                     else "Missing (keys/docusign_private_key.pem not found)",
-                    "redirect_uri": os.getenv("DOCUSIGN_REDIRECT_URI"),
-                    "env": os.getenv("DOCUSIGN_ENVIRONMENT", "demo"),
+                    "redirect_uri": settings.docusign_redirect_uri,
+                    "env": settings.docusign_environment,
                 },
             }
             
@@ -902,14 +901,14 @@ async def test_docusign_config():
 @app.post("/appointments")
 async def create_appointment(
     appointment: AppointmentDetails,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new appointment and store user information in the database.
     """
     try:
         # Check if user exists, if not create a new one
-        user = db.query(models.User).filter(models.User.email == appointment.email).first()
+        user = await crud.get_user_by_email_async(db, appointment.email)
         
         if not user:
             user = models.User(
@@ -919,8 +918,8 @@ async def create_appointment(
                 role=models.Role.CLIENT
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            # Assigns user.id; the user is committed together with the appointment
+            await db.flush()
         
         # Create appointment with all fields
         new_appointment = models.Appointment(
@@ -939,8 +938,8 @@ async def create_appointment(
         logger.info(f"Creating appointment with data: {new_appointment.__dict__}")
         
         db.add(new_appointment)
-        db.commit()
-        db.refresh(new_appointment)
+        await db.flush()
+        await db.commit()
         
         return {
             "message": "Appointment created successfully",
@@ -949,7 +948,7 @@ async def create_appointment(
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error creating appointment: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -959,12 +958,12 @@ async def create_appointment(
 @app.get("/appointments/{appointment_id}")
 async def get_appointment(
     appointment_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get appointment details by ID
     """
-    appointment = db.query(models.Appointment).filter(models.Appointment.id == appointment_id).first()
+    appointment = await db.get(models.Appointment, appointment_id)
     if not appointment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -975,18 +974,21 @@ async def get_appointment(
 @app.get("/users/{user_id}/appointments")
 async def get_user_appointments(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get all appointments for a specific user
     """
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return user.appointments
+    result = await db.execute(
+        select(models.Appointment).where(models.Appointment.user_id == user_id)
+    )
+    return result.scalars().all()
 
 # Keep the existing create_envelope endpoint for DocuSign integration
 @app.post("/api/docusign/envelope")
@@ -1019,7 +1021,7 @@ async def create_envelope(request_data: dict):
             # Initialize DocuSign client
             logger.info("Initializing DocuSign client...")
             api_client, account_id = get_docusign_client_and_account()
-            envelopes_api = EnvelopesApi(api_client)
+            envelopes_api = docusign.EnvelopesApi(api_client)
             logger.info(f"Successfully initialized DocuSign client for account: {account_id}")
             
             # Generate document content
@@ -1040,7 +1042,7 @@ async def create_envelope(request_data: dict):
             logger.info("Successfully generated document content")
             
             # Create document
-            document = Document(
+            document = docusign.Document(
                 document_base64=base64.b64encode(document_content).decode("utf-8"),
                 name="Appointment_Agreement.pdf",
                 file_extension="pdf",
@@ -1057,14 +1059,14 @@ async def create_envelope(request_data: dict):
             }
 
             # Create signer with tabs
-            signer_with_tabs = Signer(
+            signer_with_tabs = docusign.Signer(
                 email=signer['email'],
                 name=signer['name'],
                 recipient_id=signer['recipientId'],
                 routing_order=signer['routingOrder'],
                 client_user_id=signer['clientUserId'],
-                tabs=Tabs(sign_here_tabs=[
-                    SignHere(
+                tabs=docusign.Tabs(sign_here_tabs=[
+                    docusign.SignHere(
                         document_id="1",
                         page_number="1",
                         recipient_id="1",
@@ -1099,7 +1101,7 @@ Eagle Vision Team""",
             # Add appointment ID if available, otherwise use a placeholder
             appointment_id = getattr(appointment, 'id', 'pending')
             custom_fields.append(
-                TextCustomField(
+                docusign.TextCustomField(
                     name="appointment_id",
                     required="false",
                     show="false",
@@ -1109,7 +1111,7 @@ Eagle Vision Team""",
             
             # Add user email
             custom_fields.append(
-                TextCustomField(
+                docusign.TextCustomField(
                     name="user_email",
                     required="false",
                     show="false",
@@ -1117,16 +1119,16 @@ Eagle Vision Team""",
                 )
             )
             
-            envelope_definition = EnvelopeDefinition(
+            envelope_definition = docusign.EnvelopeDefinition(
                 email_subject="Please sign this document",
                 documents=[document],
-                recipients=Recipients(signers=[signer_with_tabs]),
+                recipients=docusign.Recipients(signers=[signer_with_tabs]),
                 status="sent",
-                custom_fields=CustomFields(text_custom_fields=custom_fields)
+                custom_fields=docusign.CustomFields(text_custom_fields=custom_fields)
             )
 
             # For demo environment, ensure the signer gets a copy
-            if os.getenv('DOCUSIGN_ENVIRONMENT') == 'demo':
+            if settings.docusign_environment == 'demo':
                 from docusign_esign import Notification, Expirations, Reminders
                 
                 # Set email notification for when the envelope is completed
@@ -1163,7 +1165,7 @@ Eagle Vision Team""",
                 )
             
             # For production, set up Connect notifications
-            if os.getenv('ENVIRONMENT') == 'production':
+            if settings.environment == 'production':
                 try:
                     # Ensure the return URL is HTTPS for production
                     return_url = request.return_url
@@ -1190,7 +1192,7 @@ Eagle Vision Team""",
 
             # Create recipient view for signing
             signer = request.get_signer_info()
-            recipient_view_request = RecipientViewRequest(
+            recipient_view_request = docusign.RecipientViewRequest(
                 authentication_method="None",
                 client_user_id=signer.get('client_user_id', signer['email']),
                 recipient_id="1",
@@ -1235,6 +1237,7 @@ Eagle Vision Team""",
 # ----------------------------------------------------------------------
 # PDF generation
 # ----------------------------------------------------------------------
+@timed_call("render")
 def generate_document_content(appointment_data=None):
     """Generate a PDF document for signing with appointment details."""
     from reportlab.lib.pagesizes import letter
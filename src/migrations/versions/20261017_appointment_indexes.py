@@ -0,0 +1,40 @@
+"""Add indexes for the hot appointment queries
+
+Revision ID: 20261017_appointment_indexes
+Revises: 20231125_add_messages_tables, add_user_auth_fields
+Create Date: 2026-10-17 09:00:00.000000
+
+Indexes are built with CREATE INDEX CONCURRENTLY so the table stays
+writable, which must happen outside a transaction. A build that fails
+leaves an INVALID index behind; drop it before running the upgrade again.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20261017_appointment_indexes'
+down_revision = ('20231125_add_messages_tables', 'add_user_auth_fields')
+branch_labels = None
+depends_on = None
+
+# The listings page with WHERE (sort, id) < (:sort, :id) ORDER BY sort DESC,
+# id DESC, which Postgres only answers from an index that ends in id
+INDEXES = [
+    # userAppointments: WHERE user_id = ? ORDER BY appointment_date DESC, id DESC
+    ("ix_appointments_user_id_appointment_date_id", "appointments (user_id, appointment_date, id)"),
+    # appointment listings, createAppointment overlap check and analytics:
+    # appointment_date ranges
+    ("ix_appointments_appointment_date_id", "appointments (appointment_date, id)"),
+    # createAppointment duplicate check: email, service, not cancelled
+    ("ix_appointments_active_email_service",
+     "appointments (email, service) WHERE status <> 'CANCELLED'"),
+]
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,39 @@
+"""Add indexes for the message and contact listings
+
+Revision ID: 20261017_message_contact_indexes
+Revises: 20261017_appointment_indexes
+Create Date: 2026-10-17 09:05:00.000000
+
+Built concurrently and ending in id for keyset pagination, like
+20261017_appointment_indexes. ix_messages_sender_id is dropped once
+(sender_id, created_at, id) exists, since that index covers the same
+lookups.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20261017_message_contact_indexes'
+down_revision = '20261017_appointment_indexes'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # messages(type: "sent"): WHERE sender_id = ? ORDER BY created_at DESC, id DESC
+    ("ix_messages_sender_id_created_at_id", "messages (sender_id, created_at, id)"),
+    # messages(type: "all") and pagination: ORDER BY created_at DESC, id DESC
+    ("ix_messages_created_at_id", "messages (created_at, id)"),
+    # contacts, allContacts and the contact list: ORDER BY created_at DESC, id DESC
+    ("ix_contacts_created_at_id", "contacts (created_at, id)"),
+]
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_messages_sender_id")
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_sender_id ON messages (sender_id)")
+        for name, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
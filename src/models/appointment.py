@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Enum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -12,6 +12,22 @@ class AppointmentStatus(enum.Enum):
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    # Matched to the hot queries; created on existing databases by the
+    # 20261017 migrations. The trailing id makes the (date, id) keyset
+    # cursors of the GraphQL connections an index range.
+    __table_args__ = (
+        # userAppointments: one user's appointments newest first
+        Index("ix_appointments_user_id_appointment_date_id", "user_id", "appointment_date", "id"),
+        # appointmentsConnection, createAppointment's overlap check and the
+        # analytics date ranges
+        Index("ix_appointments_appointment_date_id", "appointment_date", "id"),
+        # createAppointment's duplicate check, which ignores cancellations
+        Index(
+            "ix_appointments_active_email_service", "email", "service",
+            postgresql_where=text("status <> 'CANCELLED'"),
+            sqlite_where=text("status <> 'CANCELLED'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declared_attr
 import enum
@@ -27,7 +27,13 @@ class MessageRecipientType(str, enum.Enum):
 
 class Message(Base):
     __tablename__ = "messages"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Sent messages and the "all" listing, newest first; id is the
+        # keyset cursor's tie-breaker
+        Index("ix_messages_sender_id_created_at_id", "sender_id", "created_at", "id"),
+        Index("ix_messages_created_at_id", "created_at", "id"),
+        {'extend_existing': True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -58,8 +64,9 @@ class MessageRecipient(Base):
     __table_args__ = {'extend_existing': True}
     
     id = Column(Integer, primary_key=True, index=True)
-    message_id = Column(Integer, ForeignKey('messages.id'), nullable=False)
-    recipient_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    # Foreign key indexes, as created by 20231125_add_messages_tables
+    message_id = Column(Integer, ForeignKey('messages.id'), nullable=False, index=True)
+    recipient_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     status = Column(Enum(MessageStatus), default=MessageStatus.DRAFT, nullable=False)
     read_at = Column(DateTime, nullable=True)
     delivered_at = Column(DateTime, nullable=True)
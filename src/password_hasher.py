@@ -0,0 +1,166 @@
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import bcrypt
+
+from backend import server_timing
+from backend.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherOverloaded(Exception):
+    """Raised when too many hash/verify operations are already queued."""
+
+
+def hash_password(password: str) -> str:
+    """Hash a password with a freshly generated bcrypt salt."""
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    return bcrypt.hashpw(password, bcrypt.gensalt()).decode('utf-8')
+
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Check a password against a bcrypt hash. Never raises."""
+    try:
+        if isinstance(plain_password, str):
+            plain_password = plain_password.encode('utf-8')
+        if isinstance(hashed_password, str):
+            hashed_password = hashed_password.encode('utf-8')
+        return bcrypt.checkpw(plain_password, hashed_password)
+    except Exception as e:
+        logger.error(f"Error verifying password: {e}")
+        return False
+
+
+class PasswordHasher:
+    """Runs bcrypt work on a bounded thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL while hashing, so a small thread pool gives real
+    parallelism without the pickling overhead of a process pool. The pool is
+    created lazily on first use, which keeps it out of a preforking master.
+
+    Environment:
+        PASSWORD_HASH_WORKERS: Number of pool threads (default 2)
+        PASSWORD_HASH_MAX_QUEUE: Max operations waiting for a thread before
+            new ones are rejected with PasswordHasherOverloaded (default 64)
+        PASSWORD_HASH_SLOW_WAIT_MS: Log a warning when an operation waited
+            longer than this for a thread (default 500)
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        slow_wait_ms: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.max_workers = max_workers or settings.password_hash_workers
+        self.max_queue = max_queue if max_queue is not None else settings.password_hash_max_queue
+        self.slow_wait_ms = slow_wait_ms if slow_wait_ms is not None else settings.password_hash_slow_wait_ms
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._max_queued = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="password-hasher",
+                    )
+        return self._executor
+
+    def _timed_call(self, submitted_at: float, fn: Callable, args: tuple) -> Any:
+        started_at = time.perf_counter()
+        wait = started_at - submitted_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+        if wait * 1000 > self.slow_wait_ms:
+            logger.warning(f"Password hashing waited {wait * 1000:.0f}ms for a worker thread")
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._total_run += time.perf_counter() - started_at
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a blocking password function on the pool and await its result."""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise PasswordHasherOverloaded(
+                    f"Password hashing queue is full ({self._queued} waiting)"
+                )
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        try:
+            future = self._get_executor().submit(self._timed_call, time.perf_counter(), fn, args)
+        except RuntimeError:
+            # Executor was shut down between lookup and submit
+            with self._lock:
+                self._queued -= 1
+            raise
+
+        try:
+            with server_timing.timed("bcrypt"):
+                return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # A job cancelled before it started never reaches _timed_call
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+            raise
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against a bcrypt hash without blocking the event loop."""
+        return await self.run(check_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password without blocking the event loop."""
+        return await self.run(hash_password, password)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and wait-time metrics."""
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self._queued,
+                "max_queue_depth": self._max_queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._total_wait / started * 1000, 2) if started else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+                "avg_run_ms": round(self._total_run / self._completed * 1000, 2) if self._completed else 0.0,
+            }
+
+    def shutdown(self):
+        """Shut down the worker pool; it is recreated on the next call."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+# Singleton instance
+password_hasher = PasswordHasher()
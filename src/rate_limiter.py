@@ -0,0 +1,253 @@
+"""
+Distributed rate limiting shared by every worker and instance.
+
+Limits are enforced with GCRA (generic cell rate algorithm) in a Redis Lua
+script, so checking and updating a client's budget is one atomic round trip
+and one key per (scope, client). Clients that are well under their limit
+reserve a small batch of requests from Redis at once (a local lease) and
+spend it in-process, so most of their requests never touch Redis. A lease is
+only granted while at least half the burst stays free, and the reserved
+requests are already counted in Redis, so leases never let a client exceed
+its limit. If Redis is unavailable the limiter falls back to a per-process
+GCRA with the same limits.
+"""
+import time
+import logging
+import re
+import functools
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+from fastapi import HTTPException, Request, status
+
+from backend.cache import TTLCache
+from backend.redis_client import GCRA_LUA, async_redis_client
+from backend.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+RATE_LIMIT_LEASE_SIZE = settings.rate_limit_lease_size
+RATE_LIMIT_LEASE_SECONDS = settings.rate_limit_lease_seconds
+RATE_LIMIT_LOCAL_KEYS = settings.rate_limit_local_keys
+
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LIMIT_RE = re.compile(r"^\s*(\d+)\s*(?:/|per)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$", re.IGNORECASE)
+
+
+class RateLimitItem:
+    """``amount`` requests per ``period`` seconds"""
+
+    __slots__ = ("amount", "period")
+
+    def __init__(self, amount: int, period: int):
+        self.amount = amount
+        self.period = period
+
+    def __str__(self):
+        return f"{self.amount}/{self.period}s"
+
+
+def parse(value: str) -> RateLimitItem:
+    """Parse limits such as "100/hour", "500 per day" or "10 per 5 minutes"."""
+    match = _LIMIT_RE.match(value)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    amount, multiplier, unit = match.groups()
+    return RateLimitItem(int(amount), int(multiplier or 1) * _PERIODS[unit.lower()])
+
+
+class RateLimitResult:
+    """Outcome of a rate limit check; ``reset`` is a UNIX timestamp"""
+
+    __slots__ = ("allowed", "limit", "remaining", "retry_after", "reset")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, retry_after: float, reset: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = max(0, remaining)
+        self.retry_after = retry_after
+        self.reset = reset
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(int(self.reset)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, int(self.retry_after + 0.999)))
+        return headers
+
+
+class _Lease:
+    __slots__ = ("tokens", "expires_at", "remaining", "reset")
+
+    def __init__(self, tokens: int, expires_at: float, remaining: int, reset: float):
+        self.tokens = tokens
+        self.expires_at = expires_at
+        self.remaining = remaining
+        self.reset = reset
+
+
+def client_identity(request: Request) -> str:
+    """Rate limit identity: the authenticated user if their token was already
+    verified by this worker, otherwise the client IP. Unverified token claims
+    are never trusted, so a forged ``sub`` cannot spend someone else's budget.
+    """
+    from backend.auth import token_cache, _token_digest
+
+    token = None
+    authorization = request.headers.get("authorization", "")
+    if authorization.startswith("Bearer "):
+        token = authorization[7:]
+    else:
+        cookie = request.cookies.get("access_token", "")
+        if cookie.startswith("Bearer "):
+            token = cookie[7:]
+    if token:
+        payload = token_cache.get(_token_digest(token))
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class RateLimiter:
+    """Redis-backed GCRA limiter with a slowapi-style ``limit`` decorator"""
+
+    def __init__(
+        self,
+        default_limits: Iterable[str] = (),
+        key_func: Callable[[Request], str] = client_identity,
+        lease_size: int = RATE_LIMIT_LEASE_SIZE,
+        lease_seconds: float = RATE_LIMIT_LEASE_SECONDS,
+    ):
+        self.default_limits = [parse(value) for value in default_limits]
+        self.key_func = key_func
+        self.lease_size = lease_size
+        self.lease_seconds = lease_seconds
+        self.exempt_routes = set()
+        self._leases: Dict[str, _Lease] = {}
+        self._local = TTLCache(maxsize=RATE_LIMIT_LOCAL_KEYS, ttl=24 * 3600)
+        self._lock = threading.Lock()
+        self._script = async_redis_client.redis.register_script(GCRA_LUA)
+
+    @staticmethod
+    def _params(item: RateLimitItem):
+        period_ms = item.period * 1000
+        return period_ms / item.amount, period_ms
+
+    def _lease_size(self, item: RateLimitItem, cost: int) -> int:
+        # Small limits are always checked exactly
+        return cost if cost > 1 else max(1, min(self.lease_size, item.amount // 10))
+
+    def _take_lease(self, key: str, item: RateLimitItem) -> Optional[RateLimitResult]:
+        lease = self._leases.get(key)
+        if lease is None:
+            return None
+        with self._lock:
+            if lease.tokens <= 0 or lease.expires_at <= time.monotonic():
+                self._leases.pop(key, None)
+                return None
+            lease.tokens -= 1
+        return RateLimitResult(True, item.amount, lease.remaining + lease.tokens, 0, lease.reset)
+
+    def _result(self, key: str, item: RateLimitItem, cost: int, reply) -> RateLimitResult:
+        allowed, granted, remaining, retry_after_ms, reset_after_ms = (int(v) for v in reply)
+        reset = time.time() + reset_after_ms / 1000
+        if allowed and granted > cost:
+            with self._lock:
+                self._leases[key] = _Lease(
+                    granted - cost, time.monotonic() + self.lease_seconds, remaining, reset
+                )
+            remaining += granted - cost
+        return RateLimitResult(bool(allowed), item.amount, remaining, retry_after_ms / 1000, reset)
+
+    def _local_hit(self, key: str, item: RateLimitItem, cost: int) -> RateLimitResult:
+        interval, burst = self._params(item)
+        now = time.time() * 1000
+        with self._lock:
+            tat = max(self._local.get(key, now), now)
+            new_tat = tat + cost * interval
+            if new_tat - now > burst:
+                return RateLimitResult(
+                    False, item.amount, int((burst - (tat - now)) / interval),
+                    (new_tat - burst - now) / 1000, tat / 1000,
+                )
+            self._local.set(key, new_tat, ttl=(new_tat - now) / 1000)
+        return RateLimitResult(True, item.amount, int((burst - (new_tat - now)) / interval), 0, new_tat / 1000)
+
+    async def hit(self, key: str, limit, cost: int = 1) -> RateLimitResult:
+        """Spend ``cost`` units of ``limit`` (e.g. "100/hour") from bucket ``key``"""
+        item = parse(limit) if isinstance(limit, str) else limit
+        key = f"ratelimit:{key}:{item.amount}/{item.period}"
+        if cost == 1:
+            leased = self._take_lease(key, item)
+            if leased:
+                return leased
+        if not async_redis_client.is_healthy():
+            return self._local_hit(key, item, cost)
+        interval, burst = self._params(item)
+        try:
+            reply = await self._script(
+                keys=[key],
+                args=[interval, burst, cost, self._lease_size(item, cost)],
+                client=async_redis_client.redis,
+            )
+        except Exception as e:
+            logger.warning(f"Rate limiter falling back to local counters: {str(e)}")
+            return self._local_hit(key, item, cost)
+        return self._result(key, item, cost, reply)
+
+    async def check_default_limits(self, request: Request) -> Optional[RateLimitResult]:
+        """Apply the default limits to a request; returns the tightest result"""
+        if request.url.path in self.exempt_routes or not self.default_limits:
+            return None
+        identity = self.key_func(request)
+        tightest = None
+        for item in self.default_limits:
+            result = await self.hit(f"default:{identity}", item)
+            if not result.allowed:
+                return result
+            if tightest is None or result.remaining < tightest.remaining:
+                tightest = result
+        return tightest
+
+    def limit(self, limit_value: str):
+        """Decorate an endpoint with a per-route, per-client limit.
+
+        The endpoint must take a ``request: Request`` argument. Exceeding the
+        limit raises a 429 HTTPException with Retry-After and X-RateLimit-*
+        headers.
+        """
+        item = parse(limit_value)
+
+        def decorator(func):
+            scope = f"{func.__module__}.{func.__name__}"
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = kwargs.get("request")
+                if request is None:
+                    request = next((a for a in args if isinstance(a, Request)), None)
+                if request is not None:
+                    result = await self.hit(f"{scope}:{self.key_func(request)}", item)
+                    if not result.allowed:
+                        raise HTTPException(
+                            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail={
+                                "error": "rate_limited",
+                                "message": f"Rate limit exceeded: {limit_value}"
+                            },
+                            headers=result.headers(),
+                        )
+                    current = getattr(request.state, "rate_limit", None)
+                    if current is None or result.remaining < current.remaining:
+                        request.state.rate_limit = result
+                return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
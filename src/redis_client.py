@@ -1,12 +1,434 @@
-import os
 import json
+import time
+import hashlib
 import logging
+import threading
 from typing import Optional, Dict, Any
+import asyncio
 import redis
+import redis.asyncio as aioredis
 from datetime import datetime, timedelta
 
+from backend import server_timing
+from backend.settings import get_settings
+
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
+REDIS_MAX_CONNECTIONS = settings.redis_max_connections
+REDIS_POOL_TIMEOUT = settings.redis_pool_timeout
+REDIS_SOCKET_TIMEOUT = settings.redis_socket_timeout
+REDIS_CONNECT_TIMEOUT = settings.redis_connect_timeout
+REDIS_BREAKER_FAILURES = settings.redis_breaker_failures
+REDIS_BREAKER_PROBE_INTERVAL = settings.redis_breaker_probe_interval
+
+# Revoked tokens are indexed by digest in a sorted set (score = expiry) so a
+# worker can load a snapshot at startup, and announced on a pub/sub channel so
+# running workers hear about new revocations without polling.
+BLACKLIST_INDEX_KEY = "blacklist:index"
+BLACKLIST_CHANNEL = "blacklist:events"
+
+# Keys written before an index existed are indexed by a backfill at startup
+# (see backfill_blacklist_index and backfill_user_indexes). A worker claims
+# each backfill with SET NX for this long, so a deployment's workers scan the
+# keyspace once between them instead of once each. Starts after the claim has
+# expired run it again, which is harmless and also catches keys written by
+# old workers still serving during a rolling deploy.
+REDIS_BACKFILL_LOCK_SECONDS = settings.redis_backfill_lock_seconds
+
+# Per-user sets naming the session and refresh-token/family keys a user owns,
+# so listing and revoking them never walks the keyspace. Members are removed
+# when a key is deleted through the clients; members whose key expired are
+# pruned whenever an index is read, or written past USER_INDEX_PRUNE_SIZE.
+# Each write pushes the index expiry out to at least USER_INDEX_TTL.
+USER_INDEX_TTL = settings.redis_user_index_ttl
+USER_INDEX_PRUNE_SIZE = settings.redis_user_index_prune_size
+SESSIONS_INDEX = "sessions"
+REFRESH_INDEX = "refresh_tokens"
+# Key patterns owned by a user (ID in the second segment) and their index
+USER_INDEX_BACKFILL = (
+    ("refresh_token:*", REFRESH_INDEX),
+    ("token_family:*", REFRESH_INDEX),
+    ("session:*", SESSIONS_INDEX),
+)
+
+# A rotated-away refresh token presented again within this many seconds is
+# refused without burning its family: it is most likely a parallel refresh
+# from the same client (two tabs, a retried request) that lost the race.
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = settings.refresh_token_reuse_grace_seconds
+
+# Refresh token rotation in one atomic step.
+# KEYS: presented token, its family, successor token, the user's refresh
+#       index, marker left behind by the presented token once rotated
+# ARGV: presented jti, family ("" if none), successor jti, successor TTL,
+#       index TTL, reuse grace period (0 disables it)
+# Returns "ok", "invalid" (unknown or foreign token, or a rotated-away token
+# presented within the grace period) or "reuse" (a token rotated away longer
+# ago was presented again). Reuse revokes every refresh token and family of
+# the user, deleting the keys named in the index as REVOKE_INDEXED_KEYS_LUA
+# does; every other key the script touches is declared in KEYS.
+ROTATE_REFRESH_TOKEN_LUA = """
+local stored = redis.call('GET', KEYS[1])
+local family = ARGV[2]
+if family ~= '' then
+    local current = redis.call('GET', KEYS[2])
+    if (not stored and current) or (stored and current and current ~= ARGV[1]) then
+        if redis.call('EXISTS', KEYS[5]) == 1 then
+            return 'invalid'
+        end
+        local members = redis.call('SMEMBERS', KEYS[4])
+        for i = 1, #members, 500 do
+            redis.call('DEL', unpack(members, i, math.min(i + 499, #members)))
+        end
+        redis.call('DEL', KEYS[4], KEYS[2], KEYS[1])
+        return 'reuse'
+    end
+end
+if not stored or (family ~= '' and stored ~= family) then
+    return 'invalid'
+end
+redis.call('DEL', KEYS[1])
+redis.call('SREM', KEYS[4], KEYS[1])
+redis.call('SETEX', KEYS[3], ARGV[4], family)
+redis.call('SADD', KEYS[4], KEYS[3])
+if family ~= '' then
+    redis.call('SETEX', KEYS[2], ARGV[4], ARGV[3])
+    redis.call('SADD', KEYS[4], KEYS[2])
+    if tonumber(ARGV[6]) > 0 then
+        redis.call('SETEX', KEYS[5], ARGV[6], ARGV[3])
+    end
+end
+redis.call('EXPIRE', KEYS[4], ARGV[5])
+return 'ok'
+"""
+
+# GCRA rate limiting (see rate_limiter.py).
+# KEYS: bucket. ARGV: emission interval (ms), burst tolerance (ms), cost,
+# preferred lease size. Returns {allowed, granted, remaining, retry_after_ms,
+# reset_after_ms}. A lease is granted only if it leaves half the burst free.
+GCRA_LUA = """
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local lease = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local granted = 0
+local new_tat = tat
+if lease > cost and tat + lease * interval - now <= burst / 2 then
+    granted = lease
+    new_tat = tat + lease * interval
+elseif tat + cost * interval - now <= burst then
+    granted = cost
+    new_tat = tat + cost * interval
+end
+if granted == 0 then
+    return {0, 0, math.floor((burst - (tat - now)) / interval), math.ceil(tat + cost * interval - burst - now), math.ceil(tat - now)}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, granted, math.floor((burst - (new_tat - now)) / interval), 0, math.ceil(new_tat - now)}
+"""
+
+# Delete every key named in a user index, then the index itself.
+REVOKE_INDEXED_KEYS_LUA = """
+local members = redis.call('SMEMBERS', KEYS[1])
+local deleted = 0
+for i = 1, #members, 500 do
+    deleted = deleted + redis.call('DEL', unpack(members, i, math.min(i + 499, #members)))
+end
+redis.call('DEL', KEYS[1])
+return deleted
+"""
+
+# Drop index members whose key has expired; returns the live members.
+PRUNE_USER_INDEX_LUA = """
+local live = {}
+for _, key in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    if redis.call('EXISTS', key) == 1 then
+        table.insert(live, key)
+    else
+        redis.call('SREM', KEYS[1], key)
+    end
+end
+return live
+"""
+
+
+def user_index_key(user_id: str, kind: str) -> str:
+    return f"user_index:{user_id}:{kind}"
+
+
+def session_user_id(session_key: str) -> str:
+    """User ID embedded in a session, refresh token or token family key"""
+    return session_key.split(":", 2)[1]
+
+
+def queue_token_writes(
+    pipe,
+    user_id: str,
+    token_id: str,
+    expires_in: int,
+    token_family: str = None,
+    session_key: str = None,
+    session_data: Dict[str, Any] = None,
+    session_expires_in: int = 60 * 60 * 24 * 30,
+) -> int:
+    """Queue the writes of a token issuance, index updates included, on ``pipe``
+
+    Works for sync and asyncio pipelines alike. The SETEX commands are queued
+    first; the return value is how many there are, so callers can check
+    ``results[:n]`` after executing. The last result is the refresh index size.
+    """
+    token_key = f"refresh_token:{user_id}:{token_id}"
+    refresh_members = [token_key]
+    if token_family:
+        family_key = f"token_family:{user_id}:{token_family}"
+        pipe.setex(family_key, expires_in, token_id)
+        refresh_members.append(family_key)
+    pipe.setex(token_key, expires_in, token_family or "")
+    writes = len(refresh_members)
+    if session_key:
+        pipe.setex(session_key, session_expires_in, json.dumps(session_data or {}))
+        writes += 1
+        sessions_index = user_index_key(user_id, SESSIONS_INDEX)
+        pipe.sadd(sessions_index, session_key)
+        pipe.expire(sessions_index, max(USER_INDEX_TTL, session_expires_in))
+    refresh_index = user_index_key(user_id, REFRESH_INDEX)
+    pipe.sadd(refresh_index, *refresh_members)
+    pipe.expire(refresh_index, max(USER_INDEX_TTL, expires_in))
+    pipe.scard(refresh_index)
+    return writes
+
+
+def rotation_call(user_id: str, token_id: str, new_token_id: str, expires_in: int, token_family: str = None) -> Dict[str, list]:
+    """KEYS/ARGV for ROTATE_REFRESH_TOKEN_LUA"""
+    return {
+        "keys": [
+            f"refresh_token:{user_id}:{token_id}",
+            f"token_family:{user_id}:{token_family or ''}",
+            f"refresh_token:{user_id}:{new_token_id}",
+            user_index_key(user_id, REFRESH_INDEX),
+            f"rotated_refresh_token:{user_id}:{token_id}",
+        ],
+        "args": [
+            token_id,
+            token_family or "",
+            new_token_id,
+            expires_in,
+            max(USER_INDEX_TTL, expires_in),
+            REFRESH_TOKEN_REUSE_GRACE_SECONDS,
+        ],
+    }
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class BlacklistMirror:
+    """Per-worker in-memory copy of the revoked-token index.
+
+    The mirror is only trusted while ``ready`` is set, i.e. after a snapshot
+    has been loaded while the pub/sub subscription was live. A miss on a ready
+    mirror means the token is not revoked; a hit is confirmed against Redis.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.ready = False
+
+    def load(self, entries: Dict[str, float]):
+        now = time.time()
+        with self._lock:
+            self._entries = {d: exp for d, exp in entries.items() if exp > now}
+            self.ready = True
+
+    def add(self, digest: str, expires_at: float):
+        with self._lock:
+            self._entries[digest] = max(expires_at, self._entries.get(digest, 0))
+
+    def might_contain(self, digest: str) -> bool:
+        expires_at = self._entries.get(digest)
+        return expires_at is not None and expires_at > time.time()
+
+    def prune(self):
+        now = time.time()
+        with self._lock:
+            self._entries = {d: exp for d, exp in self._entries.items() if exp > now}
+
+    def invalidate(self):
+        self.ready = False
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# One mirror per process, shared by the sync and asyncio clients
+blacklist_mirror = BlacklistMirror()
+
+
+class CircuitOpenError(redis.exceptions.ConnectionError):
+    """Raised instead of contacting Redis while the circuit breaker is open"""
+
+
+# Errors that say Redis is unreachable, as opposed to a bad command or value
+BREAKER_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, OSError)
+
+
+class CircuitBreaker:
+    """Tracks Redis availability from the outcome of real commands.
+
+    While closed, commands run normally. After ``failure_threshold``
+    consecutive connection failures the breaker opens: commands fail fast with
+    CircuitOpenError and the owning client probes Redis in the background
+    every ``probe_interval`` seconds; the first successful probe closes it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = REDIS_BREAKER_FAILURES,
+        probe_interval: float = REDIS_BREAKER_PROBE_INTERVAL,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.on_open = None
+        self.opened_at: Optional[float] = None
+        self._open = False
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_closed(self) -> bool:
+        return not self._open
+
+    def before_call(self):
+        if self._open:
+            raise CircuitOpenError(f"Redis circuit '{self.name}' is open")
+
+    def record_success(self):
+        if not (self._failures or self._open):
+            return
+        with self._lock:
+            was_open = self._open
+            self._failures = 0
+            self._open = False
+            self.opened_at = None
+        if was_open:
+            logger.info(f"Redis circuit '{self.name}' closed, Redis is reachable again")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._open or self._failures < self.failure_threshold:
+                return
+            self._open = True
+            self.opened_at = time.time()
+        logger.error(f"Redis circuit '{self.name}' opened after {self._failures} consecutive failures")
+        if self.on_open:
+            self.on_open()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": "open" if self._open else "closed",
+            "consecutive_failures": self._failures,
+            "opened_at": self.opened_at,
+        }
+
+
+class GuardedPipeline(redis.client.Pipeline):
+    breaker: CircuitBreaker
+
+    def execute(self, raise_on_error=True):
+        self.breaker.before_call()
+        try:
+            with server_timing.timed("redis"):
+                result = super().execute(raise_on_error)
+        except BREAKER_ERRORS:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+
+class GuardedRedis(redis.Redis):
+    """redis.Redis that reports every command's outcome to a CircuitBreaker"""
+
+    def __init__(self, *args, breaker: CircuitBreaker, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+
+    def execute_command(self, *args, **options):
+        self.breaker.before_call()
+        try:
+            with server_timing.timed("redis"):
+                result = super().execute_command(*args, **options)
+        except BREAKER_ERRORS:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = GuardedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipe.breaker = self.breaker
+        return pipe
+
+    def probe(self):
+        """PING that bypasses the open breaker"""
+        return redis.Redis.execute_command(self, "PING")
+
+
+class GuardedAsyncPipeline(aioredis.client.Pipeline):
+    breaker: CircuitBreaker
+
+    async def execute(self, raise_on_error: bool = True):
+        self.breaker.before_call()
+        try:
+            with server_timing.timed("redis"):
+                result = await super().execute(raise_on_error)
+        except BREAKER_ERRORS:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+
+class GuardedAsyncRedis(aioredis.Redis):
+    """redis.asyncio.Redis that reports every command's outcome to a CircuitBreaker"""
+
+    def __init__(self, *args, breaker: CircuitBreaker, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+
+    async def execute_command(self, *args, **options):
+        self.breaker.before_call()
+        try:
+            with server_timing.timed("redis"):
+                result = await super().execute_command(*args, **options)
+        except BREAKER_ERRORS:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None):
+        pipe = GuardedAsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipe.breaker = self.breaker
+        return pipe
+
+    async def probe(self):
+        """PING that bypasses the open breaker"""
+        return await aioredis.Redis.execute_command(self, "PING")
+
+
 class RedisClient:
     _instance = None
     
@@ -17,24 +439,33 @@ class RedisClient:
         return cls._instance
     
     def _initialize(self):
-        self.redis_host = os.getenv("REDIS_HOST", "localhost")
-        self.redis_port = int(os.getenv("REDIS_PORT", 6379))
-        self.redis_db = int(os.getenv("REDIS_DB", 0))
-        self.redis_password = os.getenv("REDIS_PASSWORD")
+        self.redis_host = settings.redis_host
+        self.redis_port = settings.redis_port
+        self.redis_db = settings.redis_db
+        self.redis_password = settings.redis_password
         logger.info(f"Initializing Redis client - host: {self.redis_host}, port: {self.redis_port}, db: {self.redis_db}")
+        self.breaker = CircuitBreaker("sync")
+        self.breaker.on_open = self._start_probe
+        self._probe_thread = None
         self.redis = self._create_redis_connection()
+        self.blacklist_mirror = blacklist_mirror
+        self._rotate_script = self.redis.register_script(ROTATE_REFRESH_TOKEN_LUA)
+        self._revoke_indexed_script = self.redis.register_script(REVOKE_INDEXED_KEYS_LUA)
+        self._prune_index_script = self.redis.register_script(PRUNE_USER_INDEX_LUA)
+        self._gcra_script = self.redis.register_script(GCRA_LUA)
         logger.info("Redis client initialized successfully")
     
     def _create_redis_connection(self):
         try:
-            return redis.Redis(
+            return GuardedRedis(
+                breaker=self.breaker,
                 host=self.redis_host,
                 port=self.redis_port,
                 db=self.redis_db,
                 password=self.redis_password,
                 decode_responses=True,
-                socket_timeout=5,
-                socket_connect_timeout=5,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
                 retry_on_timeout=True,
             )
         except Exception as e:
@@ -42,14 +473,32 @@ class RedisClient:
             raise
     
     def is_healthy(self) -> bool:
-        """Check if Redis is healthy"""
+        """Check if Redis is healthy (circuit breaker state, no round trip)"""
+        return self.breaker.is_closed
+
+    def ping(self) -> bool:
+        """Send a PING through the breaker, e.g. to check the connection at startup"""
         try:
-            result = self.redis.ping()
-            logger.debug(f"Redis health check: {result}")
-            return result
+            return bool(self.redis.ping())
         except Exception as e:
             logger.error(f"Redis health check failed: {str(e)}")
             return False
+
+    def _start_probe(self):
+        if self._probe_thread and self._probe_thread.is_alive():
+            return
+        self._probe_thread = threading.Thread(target=self._probe_until_closed, name="redis-probe", daemon=True)
+        self._probe_thread.start()
+
+    def _probe_until_closed(self):
+        while not self.breaker.is_closed:
+            time.sleep(self.breaker.probe_interval)
+            try:
+                self.redis.probe()
+            except Exception as e:
+                logger.debug("Redis probe failed: %s", e)
+            else:
+                self.breaker.record_success()
     
     # Session management
     def _get_session_key(self, user_id: str, request: Any = None) -> str:
@@ -60,11 +509,14 @@ class RedisClient:
             return f"session:{user_id}:{client_ip}:{user_agent}"
         return f"session:{user_id}"
 
+    def prune_user_index(self, user_id: str, kind: str) -> list:
+        """Drop expired keys from a user index and return the live ones"""
+        return self._prune_index_script(keys=[user_index_key(user_id, kind)], client=self.redis)
+
     def get_user_sessions(self, user_id: str) -> list:
         """Get all active sessions for a user"""
         try:
-            pattern = f"session:{user_id}:*"
-            return [key for key in self.redis.scan_iter(match=pattern)]
+            return self.prune_user_index(user_id, SESSIONS_INDEX)
         except Exception as e:
             logger.error(f"Error getting user sessions: {str(e)}")
             return []
@@ -72,16 +524,31 @@ class RedisClient:
     def revoke_user_sessions(self, user_id: str, current_session_key: str = None):
         """Revoke all sessions for a user except the current one"""
         try:
-            sessions = self.get_user_sessions(user_id)
-            for session_key in sessions:
-                if current_session_key and session_key == current_session_key:
-                    continue
-                self.redis.delete(session_key)
+            sessions = [
+                key for key in self.get_user_sessions(user_id)
+                if not (current_session_key and key == current_session_key)
+            ]
+            if sessions:
+                pipe = self.redis.pipeline(transaction=True)
+                pipe.delete(*sessions)
+                pipe.srem(user_index_key(user_id, SESSIONS_INDEX), *sessions)
+                pipe.execute()
             return True
         except Exception as e:
             logger.error(f"Error revoking user sessions: {str(e)}")
             return False
 
+    def delete_session(self, session_key: str) -> bool:
+        """Remove a single session"""
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(session_key)
+            pipe.srem(user_index_key(session_user_id(session_key), SESSIONS_INDEX), session_key)
+            return bool(pipe.execute()[0])
+        except Exception as e:
+            logger.error(f"Error deleting session: {str(e)}")
+            return False
+
     # Token management
     def store_refresh_token(self, user_id: str, token_id: str, expires_in: int, token_family: str = None) -> bool:
         """Store refresh token with TTL
@@ -95,17 +562,48 @@ class RedisClient:
         Returns:
             bool: True if stored successfully, False otherwise
         """
+        return self.issue_tokens(user_id, token_id, expires_in, token_family)
+    
+    def issue_tokens(
+        self,
+        user_id: str,
+        token_id: str,
+        expires_in: int,
+        token_family: str = None,
+        session_key: str = None,
+        session_data: Dict[str, Any] = None,
+        session_expires_in: int = 60 * 60 * 24 * 30,
+    ) -> bool:
+        """Store a refresh token and, optionally, the login session in one round trip
+        
+        Performs the writes of ``store_refresh_token`` plus the session SETEX,
+        and the matching user index updates, as a single MULTI/EXEC pipeline,
+        so either all of them apply or none.
+        
+        Args:
+            user_id: The user ID
+            token_id: The unique token ID (jti)
+            expires_in: Refresh token TTL in seconds
+            token_family: (Optional) The token family for rotation
+            session_key: (Optional) Session key from ``_get_session_key``
+            session_data: (Optional) Session metadata to store under ``session_key``
+            session_expires_in: Session TTL in seconds
+            
+        Returns:
+            bool: True if every write succeeded, False otherwise
+        """
         try:
-            # Store the token ID with the family as value
-            if token_family:
-                family_key = f"token_family:{user_id}:{token_family}"
-                self.redis.setex(family_key, expires_in, token_id)
-                
-            # Store the token ID with a reference to its family
-            token_key = f"refresh_token:{user_id}:{token_id}"
-            return self.redis.setex(token_key, expires_in, token_family or "")
+            pipe = self.redis.pipeline(transaction=True)
+            writes = queue_token_writes(
+                pipe, user_id, token_id, expires_in, token_family,
+                session_key, session_data, session_expires_in,
+            )
+            results = pipe.execute()
+            if results[-1] > USER_INDEX_PRUNE_SIZE:
+                self.prune_user_index(user_id, REFRESH_INDEX)
+            return all(results[:writes])
         except Exception as e:
-            logger.error(f"Error storing refresh token: {str(e)}", exc_info=True)
+            logger.error(f"Error issuing tokens for user {user_id}: {str(e)}")
             return False
     
     def is_valid_refresh_token(self, user_id: str, token_id: str, token_family: str = None) -> bool:
@@ -128,30 +626,30 @@ class RedisClient:
             
             # First check if the token exists
             if not self.redis.exists(token_key):
-                logger.debug(f"Token not found in Redis: {token_key}")
+                logger.debug("Token not found in Redis: %s", token_key)
                 return False
                 
             # If no family is provided, just check if the token exists
             if not token_family:
-                logger.debug(f"No token family provided, token exists: {token_key}")
+                logger.debug("No token family provided, token exists: %s", token_key)
                 return True
                 
             # Get the stored family for this token
             stored_family = self.redis.get(token_key)
-            logger.debug(f"Token {token_id} has family: {stored_family}, expected: {token_family}")
+            logger.debug("Token %s has family: %s, expected: %s", token_id, stored_family, token_family)
             
             # If the stored family matches the expected family, token is valid
             if stored_family == token_family:
-                logger.debug(f"Token family matches for {token_id}")
+                logger.debug("Token family matches for %s", token_id)
                 return True
                 
             # Also check if this token ID is the current one for the family
             family_key = f"token_family:{user_id}:{token_family}"
             current_token_id = self.redis.get(family_key)
-            logger.debug(f"Current token ID for family {token_family}: {current_token_id}")
+            logger.debug("Current token ID for family %s: %s", token_family, current_token_id)
             
             if current_token_id and current_token_id == token_id:
-                logger.debug(f"Token {token_id} is the current token for family {token_family}")
+                logger.debug("Token %s is the current token for family %s", token_id, token_family)
                 return True
                 
             logger.warning(f"Token validation failed for user {user_id}, token {token_id}, family {token_family}")
@@ -180,6 +678,7 @@ class RedisClient:
             
             # Delete the token
             deleted = bool(self.redis.delete(token_key))
+            revoked_keys = [token_key]
             
             # If this token was part of a family, clean up the family reference
             if token_family:
@@ -187,12 +686,49 @@ class RedisClient:
                 current_token_id = self.redis.get(family_key)
                 if current_token_id == token_id:
                     self.redis.delete(family_key)
+                    revoked_keys.append(family_key)
             
+            self.redis.srem(user_index_key(user_id, REFRESH_INDEX), *revoked_keys)
             return deleted
         except Exception as e:
             logger.error(f"Error revoking refresh token: {str(e)}", exc_info=True)
             return False
     
+    def rotate_refresh_token(
+        self,
+        user_id: str,
+        token_id: str,
+        new_token_id: str,
+        expires_in: int,
+        token_family: str = None,
+    ) -> str:
+        """Atomically swap a refresh token for its successor
+        
+        Validates the presented jti against its family, revokes it and stores
+        the successor in a single server-side script, so concurrent refreshes
+        with the same token cannot both succeed. Reuse of a token rotated away
+        more than REFRESH_TOKEN_REUSE_GRACE_SECONDS ago revokes every refresh
+        token of the user in the same script.
+        
+        Args:
+            user_id: The user ID
+            token_id: The presented token ID (jti)
+            new_token_id: The successor's token ID
+            expires_in: Successor TTL in seconds
+            token_family: (Optional) The token family for rotation
+            
+        Returns:
+            str: "ok", "invalid", "reuse", or "error" if Redis failed
+        """
+        try:
+            return self._rotate_script(
+                **rotation_call(user_id, token_id, new_token_id, expires_in, token_family),
+                client=self.redis,
+            )
+        except Exception as e:
+            logger.error(f"Error rotating refresh token: {str(e)}", exc_info=True)
+            return "error"
+    
     def revoke_all_user_refresh_tokens(self, user_id: str) -> int:
         """Revoke all refresh tokens and token families for a user
         
@@ -203,19 +739,7 @@ class RedisClient:
             int: Number of tokens revoked
         """
         try:
-            # Delete all refresh tokens
-            token_pattern = f"refresh_token:{user_id}:*"
-            token_keys = self.redis.keys(token_pattern)
-            
-            # Delete all token families
-            family_pattern = f"token_family:{user_id}:*"
-            family_keys = self.redis.keys(family_pattern)
-            
-            # Delete all found keys
-            all_keys = token_keys + family_keys
-            if all_keys:
-                return self.redis.delete(*all_keys)
-            return 0
+            return self._revoke_indexed_script(keys=[user_index_key(user_id, REFRESH_INDEX)], client=self.redis)
         except Exception as e:
             logger.error(f"Error revoking all refresh tokens: {str(e)}", exc_info=True)
             return 0
@@ -227,45 +751,548 @@ class RedisClient:
         limit: int, 
         window: int = 60
     ) -> tuple[bool, int]:
-        """Check if rate limit is exceeded"""
+        """Check if rate limit is exceeded (atomic GCRA, ``limit`` per ``window`` seconds)"""
         try:
-            current = self.redis.get(key)
-            if current is None:
-                self.redis.setex(key, window, 1)
-                return False, limit - 1
-            
-            current = int(current)
-            if current >= limit:
-                return True, 0
-            
-            self.redis.incr(key)
-            return False, limit - current - 1
+            allowed, _, remaining, _, _ = self._gcra_script(
+                keys=[key], args=[window * 1000 / limit, window * 1000, 1, 1], client=self.redis
+            )
+            return not allowed, max(0, int(remaining))
         except Exception as e:
             logger.error(f"Error in rate limiting: {str(e)}")
             return False, limit
     
     # Blacklist
     def add_to_blacklist(self, token: str, expire_in_seconds: int) -> bool:
-        """Add token to blacklist"""
-        try:
-            return bool(
-                self.redis.setex(
-                    f"blacklist:{token}", 
-                    expire_in_seconds, 
-                    "1"
-                )
-            )
+        """Add token to blacklist and announce it to every worker's mirror"""
+        digest = token_digest(token)
+        expires_at = time.time() + expire_in_seconds
+        self.blacklist_mirror.add(digest, expires_at)
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.setex(f"blacklist:{token}", expire_in_seconds, "1")
+            pipe.zadd(BLACKLIST_INDEX_KEY, {digest: expires_at})
+            pipe.zremrangebyscore(BLACKLIST_INDEX_KEY, "-inf", time.time())
+            pipe.publish(BLACKLIST_CHANNEL, f"{digest}:{expires_at}")
+            return bool(pipe.execute()[0])
         except Exception as e:
             logger.error(f"Error adding to blacklist: {str(e)}")
             return False
     
     def is_blacklisted(self, token: str) -> bool:
-        """Check if token is blacklisted"""
+        """Check if token is blacklisted.
+
+        While the local mirror is in sync only possible hits cost a Redis call.
+        """
+        if self.blacklist_mirror.ready and not self.blacklist_mirror.might_contain(token_digest(token)):
+            return False
         try:
             return bool(self.redis.exists(f"blacklist:{token}"))
         except Exception as e:
             logger.error(f"Error checking blacklist: {str(e)}")
             return True  # Fail safe - if we can't check, assume token is blacklisted
 
-# Singleton instance
-redis_client = RedisClient()
+_redis_client: Optional[RedisClient] = None
+
+
+def __getattr__(name: str):
+    # The sync singleton is only used by scripts and tests, so the API
+    # workers never build its pool; it is created on first access.
+    global _redis_client
+    if name == "redis_client":
+        if _redis_client is None:
+            _redis_client = RedisClient()
+        return _redis_client
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class AsyncRedisClient:
+    """asyncio counterpart of RedisClient for use from ``async def`` code.
+
+    Exposes the same session, refresh-token, blacklist and rate-limit API as
+    coroutines, backed by a bounded ``BlockingConnectionPool``: when every
+    connection is busy, callers wait up to ``REDIS_POOL_TIMEOUT`` seconds for
+    one instead of opening more. The blacklist mirror listener holds one pool
+    connection for as long as it runs.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AsyncRedisClient, cls).__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        self.redis_host = settings.redis_host
+        self.redis_port = settings.redis_port
+        self.redis_db = settings.redis_db
+        self.redis_password = settings.redis_password
+        self.pool = aioredis.BlockingConnectionPool(
+            host=self.redis_host,
+            port=self.redis_port,
+            db=self.redis_db,
+            password=self.redis_password,
+            decode_responses=True,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+            retry_on_timeout=True,
+            health_check_interval=30,
+        )
+        self.breaker = CircuitBreaker("async")
+        self.breaker.on_open = self._start_probe
+        self._probe_task: Optional[asyncio.Task] = None
+        self.redis = GuardedAsyncRedis(connection_pool=self.pool, breaker=self.breaker)
+        self.blacklist_mirror = blacklist_mirror
+        self._rotate_script = self.redis.register_script(ROTATE_REFRESH_TOKEN_LUA)
+        self._revoke_indexed_script = self.redis.register_script(REVOKE_INDEXED_KEYS_LUA)
+        self._prune_index_script = self.redis.register_script(PRUNE_USER_INDEX_LUA)
+        self._gcra_script = self.redis.register_script(GCRA_LUA)
+        self._blacklist_task: Optional[asyncio.Task] = None
+        logger.info(
+            f"Async Redis client initialized - host: {self.redis_host}, port: {self.redis_port}, "
+            f"max connections: {REDIS_MAX_CONNECTIONS}"
+        )
+
+    async def close(self):
+        """Stop background work and release pooled connections"""
+        await self.stop_blacklist_sync()
+        if self._probe_task:
+            self._probe_task.cancel()
+            self._probe_task = None
+        await self.redis.close(close_connection_pool=True)
+
+    def is_healthy(self) -> bool:
+        """Check if Redis is healthy (circuit breaker state, no round trip)"""
+        return self.breaker.is_closed
+
+    async def ping(self) -> bool:
+        """Send a PING through the breaker, e.g. to check the connection at startup"""
+        try:
+            return bool(await self.redis.ping())
+        except Exception as e:
+            logger.error(f"Redis health check failed: {str(e)}")
+            return False
+
+    def _start_probe(self):
+        if self._probe_task and not self._probe_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._probe_task = loop.create_task(self._probe_until_closed(), name="redis-probe")
+
+    async def _probe_until_closed(self):
+        while not self.breaker.is_closed:
+            await asyncio.sleep(self.breaker.probe_interval)
+            try:
+                await self.redis.probe()
+            except Exception as e:
+                logger.debug("Redis probe failed: %s", e)
+            else:
+                self.breaker.record_success()
+
+    # Session management
+    _get_session_key = RedisClient._get_session_key
+
+    async def prune_user_index(self, user_id: str, kind: str) -> list:
+        """Drop expired keys from a user index and return the live ones"""
+        return await self._prune_index_script(keys=[user_index_key(user_id, kind)], client=self.redis)
+
+    async def get_user_sessions(self, user_id: str) -> list:
+        """Get all active sessions for a user"""
+        try:
+            return await self.prune_user_index(user_id, SESSIONS_INDEX)
+        except Exception as e:
+            logger.error(f"Error getting user sessions: {str(e)}")
+            return []
+
+    async def revoke_user_sessions(self, user_id: str, current_session_key: str = None):
+        """Revoke all sessions for a user except the current one"""
+        try:
+            sessions = [
+                key for key in await self.get_user_sessions(user_id)
+                if not (current_session_key and key == current_session_key)
+            ]
+            if sessions:
+                pipe = self.redis.pipeline(transaction=True)
+                pipe.delete(*sessions)
+                pipe.srem(user_index_key(user_id, SESSIONS_INDEX), *sessions)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error revoking user sessions: {str(e)}")
+            return False
+
+    async def delete_session(self, session_key: str) -> bool:
+        """Remove a single session"""
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(session_key)
+            pipe.srem(user_index_key(session_user_id(session_key), SESSIONS_INDEX), session_key)
+            return bool((await pipe.execute())[0])
+        except Exception as e:
+            logger.error(f"Error deleting session: {str(e)}")
+            return False
+
+    # Token management
+    async def store_refresh_token(self, user_id: str, token_id: str, expires_in: int, token_family: str = None) -> bool:
+        """Store refresh token with TTL (see RedisClient.store_refresh_token)"""
+        return await self.issue_tokens(user_id, token_id, expires_in, token_family)
+
+    async def issue_tokens(
+        self,
+        user_id: str,
+        token_id: str,
+        expires_in: int,
+        token_family: str = None,
+        session_key: str = None,
+        session_data: Dict[str, Any] = None,
+        session_expires_in: int = 60 * 60 * 24 * 30,
+    ) -> bool:
+        """Store a refresh token and, optionally, the login session in one round trip
+        
+        Returns:
+            bool: True if every write succeeded, False otherwise
+        """
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            writes = queue_token_writes(
+                pipe, user_id, token_id, expires_in, token_family,
+                session_key, session_data, session_expires_in,
+            )
+            results = await pipe.execute()
+            if results[-1] > USER_INDEX_PRUNE_SIZE:
+                await self.prune_user_index(user_id, REFRESH_INDEX)
+            return all(results[:writes])
+        except Exception as e:
+            logger.error(f"Error issuing tokens for user {user_id}: {str(e)}")
+            return False
+
+    async def is_valid_refresh_token(self, user_id: str, token_id: str, token_family: str = None) -> bool:
+        """Check if refresh token is valid and belongs to the specified family
+        
+        Returns:
+            bool: True if the token is valid, False otherwise
+        """
+        try:
+            token_key = f"refresh_token:{user_id}:{token_id}"
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(token_key)
+            if token_family:
+                pipe.get(f"token_family:{user_id}:{token_family}")
+            results = await pipe.execute()
+            stored_family = results[0]
+
+            if stored_family is None:
+                logger.debug("Token not found in Redis: %s", token_key)
+                return False
+            if not token_family or stored_family == token_family:
+                return True
+            if results[1] == token_id:
+                return True
+
+            logger.warning(f"Token validation failed for user {user_id}, token {token_id}, family {token_family}")
+            return False
+        except Exception as e:
+            logger.error(f"Error validating refresh token: {str(e)}", exc_info=True)
+            # Same trade-off as RedisClient: fail open to avoid locking users out
+            return True
+
+    async def revoke_refresh_token(self, user_id: str, token_id: str) -> bool:
+        """Revoke a specific refresh token by its ID
+        
+        Returns:
+            bool: True if token was found and deleted, False otherwise
+        """
+        try:
+            token_key = f"refresh_token:{user_id}:{token_id}"
+            token_family = await self.redis.get(token_key)
+            deleted = bool(await self.redis.delete(token_key))
+            revoked_keys = [token_key]
+            if token_family:
+                family_key = f"token_family:{user_id}:{token_family}"
+                if await self.redis.get(family_key) == token_id:
+                    await self.redis.delete(family_key)
+                    revoked_keys.append(family_key)
+            await self.redis.srem(user_index_key(user_id, REFRESH_INDEX), *revoked_keys)
+            return deleted
+        except Exception as e:
+            logger.error(f"Error revoking refresh token: {str(e)}", exc_info=True)
+            return False
+
+    async def rotate_refresh_token(
+        self,
+        user_id: str,
+        token_id: str,
+        new_token_id: str,
+        expires_in: int,
+        token_family: str = None,
+    ) -> str:
+        """Atomically swap a refresh token for its successor
+        
+        Validates the presented jti against its family, revokes it and stores
+        the successor in a single server-side script, so concurrent refreshes
+        with the same token cannot both succeed. Reuse of a token rotated away
+        more than REFRESH_TOKEN_REUSE_GRACE_SECONDS ago revokes every refresh
+        token of the user in the same script.
+        
+        Args:
+            user_id: The user ID
+            token_id: The presented token ID (jti)
+            new_token_id: The successor's token ID
+            expires_in: Successor TTL in seconds
+            token_family: (Optional) The token family for rotation
+            
+        Returns:
+            str: "ok", "invalid", "reuse", or "error" if Redis failed
+        """
+        try:
+            return await self._rotate_script(
+                **rotation_call(user_id, token_id, new_token_id, expires_in, token_family),
+                client=self.redis,
+            )
+        except Exception as e:
+            logger.error(f"Error rotating refresh token: {str(e)}", exc_info=True)
+            return "error"
+    
+    async def revoke_all_user_refresh_tokens(self, user_id: str) -> int:
+        """Revoke all refresh tokens and token families for a user
+        
+        Returns:
+            int: Number of tokens revoked
+        """
+        try:
+            return await self._revoke_indexed_script(keys=[user_index_key(user_id, REFRESH_INDEX)], client=self.redis)
+        except Exception as e:
+            logger.error(f"Error revoking all refresh tokens: {str(e)}", exc_info=True)
+            return 0
+
+    async def backfill_user_indexes(self, batch_size: int = 500) -> int:
+        """Add sessions, refresh tokens and families missing from their user index
+
+        Keys issued before the per-user indexes existed would otherwise be
+        invisible to get_user_sessions and survive revoke_all_user_refresh_tokens.
+        Run once per deployment from the app lifespan (see run_backfill).
+
+        Returns:
+            int: Number of keys added to an index
+        """
+        added = 0
+        for pattern, kind in USER_INDEX_BACKFILL:
+            batch = []
+            async for key in self.redis.scan_iter(match=pattern, count=1000):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    added += await self._index_user_keys(batch, kind)
+                    batch = []
+            if batch:
+                added += await self._index_user_keys(batch, kind)
+        return added
+
+    async def _index_user_keys(self, keys: list, kind: str) -> int:
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(key)
+        ttls = await pipe.execute()
+        pipe = self.redis.pipeline(transaction=False)
+        for key, ttl in zip(keys, ttls):
+            if ttl == -2:
+                continue  # expired since the scan
+            index = user_index_key(session_user_id(key), kind)
+            pipe.sadd(index, key)
+            pipe.expire(index, max(USER_INDEX_TTL, ttl))
+        results = await pipe.execute()
+        return sum(results[::2])
+
+    # Rate limiting
+    async def is_rate_limited(self, key: str, limit: int, window: int = 60) -> tuple[bool, int]:
+        """Check if rate limit is exceeded (atomic GCRA, ``limit`` per ``window`` seconds)"""
+        try:
+            allowed, _, remaining, _, _ = await self._gcra_script(
+                keys=[key], args=[window * 1000 / limit, window * 1000, 1, 1], client=self.redis
+            )
+            return not allowed, max(0, int(remaining))
+        except Exception as e:
+            logger.error(f"Error in rate limiting: {str(e)}")
+            return False, limit
+
+    # Read-your-writes window of the database replica router
+    async def mark_recent_write(self, identity: str, seconds: int) -> None:
+        """Remember for ``seconds`` that ``identity`` changed data on the primary"""
+        await self.redis.set(f"recent_write:{identity}", "1", ex=seconds)
+
+    async def has_recent_write(self, identity: str) -> bool:
+        """Check whether ``identity`` is inside its read-your-writes window.
+
+        Errors propagate so the router can fall back to the primary.
+        """
+        return bool(await self.redis.exists(f"recent_write:{identity}"))
+
+    # Persisted GraphQL queries; errors propagate to the store, which falls
+    # back to its per-worker copy
+    async def get_persisted_query(self, digest: str) -> Optional[str]:
+        return await self.redis.get(f"apq:{digest}")
+
+    async def set_persisted_query(self, digest: str, query: str, seconds: int) -> None:
+        await self.redis.set(f"apq:{digest}", query, ex=seconds)
+
+    # Blacklist
+    async def add_to_blacklist(self, token: str, expire_in_seconds: int) -> bool:
+        """Add token to blacklist and announce it to every worker's mirror"""
+        digest = token_digest(token)
+        expires_at = time.time() + expire_in_seconds
+        self.blacklist_mirror.add(digest, expires_at)
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.setex(f"blacklist:{token}", expire_in_seconds, "1")
+            pipe.zadd(BLACKLIST_INDEX_KEY, {digest: expires_at})
+            pipe.zremrangebyscore(BLACKLIST_INDEX_KEY, "-inf", time.time())
+            pipe.publish(BLACKLIST_CHANNEL, f"{digest}:{expires_at}")
+            return bool((await pipe.execute())[0])
+        except Exception as e:
+            logger.error(f"Error adding to blacklist: {str(e)}")
+            return False
+
+    async def is_blacklisted(self, token: str) -> bool:
+        """Check if token is blacklisted.
+
+        While the local mirror is in sync only possible hits cost a Redis call.
+        """
+        if self.blacklist_mirror.ready and not self.blacklist_mirror.might_contain(token_digest(token)):
+            return False
+        try:
+            return bool(await self.redis.exists(f"blacklist:{token}"))
+        except Exception as e:
+            logger.error(f"Error checking blacklist: {str(e)}")
+            return True  # Fail safe - if we can't check, assume token is blacklisted
+
+    async def run_backfill(self, name: str, backfill) -> Optional[int]:
+        """Await ``backfill()`` unless another worker has claimed backfill ``name``
+
+        Returns:
+            Optional[int]: The backfill's result, or None if it was skipped
+        """
+        lock = f"backfill:{name}"
+        if not await self.redis.set(lock, "1", nx=True, ex=REDIS_BACKFILL_LOCK_SECONDS):
+            return None
+        try:
+            return await backfill()
+        except Exception:
+            # Let the next worker to start retry it
+            await self.redis.delete(lock)
+            raise
+
+    async def backfill_blacklist_index(self, batch_size: int = 500) -> int:
+        """Index ``blacklist:{token}`` keys that were written without an index entry
+
+        Tokens revoked before the index existed would otherwise be a miss on
+        a ready mirror. Each entry is also published, so mirrors that loaded
+        their snapshot while the backfill ran pick it up.
+
+        Returns:
+            int: Number of entries added to the index
+        """
+        added = 0
+        batch = []
+        async for key in self.redis.scan_iter(match="blacklist:*", count=1000):
+            if key != BLACKLIST_INDEX_KEY:
+                batch.append(key)
+            if len(batch) >= batch_size:
+                added += await self._index_blacklist_keys(batch)
+                batch = []
+        if batch:
+            added += await self._index_blacklist_keys(batch)
+        return added
+
+    async def _index_blacklist_keys(self, keys: list) -> int:
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(key)
+        ttls = await pipe.execute()
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        for key, ttl in zip(keys, ttls):
+            if ttl == -2:
+                continue  # expired since the scan
+            digest = token_digest(key[len("blacklist:"):])
+            expires_at = now + ttl if ttl > 0 else float("inf")
+            pipe.zadd(BLACKLIST_INDEX_KEY, {digest: expires_at}, nx=True)
+            pipe.publish(BLACKLIST_CHANNEL, f"{digest}:{expires_at}")
+        results = await pipe.execute()
+        return sum(results[::2])
+
+    async def load_blacklist_snapshot(self) -> int:
+        """Replace the local mirror with the unexpired entries of the Redis index
+
+        The first worker to load a snapshot in a deployment first indexes
+        any blacklisted tokens the index does not know about yet.
+        """
+        added = await self.run_backfill("blacklist_index", self.backfill_blacklist_index)
+        if added:
+            logger.info(f"Indexed {added} blacklisted tokens revoked before the blacklist index existed")
+        entries = await self.redis.zrangebyscore(BLACKLIST_INDEX_KEY, time.time(), "+inf", withscores=True)
+        self.blacklist_mirror.load({digest: score for digest, score in entries})
+        return len(entries)
+
+    def _handle_blacklist_event(self, data: str):
+        digest, _, expires_at = data.rpartition(":")
+        try:
+            self.blacklist_mirror.add(digest, float(expires_at))
+        except ValueError:
+            logger.warning(f"Ignoring malformed blacklist event: {data!r}")
+
+    async def _run_blacklist_sync(self, poll_interval: float = 1.0):
+        backoff = 1.0
+        last_prune = time.monotonic()
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(BLACKLIST_CHANNEL)
+                # Subscribe before taking the snapshot so no revocation falls in between
+                count = await self.load_blacklist_snapshot()
+                logger.info(f"Blacklist mirror loaded {count} revoked tokens")
+                backoff = 1.0
+                while True:
+                    message = await pubsub.get_message(timeout=poll_interval)
+                    if message and message.get("type") == "message":
+                        self._handle_blacklist_event(message["data"])
+                    if time.monotonic() - last_prune > 60:
+                        self.blacklist_mirror.prune()
+                        last_prune = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.blacklist_mirror.invalidate()
+                logger.warning(f"Blacklist mirror out of sync, falling back to Redis lookups: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+
+    def start_blacklist_sync(self):
+        """Start the task that keeps the blacklist mirror current (needs a running loop)"""
+        if self._blacklist_task and not self._blacklist_task.done():
+            return
+        self._blacklist_task = asyncio.get_running_loop().create_task(
+            self._run_blacklist_sync(), name="blacklist-mirror"
+        )
+
+    async def stop_blacklist_sync(self):
+        """Stop the mirror task; lookups fall back to Redis"""
+        task, self._blacklist_task = self._blacklist_task, None
+        if task:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self.blacklist_mirror.invalidate()
+
+
+async_redis_client = AsyncRedisClient()
@@ -1,33 +1,36 @@
 import json
 import logging
-import os
 from datetime import datetime, timedelta
 import uuid
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 import jwt
 
-# Enable debug logging
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger(__name__)
-from jose import JWTError
+from jose import JWTError, jwt as jose_jwt
+
+from backend.settings import get_settings
 
 # Get environment
-ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+ENVIRONMENT = get_settings().environment or "development"
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field, EmailStr
 
 from backend import models, schemas, crud
-from backend.database import get_db
+from backend.database import get_db, get_async_db
 from backend.auth import (
     authenticate_user,
     create_access_token,
     create_refresh_token,
     get_current_user,
-    verify_password,
-    get_password_hash,
+    get_current_user_async,
+    invalidate_principal,
+    forget_token,
+    verify_password_async,
+    get_password_hash_async,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     REFRESH_TOKEN_EXPIRE_DAYS,
     SECRET_KEY,
@@ -35,8 +38,9 @@ from backend.auth import (
     TOKEN_AUDIENCE,
     TOKEN_ISSUER
 )
-from backend.redis_client import redis_client
+from backend.redis_client import async_redis_client
 from backend.security import limiter
+from backend.password_hasher import PasswordHasherOverloaded
 
 logger = logging.getLogger(__name__)
 
@@ -72,7 +76,58 @@ class LoginRequest(BaseModel):
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-async def create_token_response(user: models.User, db: Session, token_family: str = None, remember_me: bool = False) -> TokenResponse:
+def session_record(request: Request) -> dict:
+    """Session metadata stored alongside the tokens issued to a client"""
+    return {
+        'user_agent': request.headers.get('user-agent', 'unknown'),
+        'ip': request.client.host if request.client else 'unknown',
+        'last_active': datetime.utcnow().isoformat()
+    }
+
+async def rotate_refresh_token(user_id: str, token_id: str, new_token_id: str, expires_in: int, token_family: str):
+    """
+    Swap a presented refresh token for its successor in one Redis round trip.
+    
+    Raises:
+        HTTPException: 401 if the token is unknown or was already rotated
+            (reuse outside the grace period revokes every refresh token of
+            the user), 503 if Redis failed outside development
+    """
+    result = await async_redis_client.rotate_refresh_token(
+        user_id=user_id,
+        token_id=token_id,
+        new_token_id=new_token_id,
+        expires_in=expires_in,
+        token_family=token_family
+    )
+    if result == "ok":
+        return
+    if result == "error":
+        if ENVIRONMENT == "development":
+            logger.warning("Development mode: issuing tokens despite Redis error during rotation")
+            return
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": "token_validation_error",
+                "message": "Error validating token. Please try again."
+            }
+        )
+    if result == "reuse":
+        # The rotation script has already revoked every refresh token of the user
+        logger.warning(f"Refresh token reuse detected for user {user_id}, family {token_family}")
+    else:
+        logger.warning(f"Invalid or revoked refresh token for user {user_id}, token_id: {token_id}")
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail={
+            "error": "invalid_token",
+            "message": "Invalid or revoked refresh token. Please log in again."
+        },
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+async def create_token_response(user: models.User, db: Union[Session, AsyncSession], token_family: str = None, remember_me: bool = False, request: Request = None, previous_token_id: str = None) -> TokenResponse:
     """
     Helper function to create token response for both login and token endpoints.
     
@@ -81,19 +136,27 @@ async def create_token_response(user: models.User, db: Session, token_family: st
         db: Database session
         token_family: Optional token family for refresh token rotation
         remember_me: Whether to set a longer refresh token expiration
+        request: Optional request; when given the client session is stored
+            in the same Redis round trip as the refresh token
+        previous_token_id: jti of the refresh token being rotated; it is
+            validated and swapped for the new one atomically
         
     Returns:
         TokenResponse: A response object containing tokens and user info
+        
+    Raises:
+        HTTPException: 401 if the rotated token is invalid or was reused,
+            503 if Redis is unavailable outside development
     """
     try:
-        logger.debug(f"Starting token creation for user ID: {user.id}")
+        logger.debug("Starting token creation for user ID: %s", user.id)
         
         # Get role name safely
         role_name = None
         if user.role:
             if hasattr(user.role, 'name'):
                 role_name = user.role.name
-                logger.debug(f"User role name: {role_name}")
+                logger.debug("User role name: %s", role_name)
             else:
                 logger.warning(f"User role exists but has no 'name' attribute: {user.role}")
         else:
@@ -106,7 +169,7 @@ async def create_token_response(user: models.User, db: Session, token_family: st
             "email": user.email or ""
         }
         
-        logger.debug(f"Creating access token with claims: {additional_claims}")
+        logger.debug("Creating access token with claims: %s", additional_claims)
         
         try:
             access_token = create_access_token(
@@ -129,27 +192,23 @@ async def create_token_response(user: models.User, db: Session, token_family: st
             expires_delta=timedelta(days=refresh_token_days)
         )    
         
-        # If no token family is provided, generate a new one (for new sessions)
-        if not token_family:
-            token_family = str(uuid.uuid4())
-            
-        # Create a unique token ID for this refresh token
-        token_id = str(uuid.uuid4())
+        token_id = jose_jwt.get_unverified_claims(refresh_token)["jti"]
+        refresh_expires_in = int(timedelta(days=refresh_token_days).total_seconds())
         
-        # Store the refresh token in Redis with the token ID and family
-        if redis_client.is_healthy():
-            try:
-                stored = redis_client.store_refresh_token(
-                    user_id=str(user.id),
-                    token_id=token_id,
-                    expires_in=int(timedelta(days=refresh_token_days).total_seconds()),
-                    token_family=token_family
-                )
-                
-                if not stored:
-                    logger.error(f"Failed to store refresh token in Redis for user {user.id}")
-            except Exception as e:
-                logger.error(f"Error storing refresh token in Redis: {str(e)}")
+        if previous_token_id:
+            await rotate_refresh_token(str(user.id), previous_token_id, token_id, refresh_expires_in, token_family)
+        else:
+            # Register the refresh token's jti (and the session, on login) in one pipeline
+            stored = await async_redis_client.issue_tokens(
+                user_id=str(user.id),
+                token_id=token_id,
+                expires_in=refresh_expires_in,
+                token_family=token_family,
+                session_key=async_redis_client._get_session_key(str(user.id), request) if request else None,
+                session_data=session_record(request) if request else None
+            )
+            if not stored:
+                logger.error(f"Failed to store refresh token in Redis for user {user.id}")
         
         # Convert user object to dictionary with proper serialization
         user_data = {
@@ -176,6 +235,8 @@ async def create_token_response(user: models.User, db: Session, token_family: st
         
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating token response: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -196,15 +257,16 @@ class LoginForm:
         self.client_id = None
         self.client_secret = None
 
-def create_auth_response(token_data: dict, response_model: TokenResponse, request: Request = None, user_id: str = None):
+def create_auth_response(token_data: dict, response_model: TokenResponse):
     """
-    Helper function to create a response with auth cookies and manage sessions
+    Helper function to create a response with auth cookies.
+    
+    The client session is stored by create_token_response together with
+    the refresh token.
     
     Args:
         token_data: Dictionary containing access_token and refresh_token
         response_model: The TokenResponse model
-        request: The incoming request (for session tracking)
-        user_id: The user ID (for session tracking)
     """
     from fastapi.responses import JSONResponse
     
@@ -235,23 +297,6 @@ def create_auth_response(token_data: dict, response_model: TokenResponse, reques
         domain=None
     )
     
-    # Store the session if request and user_id are provided
-    if request and user_id:
-        session_key = redis_client._get_session_key(user_id, request)
-        try:
-            # Store the session with the same expiry as the refresh token
-            redis_client.redis.setex(
-                session_key,
-                60 * 60 * 24 * 30,  # 30 days
-                json.dumps({
-                    'user_agent': request.headers.get('user-agent', 'unknown'),
-                    'ip': request.client.host if request.client else 'unknown',
-                    'last_active': datetime.utcnow().isoformat()
-                })
-            )
-        except Exception as e:
-            logger.error(f"Error storing session: {str(e)}")
-    
     return response
 
 @router.post("/login", response_model=TokenResponse, status_code=status.HTTP_200_OK)
@@ -260,7 +305,7 @@ def create_auth_response(token_data: dict, response_model: TokenResponse, reques
 async def login(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Handle user login with OAuth2 password flow.
@@ -288,12 +333,10 @@ async def login(
                 detail={"error": "internal_error", "message": "Failed to process login"}
             )
         
-        # Create response with auth cookies and session tracking
+        # Create response with auth cookies
         return create_auth_response(
             token_response.dict(), 
-            token_response,
-            request=request,
-            user_id=user_id
+            token_response
         )
         
     except HTTPException as he:
@@ -311,7 +354,7 @@ async def login(
 async def login_json(
     request: Request,
     credentials: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Store remember_me in request state to be used in create_auth_response
     request.state.remember_me = credentials.remember_me
@@ -331,12 +374,12 @@ async def login_json(
         logger.info(f"JSON login attempt for user: {credentials.username} from {client_ip}")
         
         # Log the incoming request data for debugging
-        logger.debug(f"Login request data: {credentials}")
+        logger.debug("Login request for username: %s", credentials.username)
         
         # Process the login and get the token response
         logger.debug("Calling process_login...")
         login_form = LoginForm(credentials.username, credentials.password)
-        logger.debug(f"Created login form with username: {login_form.username}")
+        logger.debug("Created login form with username: %s", login_form.username)
         
         token_response = await process_login(login_form, request, db)
         logger.debug("Successfully processed login")
@@ -358,15 +401,13 @@ async def login_json(
             )
         
         # Log successful user ID extraction
-        logger.debug(f"Extracted user ID: {user_id}")
+        logger.debug("Extracted user ID: %s", user_id)
         
-        # Create response with auth cookies and session tracking
+        # Create response with auth cookies
         logger.debug("Creating auth response...")
         response = create_auth_response(
             token_response.dict(), 
-            token_response,
-            request=request,
-            user_id=user_id
+            token_response
         )
         
         logger.debug("Login successful, returning response")
@@ -404,12 +445,13 @@ async def login_json(
         # Add more context to the error response
         if he.status_code == 401:
             # Log additional debug info for auth failures
-            user = db.query(models.User).filter(models.User.email == credentials.username).first()
+            result = await db.execute(select(models.User).where(models.User.email == credentials.username))
+            user = result.scalars().first()
             if user:
-                logger.debug(f"User found but authentication failed for: {user.email}")
-                logger.debug(f"User active: {user.is_active}, Verified: {user.is_verified}")
+                logger.debug("User found but authentication failed for: %s", user.email)
+                logger.debug("User active: %s, Verified: %s", user.is_active, user.is_verified)
             else:
-                logger.debug(f"No user found with email: {credentials.username}")
+                logger.debug("No user found with email: %s", credentials.username)
         raise
         
     except Exception as e:
@@ -437,14 +479,14 @@ def clear_auth_cookies():
     return response
 
 # Move the login processing to a separate function to avoid code duplication
-async def process_login(form_data: LoginForm, request: Request, db: Session) -> TokenResponse:
+async def process_login(form_data: LoginForm, request: Request, db: AsyncSession) -> TokenResponse:
     """
     Process login with the provided form data and return a TokenResponse.
     
     Args:
         form_data: Login form data containing username and password
         request: The incoming request
-        db: Database session
+        db: Async database session
         
     Returns:
         TokenResponse: Response containing access token, refresh token, and user info
@@ -453,13 +495,14 @@ async def process_login(form_data: LoginForm, request: Request, db: Session) ->
         # Log login attempt (without password)
         client_host = request.client.host if request.client else "unknown"
         logger.info(f"Login attempt for user: {form_data.username} from {client_host}")
-        logger.debug(f"Login form data - username: {form_data.username}")
+        logger.debug("Login form data - username: %s", form_data.username)
         
         # Get the user from the database
         logger.debug("Querying database for user...")
-        user = db.query(models.User).filter(
-            models.User.email == form_data.username
-        ).first()
+        result = await db.execute(
+            select(models.User).where(models.User.email == form_data.username)
+        )
+        user = result.scalars().first()
         
         if not user:
             logger.warning(f"No user found with email: {form_data.username}")
@@ -471,43 +514,30 @@ async def process_login(form_data: LoginForm, request: Request, db: Session) ->
                 }
             )
         
-        logger.debug(f"User found in DB: {user.email}, ID: {user.id}")
-        logger.debug(f"User active: {user.is_active}, Verified: {user.is_verified}")
+        logger.debug("User found in DB: %s, ID: %s", user.email, user.id)
+        logger.debug("User active: %s, Verified: %s", user.is_active, user.is_verified)
         
-        # Verify the password
+        # Verify the password on the password hasher pool so bcrypt never blocks the event loop
         logger.debug("Verifying password...")
         try:
-            from backend.auth import verify_password
-            is_password_valid = verify_password(form_data.password, user.hashed_password)
-            logger.debug(f"Password verification result: {is_password_valid}")
+            is_password_valid = await verify_password_async(form_data.password, user.hashed_password)
+            logger.debug("Password verification result: %s", is_password_valid)
+        except PasswordHasherOverloaded:
+            logger.warning(f"Password hasher overloaded, rejecting login for: {form_data.username}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={
+                    "error": "service_busy",
+                    "message": "Too many login attempts in progress. Please try again shortly."
+                },
+                headers={"Retry-After": "1"}
+            )
         except Exception as e:
             logger.error(f"Error during password verification: {str(e)}", exc_info=True)
             is_password_valid = False
         
         if not is_password_valid:
             logger.warning(f"Invalid password for user: {form_data.username}")
-            # Add debug info about the password hashes
-            try:
-                from backend.auth import get_password_hash
-                test_hash = get_password_hash(form_data.password)
-                logger.debug(f"Input password: {form_data.password}")
-                logger.debug(f"Input password hash: {test_hash}")
-                logger.debug(f"Stored password hash: {user.hashed_password}")
-                
-                # Debug: Try to verify with direct bcrypt
-                import bcrypt
-                try:
-                    bcrypt_valid = bcrypt.checkpw(
-                        form_data.password.encode('utf-8'),
-                        user.hashed_password.encode('utf-8')
-                    )
-                    logger.debug(f"Direct bcrypt verification: {bcrypt_valid}")
-                except Exception as bcrypt_err:
-                    logger.error(f"Direct bcrypt verification failed: {str(bcrypt_err)}")
-                    
-            except Exception as e:
-                logger.error(f"Error during password debug: {str(e)}", exc_info=True)
-                
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail={
@@ -540,12 +570,13 @@ async def process_login(form_data: LoginForm, request: Request, db: Session) ->
             
         # Update last login
         try:
-            logger.debug(f"Updating last login for user: {user.email}")
+            logger.debug("Updating last login for user: %s", user.email)
             user.last_login = datetime.utcnow()
-            db.commit()
+            await db.commit()
             logger.debug("Last login updated successfully")
         except Exception as e:
             logger.error(f"Error updating last login: {str(e)}", exc_info=True)
+            await db.rollback()
             # Don't fail the login if we can't update last login
         
         logger.info(f"Successful login for user: {user.email}")
@@ -553,7 +584,7 @@ async def process_login(form_data: LoginForm, request: Request, db: Session) ->
         # Create and return token response
         logger.debug("Creating token response...")
         try:
-            token_response = await create_token_response(user, db)
+            token_response = await create_token_response(user, db, request=request)
             logger.debug("Token response created successfully")
             
             # Ensure we're returning a proper TokenResponse object
@@ -609,7 +640,7 @@ async def process_login(form_data: LoginForm, request: Request, db: Session) ->
 async def refresh_token(
     request: Request,
     token_data: RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Refresh access token using a valid refresh token.
@@ -651,10 +682,10 @@ async def refresh_token(
             user_id = payload.get("sub")
             token_family = payload.get("tf")  # Token family for rotation
             
-            logger.debug(f"Decoded token - user_id: {user_id}, token_id: {token_id}, family: {token_family}")
+            logger.debug("Decoded token - user_id: %s, token_id: %s, family: %s", user_id, token_id, token_family)
             
-            if not token_id or not user_id:
-                logger.warning(f"Missing required token fields: jti={token_id}, sub={user_id}")
+            if not token_id or not user_id or not token_family:
+                logger.warning(f"Missing required token fields: jti={token_id}, sub={user_id}, tf={token_family}")
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail={
@@ -685,10 +716,9 @@ async def refresh_token(
                 headers={"WWW-Authenticate": "Bearer"}
             )
             
-        # Check if Redis is available
-        if not redis_client.is_healthy():
-            error_msg = "Redis is not available, cannot validate refresh token"
-            logger.error(error_msg)
+        # Fail fast if Redis is known to be down
+        if not async_redis_client.is_healthy():
+            logger.error("Redis is not available, cannot validate refresh token")
             # In development, we might want to be more lenient
             if ENVIRONMENT == "development":
                 logger.warning("Running in development mode, bypassing Redis validation")
@@ -700,53 +730,16 @@ async def refresh_token(
                         "message": "Authentication service is currently unavailable. Please try again later."
                     }
                 )
-        else:
-            # Check if the refresh token is valid in Redis
-            logger.debug(f"Validating refresh token in Redis - user_id: {user_id}, token_id: {token_id}")
-            try:
-                is_valid = redis_client.is_valid_refresh_token(user_id, token_id, token_family)
-                logger.debug(f"Refresh token validation result: {is_valid}")
-                
-                if not is_valid:
-                    logger.warning(f"Invalid or revoked refresh token for user {user_id}, token_id: {token_id}")
-                    
-                    # If this was part of a family, we should revoke all tokens in the family
-                    if token_family:
-                        logger.warning(f"Potential token reuse detected for user {user_id}, family {token_family}")
-                        # Revoke all tokens for this user as a security measure
-                        redis_client.revoke_all_user_refresh_tokens(user_id)
-                        
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail={
-                            "error": "invalid_token",
-                            "message": "Invalid or revoked refresh token. Please log in again."
-                        },
-                        headers={"WWW-Authenticate": "Bearer"}
-                    )
-            except Exception as e:
-                logger.error(f"Error validating refresh token in Redis: {str(e)}", exc_info=True)
-                if ENVIRONMENT != "development":
-                    raise HTTPException(
-                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                        detail={
-                            "error": "token_validation_error",
-                            "message": "Error validating token. Please try again."
-                        }
-                    )
-                # In development, continue with token validation even if Redis fails
-                logger.warning("Development mode: Continuing with token validation despite Redis error")
-            
-        logger.debug("Token is valid in Redis")
             
         # Get the user from the database
-        logger.debug(f"Fetching user from database - user_id: {user_id}")
-        user = crud.get_user(db, user_id=user_id)
+        logger.debug("Fetching user from database - user_id: %s", user_id)
+        user = await crud.get_user_async(db, user_id=user_id)
         if not user or not user.is_active:
             logger.warning(f"User not found or inactive: {user_id}")
+            invalidate_principal(user_id)
             # Revoke all tokens for this user as they are no longer active
-            if redis_client.is_healthy():
-                redis_client.revoke_all_user_refresh_tokens(user_id)
+            if async_redis_client.is_healthy():
+                await async_redis_client.revoke_all_user_refresh_tokens(user_id)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail={
@@ -756,25 +749,19 @@ async def refresh_token(
                 headers={"WWW-Authenticate": "Bearer"}
             )
             
-        # Revoke the old refresh token as part of token rotation
-        logger.debug(f"Revoking old refresh token - user_id: {user_id}, token_id: {token_id}")
-        if redis_client.is_healthy():
-            revoked = redis_client.revoke_refresh_token(user_id=user_id, token_id=token_id)
-            if not revoked:
-                logger.warning(f"Failed to revoke refresh token for user {user_id}, token_id: {token_id}")
-        else:
-            logger.warning("Skipping token revocation - Redis is not available")
-            
-        # Create new tokens with the same token family (or a new one if this was the first token)
+        # Validate, revoke and replace the presented token in one atomic step
         logger.debug("Creating new token response...")
         try:
             token_response = await create_token_response(
                 user=user,
                 db=db,
-                token_family=token_family or str(uuid.uuid4())  # Keep same family or create new one
+                token_family=token_family,
+                previous_token_id=token_id
             )
             logger.debug("Successfully created new token response")
             return token_response
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error creating token response: {str(e)}", exc_info=True)
             raise HTTPException(
@@ -819,6 +806,7 @@ async def logout(
     """
     try:
         user_id = str(current_user.id)
+        invalidate_principal(user_id)
         
         # Get the access token from the Authorization header
         auth_header = request.headers.get("Authorization")
@@ -828,20 +816,21 @@ async def logout(
             token = auth_header.split(" ")[1]
             try:
                 # Add the access token to the blacklist
-                redis_client.add_to_blacklist(token, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+                await async_redis_client.add_to_blacklist(token, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+                forget_token(token)
                 
                 # Get current session key
-                current_session_key = redis_client._get_session_key(user_id, request)
+                current_session_key = async_redis_client._get_session_key(user_id, request)
                 
                 # If logging out all devices, revoke all sessions
                 if logout_data and logout_data.all_devices:
-                    redis_client.revoke_user_sessions(user_id)
-                    redis_client.revoke_all_user_refresh_tokens(user_id)
+                    await async_redis_client.revoke_user_sessions(user_id)
+                    await async_redis_client.revoke_all_user_refresh_tokens(user_id)
                     logger.info(f"User {user_id} logged out from all devices and sessions")
                 else:
                     # Only revoke the current session
                     if current_session_key:
-                        redis_client.redis.delete(current_session_key)
+                        await async_redis_client.delete_session(current_session_key)
                     if logout_data and logout_data.refresh_token:
                         # Extract token ID from the refresh token
                         try:
@@ -854,7 +843,7 @@ async def logout(
                             )
                             token_id = payload.get("jti")
                             if token_id:
-                                redis_client.revoke_refresh_token(
+                                await async_redis_client.revoke_refresh_token(
                                     user_id=user_id,
                                     token_id=token_id
                                 )
@@ -879,8 +868,7 @@ async def logout(
         logger.error(f"Error during logout: {str(e)}\n{error_details}")
         
         # Return more detailed error information in development
-        import os
-        if os.getenv("ENVIRONMENT", "development") == "development":
+        if ENVIRONMENT == "development":
             return {
                 "detail": "An error occurred during logout",
                 "error": str(e),
@@ -923,7 +911,14 @@ async def register(
         )
     
     # Hash the password
-    hashed_password = get_password_hash(user_data.password)
+    try:
+        hashed_password = await get_password_hash_async(user_data.password)
+    except PasswordHasherOverloaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please try again shortly.",
+            headers={"Retry-After": "1"}
+        )
     
     # Create new user
     db_user = models.User(
@@ -959,8 +954,7 @@ async def register(
     summary="Get current user information"
 )
 async def get_current_user_info(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user_async)
 ):
     """
     Get information about the currently authenticated user.
@@ -1071,13 +1065,14 @@ async def reset_password(
             )
         
         # Update password
-        user.hashed_password = get_password_hash(reset_data.new_password)
+        user.hashed_password = await get_password_hash_async(reset_data.new_password)
         user.updated_at = datetime.utcnow()
         
         # Revoke all existing refresh tokens
-        redis_client.revoke_all_user_refresh_tokens(str(user.id))
+        await async_redis_client.revoke_all_user_refresh_tokens(str(user.id))
         
         db.commit()
+        invalidate_principal(user.id)
         
         logger.info(f"Password reset successful for user: {user.email}")
         
@@ -1093,6 +1088,13 @@ async def reset_password(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired token"
         )
+    except PasswordHasherOverloaded:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please try again shortly.",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Error resetting password: {str(e)}", exc_info=True)
         db.rollback()
@@ -6,7 +6,8 @@ from datetime import datetime
 
 from .. import models, schemas
 from ..database import get_db
-from ..auth import get_current_user
+from ..auth import get_current_user, verify_password_async, get_password_hash_async, invalidate_principal
+from ..password_hasher import PasswordHasherOverloaded
 from ..security import limiter
 from ..storage import storage
 
@@ -59,6 +60,7 @@ async def update_profile(
         
         db.add(current_user)
         db.commit()
+        invalidate_principal(current_user.id)
         db.refresh(current_user)
         
         return current_user
@@ -84,24 +86,31 @@ async def change_password(
     Change the current user's password.
     """
     try:
-        # Verify current password
-        if not current_user.check_password(current_password):
+        # Verify current password (bcrypt runs on the password hasher pool)
+        if not await verify_password_async(current_password, current_user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password is incorrect"
             )
         
         # Update password
-        current_user.set_password(new_password)
+        current_user.hashed_password = await get_password_hash_async(new_password)
         current_user.updated_at = datetime.utcnow()
         
         db.add(current_user)
         db.commit()
+        invalidate_principal(current_user.id)
         
         return {"status": "success", "message": "Password updated successfully"}
         
     except HTTPException:
         raise
+    except PasswordHasherOverloaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please try again shortly.",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         db.rollback()
         logger.error(f"Error changing password: {str(e)}")
@@ -151,6 +160,7 @@ async def upload_profile_picture(
         
         db.add(current_user)
         db.commit()
+        invalidate_principal(current_user.id)
         db.refresh(current_user)
         
         return {
@@ -1,11 +1,117 @@
-import uvicorn
+"""
+Run the API.
+
+    python run_server.py                     development server with reload
+    python run_server.py --workers 4         gunicorn with gunicorn.conf.py,
+                                             printing per-worker memory
+    python run_server.py --workers 4 --no-preload
+                                             same, importing the app in each worker
+
+With --workers the launcher prints RSS, PSS, shared and private memory of
+the master and every worker every --report-interval seconds (Linux only,
+read from /proc). PSS splits shared pages between the processes mapping
+them, so the PSS total is what the workers really cost.
+"""
+import argparse
 import os
+import subprocess
 import sys
+import time
+from typing import Dict, List
+
+import uvicorn
+
+MEMORY_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def memory_usage(pid: int) -> Dict[str, int]:
+    """
+    Memory of one process in kB.
+
+    Returns:
+        rss, pss, shared and private sizes from /proc/<pid>/smaps_rollup
+    """
+    values = dict.fromkeys(MEMORY_FIELDS, 0)
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in values:
+                values[name] = int(rest.split()[0])
+    return {
+        "rss": values["Rss"],
+        "pss": values["Pss"],
+        "shared": values["Shared_Clean"] + values["Shared_Dirty"],
+        "private": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+def child_pids(parent: int) -> List[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after ")"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def report(master: int) -> str:
+    rows = [("master", master)] + [("worker", pid) for pid in child_pids(master)]
+    lines = [f"{'':8}{'pid':>8}{'rss MB':>10}{'pss MB':>10}{'shared MB':>11}{'private MB':>12}"]
+    total_pss = 0
+    for role, pid in rows:
+        try:
+            usage = memory_usage(pid)
+        except OSError:
+            continue  # exited since it was listed
+        total_pss += usage["pss"]
+        lines.append(
+            f"{role:8}{pid:>8}{usage['rss'] / 1024:>10.1f}{usage['pss'] / 1024:>10.1f}"
+            f"{usage['shared'] / 1024:>11.1f}{usage['private'] / 1024:>12.1f}"
+        )
+    lines.append(f"{'total':8}{'':>8}{'':>10}{total_pss / 1024:>10.1f}")
+    return "\n".join(lines)
+
+
+def run_gunicorn(args) -> int:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), PORT=str(args.port))
+    if args.no_preload:
+        env["GUNICORN_PRELOAD"] = "false"
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(current_dir, "gunicorn.conf.py"), "main:app"],
+        cwd=current_dir, env=env,
+    )
+    try:
+        while master.poll() is None:
+            time.sleep(args.report_interval)
+            if master.poll() is None:
+                print(report(master.pid), flush=True)
+    except KeyboardInterrupt:
+        master.terminate()
+    return master.wait()
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=0, help="run gunicorn with this many workers")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--no-preload", action="store_true", help="import the app in every worker")
+    parser.add_argument("--report-interval", type=float, default=30, help="seconds between memory reports")
+    args = parser.parse_args()
+
+    if args.workers:
+        sys.exit(run_gunicorn(args))
+
     # Add the backend directory to the Python path
     current_dir = os.path.dirname(os.path.abspath(__file__))
     sys.path.insert(0, current_dir)
-    
+
     # Run the FastAPI app
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, log_level="debug")
+    uvicorn.run("main:app", host="0.0.0.0", port=args.port, reload=True, log_level="debug")
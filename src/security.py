@@ -1,61 +1,220 @@
 import os
 import logging
-import time
-from fastapi import Request, Response, status
-from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from datetime import datetime, timedelta
+from fastapi import Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from backend import server_timing, sql_monitor
+from backend.database import replica_router
+from backend.rate_limiter import RateLimiter
+from backend.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
-# Security Headers Middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
-        # Skip CSP for docs endpoints to allow ReDoc and Swagger UI to load all required resources
-        if request.url.path.startswith(('/api/docs', '/api/redoc', '/api/openapi.json')):
-            return response
-            
-        # Update CSP to allow GraphiQL resources with nonce-based approach
-        nonce = os.urandom(16).hex()
-        csp = [
-            f"default-src 'self'",
-            f"script-src 'self' 'unsafe-inline' 'unsafe-eval' https://unpkg.com https://cdn.jsdelivr.net",
-            f"style-src 'self' 'unsafe-inline' https://unpkg.com https://fonts.googleapis.com https://cdn.jsdelivr.net",
-            f"img-src 'self' data: https:;",
-            f"connect-src 'self' https:;",
-            f"font-src 'self' https: data: https://fonts.gstatic.com;",
-            f"frame-src 'self' https:;",
-            f"worker-src 'self' blob: https:;"
-        ]
-        response.headers["Content-Security-Policy"] = "; ".join(csp)
-        
-        # Add nonce to response for future use if needed
-        response.headers["X-Nonce"] = nonce
-        
-        response.headers["Permissions-Policy"] = "camera=(), microphone=(), geolocation=()"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
-        return response
-
-# Rate limiting configuration
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["500 per day", "100 per hour"],  # Stricter default limits
-    storage_uri="memory://",
-    headers_enabled=True,
-    retry_after="http-date"
+# List of allowed origins
+ALLOWED_ORIGINS = [
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "http://localhost:8000",
+    "http://127.0.0.1:8000"
+]
+
+CORS_ALLOW_METHODS = "DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+CORS_MAX_AGE = 600  # Cache preflight requests for 10 minutes
+
+# Requests slower than this are logged with their timing breakdown
+SLOW_REQUEST_SECONDS = get_settings().slow_request_seconds
+
+# Skip CSP for docs endpoints to allow ReDoc and Swagger UI to load all required resources
+CSP_EXEMPT_PREFIXES = ('/api/docs', '/api/redoc', '/api/openapi.json')
+
+CONTENT_SECURITY_POLICY = "; ".join([
+    "default-src 'self'",
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://unpkg.com https://cdn.jsdelivr.net",
+    "style-src 'self' 'unsafe-inline' https://unpkg.com https://fonts.googleapis.com https://cdn.jsdelivr.net",
+    "img-src 'self' data: https:;",
+    "connect-src 'self' https:;",
+    "font-src 'self' https: data: https://fonts.gstatic.com;",
+    "frame-src 'self' https:;",
+    "worker-src 'self' blob: https:;"
+])
+
+
+def _header_block(headers):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+# Header blocks are encoded once at import and appended to every response
+BASE_SECURITY_HEADERS = _header_block([
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "DENY"),
+    ("X-XSS-Protection", "1; mode=block"),
+    ("Referrer-Policy", "strict-origin-when-cross-origin"),
+])
+CSP_HEADERS = _header_block([
+    ("Content-Security-Policy", CONTENT_SECURITY_POLICY),
+    ("Permissions-Policy", "camera=(), microphone=(), geolocation=()"),
+    ("Strict-Transport-Security", "max-age=31536000; includeSubDomains"),
+])
+
+
+class SecurityMiddleware:
+    """Single pure-ASGI layer for everything the API does around a request.
+
+    In one pass it answers CORS preflights, applies the default rate limits,
+    adds the security, CORS and rate limit headers, reports Server-Timing and
+    X-Process-Time, opens the replica router's read-your-writes window,
+    counts SQL statements (see sql_monitor) and writes the access log. It
+    replaces a stack of BaseHTTPMiddleware and ``@app.middleware("http")``
+    layers, each of which cost an extra task and response stream per
+    request.
+    """
+
+    def __init__(self, app, limiter: RateLimiter = None, allowed_origins=ALLOWED_ORIGINS,
+                 auth_endpoints=None, exempt_routes=None):
+        self.app = app
+        self.limiter = limiter
+        self.auth_endpoints = auth_endpoints if auth_endpoints is not None else AUTH_ENDPOINTS
+        self.exempt_routes = exempt_routes if exempt_routes is not None else RATE_LIMIT_EXEMPT_ROUTES
+        self.cors_headers = {
+            origin.encode("latin-1"): _header_block([
+                ("Access-Control-Allow-Origin", origin),
+                ("Access-Control-Allow-Credentials", "true"),
+                ("Access-Control-Expose-Headers", "*"),
+                ("Vary", "Origin"),
+            ])
+            for origin in allowed_origins
+        }
+        self.preflight_headers = {
+            origin: headers + _header_block([
+                ("Access-Control-Allow-Methods", CORS_ALLOW_METHODS),
+                ("Access-Control-Max-Age", str(CORS_MAX_AGE)),
+            ])
+            for origin, headers in self.cors_headers.items()
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings, token = server_timing.start_request()
+        queries, queries_token = sql_monitor.start(f"{scope['method']} {scope['path']}")
+        client = scope.get("client")
+        consistency_token = replica_router.begin_request(f"ip:{client[0] if client else 'unknown'}")
+        try:
+            await self._handle(scope, receive, send, timings)
+        finally:
+            replica_router.end_request(consistency_token)
+            sql_monitor.finish(queries, queries_token)
+            server_timing.end_request(token)
+
+    async def _handle(self, scope, receive, send, timings):
+        path = scope["path"]
+        method = scope["method"]
+        origin = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if method == "OPTIONS":
+            await self._preflight(scope, receive, send, origin, request_headers)
+            return
+
+        if self.limiter is not None and path not in self.auth_endpoints and path not in self.exempt_routes:
+            try:
+                rate_limit = await self.limiter.check_default_limits(Request(scope))
+            except Exception as e:
+                # If there's an error in rate limiting, allow the request to proceed
+                logger.error(f"Error in rate limiting: {str(e)}")
+                rate_limit = None
+            if rate_limit is not None and not rate_limit.allowed:
+                response = JSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={"message": "Rate limit exceeded. Please try again later."},
+                    headers=rate_limit.headers()
+                )
+                await response(scope, receive, self._sender(scope, send, timings, origin))
+                return
+            if rate_limit is not None:
+                scope.setdefault("state", {})["rate_limit"] = rate_limit
+
+        try:
+            await self.app(scope, receive, self._sender(scope, send, timings, origin))
+        except Exception as e:
+            logger.error(f"Error in request processing: {str(e)}", exc_info=True)
+            raise
+
+    def _sender(self, scope, send, timings, origin):
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Open the read-your-writes window before the client can
+                # send its next request
+                await replica_router.record_writes()
+                headers = list(message.get("headers", ()))
+                headers.extend(BASE_SECURITY_HEADERS)
+                if not scope["path"].startswith(CSP_EXEMPT_PREFIXES):
+                    headers.extend(CSP_HEADERS)
+                    headers.append((b"x-nonce", os.urandom(16).hex().encode("latin-1")))
+                if origin in self.cors_headers:
+                    headers.extend(self.cors_headers[origin])
+                rate_limit = scope.get("state", {}).get("rate_limit")
+                if rate_limit is not None:
+                    headers.extend(_header_block(rate_limit.headers().items()))
+                headers.append((b"server-timing", timings.header().encode("latin-1")))
+                headers.append((b"x-process-time", str(timings.elapsed()).encode("latin-1")))
+                message["headers"] = headers
+            elif not message.get("more_body", False):
+                self._log(scope, status_code, timings)
+            await send(message)
+
+        return send_wrapper
+
+    async def _preflight(self, scope, receive, send, origin, request_headers):
+        if origin is None or origin in self.cors_headers:
+            headers = list(self.preflight_headers.get(origin, ()))
+            if request_headers:
+                headers.append((b"access-control-allow-headers", request_headers))
+            response = Response(status_code=status.HTTP_200_OK)
+            response.raw_headers.extend(headers)
+        else:
+            response = PlainTextResponse("Disallowed CORS origin", status_code=status.HTTP_400_BAD_REQUEST)
+        await response(scope, receive, send)
+
+    @staticmethod
+    def _log(scope, status_code, timings):
+        process_time = timings.elapsed()
+        slow = process_time >= SLOW_REQUEST_SECONDS
+        if status_code < 400 and not slow and not logger.isEnabledFor(logging.DEBUG):
+            return
+        client = scope.get("client")
+        user_agent = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"user-agent"), None)
+        log_data = {
+            "path": scope["path"],
+            "method": scope["method"],
+            "status_code": status_code,
+            "process_time": process_time,
+            "client": client[0] if client else "unknown",
+            "user_agent": user_agent,
+            "timings": timings.as_dict(),
+        }
+        if status_code >= 400:
+            logger.warning("Request error", extra={"data": log_data})
+        elif slow:
+            logger.warning("Slow request", extra={"data": log_data})
+        else:
+            logger.debug("Request processed", extra={"data": log_data})
+
+# Rate limiting configuration: shared across workers and instances through Redis,
+# keyed per authenticated user (or per IP) and, for decorated routes, per route
+limiter = RateLimiter(
+    default_limits=["500 per day", "100 per hour"]  # Stricter default limits
 )
 
 # Whitelist of auth endpoints with more permissive limits
@@ -83,7 +242,7 @@ RATE_LIMIT_EXEMPT_ROUTES = {
 # Exempt certain endpoints from rate limiting
 limiter.exempt_routes = {
     "/api/auth/me",  # Exclude user info endpoint from rate limiting
-    "/graphql",      # Exclude GraphQL endpoint
+    "/graphql",      # GraphQL is limited by query cost instead (see gql/cost.py)
     "/graphiql",     # Exclude GraphiQL interface
     "/graphiql/",    # Exclude GraphiQL interface
     "/graphql/test", # Exclude GraphQL test endpoint
@@ -93,126 +252,8 @@ limiter.exempt_routes = {
 }
 
 def setup_security(app):
-    # List of allowed origins
-    origins = [
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "http://localhost:8000",
-        "http://127.0.0.1:8000"
-    ]
-    
-    # Add rate limit middleware
-    @app.middleware("http")
-    async def rate_limit_middleware(request: Request, call_next):
-        # Skip rate limiting for preflight and auth endpoints
-        if request.method == "OPTIONS" or request.url.path in AUTH_ENDPOINTS:
-            return await call_next(request)
-            
-        # For non-auth endpoints, use the default limiter
-        try:
-            # Skip rate limiting for exempt routes
-            if request.url.path in RATE_LIMIT_EXEMPT_ROUTES:
-                return await call_next(request)
-                
-            # Check rate limit using the limiter
-            response = await request.app.state.limiter.check_rate_limit(request)
-            if response:
-                return response
-                
-            # If not rate limited, proceed with the request
-            response = await call_next(request)
-            
-            # Add rate limit headers to the response
-            if hasattr(request.state, "rate_limit"):
-                rate_limit = request.state.rate_limit
-                response.headers["X-RateLimit-Limit"] = str(rate_limit.limit)
-                response.headers["X-RateLimit-Remaining"] = str(rate_limit.remaining)
-                response.headers["X-RateLimit-Reset"] = str(rate_limit.reset)
-                
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error in rate limiting: {str(e)}")
-            # If there's an error in rate limiting, allow the request to proceed
-            return await call_next(request)
-    
-    # Add CORS middleware
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=origins,
-        allow_credentials=True,
-        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-        allow_headers=["*"],
-        expose_headers=["*"],
-        max_age=600,  # Cache preflight requests for 10 minutes
-    )
-    
-    # Add middleware to handle preflight requests
-    @app.middleware("http")
-    async def add_cors_headers(request: Request, call_next):
-        if request.method == "OPTIONS":
-            response = Response()
-            response.headers["Access-Control-Allow-Origin"] = "http://localhost:3000"
-            response.headers["Access-Control-Allow-Methods"] = "*"
-            response.headers["Access-Control-Allow-Headers"] = "*"
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-            return response
-            
-        response = await call_next(request)
-        response.headers["Access-Control-Allow-Origin"] = "http://localhost:3000"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        return response
-    
-    # Add security headers middleware
-    app.add_middleware(SecurityHeadersMiddleware)
-    
     # Configure rate limiting
     app.state.limiter = limiter
     
-    # Add exception handler for rate limiting
-    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-    
-    # Add slowapi middleware
-    app.add_middleware(SlowAPIMiddleware)
-    
-    # Add request timing middleware
-    @app.middleware("http")
-    async def add_process_time_header(request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        return response
-    
-    # Log security events
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        try:
-            start_time = datetime.utcnow()
-            response = await call_next(request)
-            
-            # Add process time header
-            if hasattr(response, 'headers'):
-                process_time = (datetime.utcnow() - start_time).total_seconds()
-                response.headers["X-Process-Time"] = str(process_time)
-                
-                # Log request details
-                log_data = {
-                    "path": request.url.path,
-                    "method": request.method,
-                    "status_code": response.status_code,
-                    "process_time": process_time,
-                    "client": request.client.host if request.client else "unknown",
-                    "user_agent": request.headers.get("user-agent"),
-                }
-                
-                if response.status_code >= 400:
-                    logger.warning("Request error", extra={"data": log_data})
-                else:
-                    logger.debug("Request processed", extra={"data": log_data})
-                    
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error in request processing: {str(e)}", exc_info=True)
-            raise
+    # Headers, CORS, rate limiting, timing and access logging in one layer
+    app.add_middleware(SecurityMiddleware, limiter=limiter, allowed_origins=ALLOWED_ORIGINS)
@@ -0,0 +1,149 @@
+"""
+Request-scoped timing breakdown.
+
+``SecurityMiddleware`` opens a :class:`RequestTimings` for every HTTP request
+and reports it as a ``Server-Timing`` header and in the access log. Code that
+talks to a backend records into whichever collector is active in the current
+context:
+
+    db         SQLAlchemy statements (``instrument_engine``)
+    redis      Redis commands and pipelines (``redis_client``)
+    bcrypt     password hashing and verification (``password_hasher``)
+    docusign   DocuSign SDK calls
+    render     reportlab PDF rendering
+    serialize  JSON response rendering (``TimedJSONResponse``)
+
+Outside a request nothing is recorded. Sync endpoints and dependencies run
+in a copy of the request context, so they record into the same collector.
+"""
+import time
+import functools
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse
+
+_current: ContextVar[Optional["RequestTimings"]] = ContextVar("server_timing", default=None)
+
+
+class RequestTimings:
+    """Accumulated time and call count per metric for one request"""
+
+    __slots__ = ("started_at", "metrics")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.metrics: Dict[str, list] = {}
+
+    def add(self, name: str, seconds: float, count: int = 1):
+        entry = self.metrics.get(name)
+        if entry is None:
+            self.metrics[name] = [seconds, count]
+        else:
+            entry[0] += seconds
+            entry[1] += count
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def header(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        parts = [
+            f'{name};dur={seconds * 1000:.2f};desc="{count}"'
+            for name, (seconds, count) in self.metrics.items()
+        ]
+        parts.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(parts)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {"ms": round(seconds * 1000, 3), "count": count}
+            for name, (seconds, count) in self.metrics.items()
+        }
+
+
+def start_request():
+    """Open a collector for the current request; pass the token to end_request"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token) -> None:
+    _current.reset(token)
+
+
+def current() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def record(name: str, seconds: float, count: int = 1) -> None:
+    """Add ``seconds`` to metric ``name`` of the active request, if any"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds, count)
+
+
+@contextmanager
+def timed(name: str):
+    """Time the enclosed block into metric ``name``"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def timed_call(name: str):
+    """Decorator form of :func:`timed` for sync and async functions"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timed(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def instrument_engine(engine, name: str = "db") -> None:
+    """Record the duration of every statement run through ``engine``"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and _current.get() is not None:
+            context._server_timing_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_server_timing_start", None)
+        if start is not None:
+            record(name, time.perf_counter() - start)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        context = exception_context.execution_context
+        start = getattr(context, "_server_timing_start", None)
+        if start is not None:
+            record(name, time.perf_counter() - start)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that records rendering time as ``serialize``"""
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
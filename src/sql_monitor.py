@@ -0,0 +1,168 @@
+"""
+Per-request SQL statement counting and N+1 detection.
+
+``SecurityMiddleware`` opens a :class:`QueryLog` for every HTTP request and
+the GraphQL ``SQLMonitorExtension`` opens a nested one per operation.
+Statements run through an instrumented engine are counted in the innermost
+log and every log around it. When a log closes it warns if the scope ran
+more than SQL_WARN_STATEMENTS statements, spent more than SQL_WARN_MS in the
+database, or ran the same statement shape SQL_REPEAT_WARN times or more
+(the signature of an N+1 loop). A nested log that warned keeps the
+enclosing one from repeating the warning.
+
+Tests assert query budgets with :func:`capture`::
+
+    with sql_monitor.capture() as logs:
+        client.get("/users/1/appointments")
+    assert logs[-1].count <= 2
+"""
+import re
+import time
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+SQL_WARN_STATEMENTS = settings.sql_warn_statements
+SQL_WARN_MS = settings.sql_warn_ms
+SQL_REPEAT_WARN = settings.sql_repeat_warn
+
+_current: ContextVar[Optional["QueryLog"]] = ContextVar("sql_monitor", default=None)
+_listeners: List[Callable[["QueryLog"], None]] = []
+_listeners_lock = threading.Lock()
+_whitespace = re.compile(r"\s+")
+
+
+class QueryLog:
+    """Statements run within one request or GraphQL operation"""
+
+    __slots__ = ("label", "parent", "count", "seconds", "shapes", "warned")
+
+    def __init__(self, label: str, parent: Optional["QueryLog"] = None):
+        self.label = label
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.warned = False
+
+    def add(self, statement: str, seconds: float):
+        log = self
+        while log is not None:
+            log.count += 1
+            log.seconds += seconds
+            log.shapes[statement] += 1
+            log = log.parent
+
+    def repeated(self, threshold: int = SQL_REPEAT_WARN) -> List[Tuple[str, int]]:
+        """Statement shapes run at least ``threshold`` times, most frequent first"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "label": self.label,
+            "statements": self.count,
+            "ms": round(self.seconds * 1000, 3),
+            "repeated": [
+                {"statement": _shorten(shape), "count": n} for shape, n in self.repeated()
+            ],
+        }
+
+
+def _shorten(statement: str, length: int = 200) -> str:
+    statement = _whitespace.sub(" ", statement).strip()
+    return statement if len(statement) <= length else statement[:length] + "..."
+
+
+def start(label: str):
+    """Open a log nested in the current one; pass the token to finish"""
+    log = QueryLog(label, _current.get())
+    return log, _current.set(log)
+
+
+def finish(log: QueryLog, token) -> None:
+    """Close ``log``, warn about offenders and hand it to the listeners"""
+    _current.reset(token)
+    if log.count and not log.warned:
+        _check(log)
+    if log.warned and log.parent is not None:
+        log.parent.warned = True
+    if _listeners:
+        with _listeners_lock:
+            listeners = list(_listeners)
+        for listener in listeners:
+            listener(log)
+
+
+@contextmanager
+def track(label: str):
+    """Count the statements of the enclosed block in their own log"""
+    log, token = start(label)
+    try:
+        yield log
+    finally:
+        finish(log, token)
+
+
+def current() -> Optional[QueryLog]:
+    return _current.get()
+
+
+def _check(log: QueryLog):
+    repeated = log.repeated()
+    for shape, n in repeated:
+        logger.warning(
+            "Possible N+1 in %s: statement ran %d times: %s", log.label, n, _shorten(shape)
+        )
+    too_many = log.count > SQL_WARN_STATEMENTS
+    too_slow = log.seconds * 1000 > SQL_WARN_MS
+    if too_many or too_slow:
+        logger.warning(
+            "%s ran %d SQL statements in %.1f ms", log.label, log.count, log.seconds * 1000,
+            extra={"data": log.as_dict()}
+        )
+    log.warned = bool(repeated) or too_many or too_slow
+
+
+def instrument_engine(engine) -> None:
+    """Record every statement run through ``engine`` in the current log"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and _current.get() is not None:
+            context._sql_monitor_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start_time = getattr(context, "_sql_monitor_start", None)
+        log = _current.get()
+        if start_time is not None and log is not None:
+            log.add(statement, time.perf_counter() - start_time)
+
+
+@contextmanager
+def capture():
+    """
+    Collect every log closed while the block runs, from any thread.
+
+    Yields:
+        A list that fills with :class:`QueryLog` objects as scopes finish;
+        an HTTP request's log comes after the logs of its GraphQL operations.
+    """
+    logs: List[QueryLog] = []
+    with _listeners_lock:
+        _listeners.append(logs.append)
+    try:
+        yield logs
+    finally:
+        with _listeners_lock:
+            _listeners.remove(logs.append)
@@ -0,0 +1,83 @@
+"""Test data and runners shared between test modules; the async helpers are awaited inside the tests' own event loops"""
+import asyncio
+import os
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import SerializedAsyncSession
+from backend.redis_client import BlacklistMirror, async_redis_client
+
+
+async def seeded_session():
+    """In-memory database with one user and 20 appointments; returns (engine, session)"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    db = sessionmaker(engine, class_=SerializedAsyncSession, expire_on_commit=False)()
+    db.add(models.User(id=1, email="jane@example.com", full_name="Jane Doe", hashed_password="x"))
+    for i in range(20):
+        db.add(models.Appointment(
+            user_id=1,
+            first_name="Jane",
+            last_name="Doe",
+            email="jane@example.com",
+            phone="555-0100",
+            service="Tax filing",
+            appointment_date=datetime(2024, 1, 1 + i),
+            status=models.AppointmentStatus.PENDING,
+        ))
+    try:
+        await db.commit()
+    except Exception:
+        await db.close()
+        await engine.dispose()
+        raise
+    return engine, db
+
+
+async def fake_redis(server=None):
+    """fakeredis with Lua support; clients sharing ``server`` see the same data"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+
+async def local_redis():
+    """A real Redis if one is reachable (REDIS_TEST_URL), else fakeredis"""
+    client = aioredis.Redis.from_url(
+        os.getenv("REDIS_TEST_URL", "redis://localhost:6379/15"),
+        decode_responses=True,
+        socket_connect_timeout=0.2,
+    )
+    try:
+        await client.ping()
+        await client.flushdb()
+        return client
+    except Exception:
+        await client.close()
+    return await fake_redis()
+
+
+def run_with_redis(scenario, connect=fake_redis):
+    """
+    Run ``scenario(redis)`` in a new event loop with ``async_redis_client``
+    talking to the client ``connect()`` returns and a fresh blacklist mirror.
+    """
+    async def runner():
+        redis = await connect()
+        try:
+            with patch.object(async_redis_client, "redis", redis), \
+                    patch.object(async_redis_client, "blacklist_mirror", BlacklistMirror()):
+                await scenario(redis)
+        finally:
+            await redis.close()
+
+    asyncio.run(runner())
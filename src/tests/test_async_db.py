@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+from backend import models
+from backend.auth import load_principal_async, principal_cache
+from backend.database import async_database_url
+from backend.gql.loaders import Loaders
+from backend.gql.router import schema
+from backend.tests.helpers import seeded_session
+
+
+def test_async_database_url():
+    assert async_database_url("postgresql://u:p@db:5432/app") == "postgresql+asyncpg://u:p@db:5432/app"
+    assert async_database_url("postgres://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert async_database_url("postgresql+psycopg2://u:p@db/app?sslmode=require") == \
+        "postgresql+asyncpg://u:p@db/app?ssl=require"
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    with pytest.raises(ValueError):
+        async_database_url("mysql://u:p@db/app")
+
+
+def test_graphql_queries_share_one_async_session():
+    query = """
+        query($userId: Int!) {
+            userAppointments(userId: $userId) { id appointmentDate user { email } }
+        }
+    """
+
+    async def scenario():
+        engine, db = await seeded_session()
+        try:
+            # Nested user fields resolve concurrently on the same session
+            result = await schema.execute(
+                query,
+                variable_values={"userId": 1},
+                context_value={"async_db": db, "async_read_db": db, "db": None, "current_user": None,
+                               "loaders": Loaders(db)},
+            )
+        finally:
+            await db.close()
+            await engine.dispose()
+        return result
+
+    result = asyncio.run(scenario())
+    assert result.errors is None
+    appointments = result.data["userAppointments"]
+    assert len(appointments) == 20
+    assert appointments[0]["appointmentDate"] > appointments[-1]["appointmentDate"]
+    assert {a["user"]["email"] for a in appointments} == {"jane@example.com"}
+
+
+def test_load_principal_async_uses_the_cache():
+    principal_cache.clear()
+
+    async def scenario():
+        engine, db = await seeded_session()
+        try:
+            first = await load_principal_async(db, "1", token_exp=time.time() + 60)
+            await db.execute(models.User.__table__.delete())
+            cached = await load_principal_async(db, "1")
+            missing = await load_principal_async(db, "not-a-number")
+        finally:
+            await db.close()
+            await engine.dispose()
+        return first, cached, missing
+
+    first, cached, missing = asyncio.run(scenario())
+    principal_cache.clear()
+    assert first.email == cached.email == "jane@example.com"
+    assert missing is None
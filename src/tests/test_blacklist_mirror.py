@@ -0,0 +1,103 @@
+import asyncio
+import time
+from functools import partial
+from unittest.mock import patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from backend.redis_client import BlacklistMirror, async_redis_client, token_digest
+from backend.tests.helpers import fake_redis, run_with_redis
+
+
+async def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.02)
+    return False
+
+
+def test_unrevoked_tokens_skip_redis_once_mirror_is_ready():
+    client = async_redis_client
+
+    async def scenario(r):
+        await client.add_to_blacklist("revoked-before-start", 60)
+        client.blacklist_mirror = BlacklistMirror()
+        client.start_blacklist_sync()
+        try:
+            assert await wait_for(lambda: client.blacklist_mirror.ready)
+            assert client.blacklist_mirror.might_contain(token_digest("revoked-before-start"))
+
+            with patch.object(client.redis, "exists", wraps=client.redis.exists) as exists:
+                assert await client.is_blacklisted("fresh-token") is False
+                assert exists.call_count == 0
+                assert await client.is_blacklisted("revoked-before-start") is True
+                assert exists.call_count == 1
+        finally:
+            await client.stop_blacklist_sync()
+
+    run_with_redis(scenario)
+
+
+def test_revocations_from_other_workers_reach_the_mirror():
+    client = async_redis_client
+    server = fakeredis.FakeServer()
+
+    async def scenario(r):
+        client.start_blacklist_sync()
+        try:
+            assert await wait_for(lambda: client.blacklist_mirror.ready)
+
+            # Simulate another worker: separate connection, nothing written to our mirror
+            other = await fake_redis(server)
+            with patch.object(client, "redis", other), \
+                    patch.object(client, "blacklist_mirror", BlacklistMirror()):
+                await client.add_to_blacklist("revoked-elsewhere", 60)
+
+            assert await wait_for(lambda: client.blacklist_mirror.might_contain(token_digest("revoked-elsewhere")))
+            assert await client.is_blacklisted("revoked-elsewhere") is True
+        finally:
+            await client.stop_blacklist_sync()
+
+    run_with_redis(scenario, partial(fake_redis, server))
+
+
+def test_tokens_revoked_before_the_index_existed_stay_revoked():
+    client = async_redis_client
+
+    async def scenario(r):
+        # Written by a release that had no blacklist index
+        await client.redis.setex("blacklist:legacy-token", 60, "1")
+        client.start_blacklist_sync()
+        try:
+            assert await wait_for(lambda: client.blacklist_mirror.ready)
+            assert await client.is_blacklisted("legacy-token") is True
+            expires_at = await client.redis.zscore("blacklist:index", token_digest("legacy-token"))
+            assert time.time() < expires_at <= time.time() + 60
+        finally:
+            await client.stop_blacklist_sync()
+
+    run_with_redis(scenario)
+
+
+def test_falls_back_to_redis_until_mirror_is_ready():
+    async def scenario(r):
+        await async_redis_client.redis.setex("blacklist:legacy-token", 60, "1")
+        assert async_redis_client.blacklist_mirror.ready is False
+        assert await async_redis_client.is_blacklisted("legacy-token") is True
+
+    run_with_redis(scenario)
+
+
+def test_expired_entries_are_dropped():
+    mirror = BlacklistMirror()
+    mirror.load({"old": time.time() - 1, "live": time.time() + 60})
+    mirror.add("short", time.time() - 1)
+    assert not mirror.might_contain("old")
+    assert not mirror.might_contain("short")
+    assert mirror.might_contain("live")
+    mirror.prune()
+    assert len(mirror) == 1
@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models, sql_monitor
+from backend.contact_models import Base as ContactBase, Contact
+from backend.database import SerializedAsyncSession
+from backend.gql.loaders import Loaders
+from backend.gql.router import schema
+
+START = datetime(2024, 1, 1)
+
+APPOINTMENTS = "query Appointments { appointments { id user { email } } }"
+
+MESSAGES = """
+    query Messages($limit: Int!) {
+        messages(limit: $limit) {
+            totalCount
+            messages {
+                id
+                sender { email }
+                recipients { recipientId }
+                contact { email }
+                appointment { id service }
+            }
+        }
+    }
+"""
+
+
+async def seed(db, rows):
+    """``rows`` users, each with an appointment, a contact and a message to user 1"""
+    for i in range(1, rows + 1):
+        email = f"user{i}@example.com"
+        db.add(models.User(id=i, email=email, full_name=f"User {i}", phone=f"555-{i:04}", hashed_password="x"))
+        db.add(models.Appointment(
+            user_id=i, first_name="User", last_name=str(i), email=email, phone=f"555-{i:04}",
+            service=f"Service {i}", appointment_date=START + timedelta(days=i),
+            status=models.AppointmentStatus.PENDING,
+        ))
+        db.add(Contact(name=f"User {i}", email=email, phone=f"555-{i:04}", subject="Hi", message="Hello",
+                       created_at=START + timedelta(days=i)))
+        message = models.Message(
+            sender_id=i, subject="Hello", content="Hi", message_type=models.MessageType.EMAIL,
+            status=models.MessageStatus.SENT, recipient_type=models.MessageRecipientType.SPECIFIC,
+            created_at=START + timedelta(minutes=i), updated_at=START,
+        )
+        db.add(message)
+        await db.flush()
+        db.add(models.MessageRecipient(message_id=message.id, recipient_id=1, status=models.MessageStatus.SENT))
+    await db.commit()
+    db.expunge_all()
+
+
+def run(query, rows, variables=None):
+    """Execute ``query`` on ``rows`` seeded rows; returns (result, statements)"""
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+            await conn.run_sync(ContactBase.metadata.create_all)
+        sql_monitor.instrument_engine(engine.sync_engine)
+        db = sessionmaker(engine, class_=SerializedAsyncSession, expire_on_commit=False)()
+        try:
+            await seed(db, rows)
+            return await schema.execute(query, variable_values=variables, context_value={
+                "async_db": db, "async_read_db": db, "db": None,
+                "current_user": SimpleNamespace(id=1), "loaders": Loaders(db),
+            })
+        finally:
+            await db.close()
+            await engine.dispose()
+
+    with sql_monitor.capture() as logs:
+        result = asyncio.run(scenario())
+    assert result.errors is None, result.errors
+    return result, logs[-1].count
+
+
+@pytest.mark.parametrize("rows", [3, 40])
+def test_appointment_users_are_loaded_in_one_query(rows):
+    result, statements = run(APPOINTMENTS, rows)
+
+    appointments = result.data["appointments"]
+    assert len(appointments) == rows
+    assert {a["user"]["email"] for a in appointments} == {f"user{i}@example.com" for i in range(1, rows + 1)}
+    # appointments, then one IN (...) for their users
+    assert statements == 2
+
+
+@pytest.mark.parametrize("rows", [3, 40])
+def test_message_relationships_cost_one_query_each(rows):
+    result, statements = run(MESSAGES, rows, {"limit": rows})
+
+    messages = result.data["messages"]["messages"]
+    assert len(messages) == rows
+    for message in messages:
+        email = message["sender"]["email"]
+        assert message["contact"]["email"] == email
+        assert message["appointment"]["service"] == f"Service {email[4:-12]}"
+        assert message["recipients"] == [{"recipientId": 1}]
+    # count, page, senders, recipients, contacts, appointments
+    assert statements == 6
+
+
+def test_messages_connection_skips_the_count_unless_asked():
+    query = """
+        query MessagesPage($first: Int!) {
+            messagesConnection(first: $first) {
+                nodes { id sender { email } recipients { recipientId } }
+                pageInfo { hasNextPage }
+            }
+        }
+    """
+    result, statements = run(query, 12, {"first": 5})
+
+    connection = result.data["messagesConnection"]
+    assert len(connection["nodes"]) == 5
+    assert connection["pageInfo"]["hasNextPage"]
+    # page, senders, recipients
+    assert statements == 3
+
+
+def test_stats_cost_one_query_whatever_the_date_range():
+    query = """
+        query Stats($start: String!, $end: String!) {
+            getUserActivityStats(startDate: $start, endDate: $end) { activity { date appointments } }
+            getAppointmentStats(startDate: $start, endDate: $end) { totalAppointments byStatus { count } }
+            getRevenueStats(startDate: $start, endDate: $end) { monthlyRevenue { month count } }
+        }
+    """
+    result, statements = run(query, 40, {"start": "2024-01-01", "end": "2024-01-31"})
+
+    activity = result.data["getUserActivityStats"]["activity"]
+    assert len(activity) == 31
+    assert activity[0] == {"date": "2024-01-01", "appointments": 0}
+    assert sum(day["appointments"] for day in activity) == 30
+    assert result.data["getAppointmentStats"]["totalAppointments"] == 30
+    assert result.data["getRevenueStats"]["monthlyRevenue"] == [{"month": "2024-01", "count": 30}]
+    # One grouped query per resolver, not one per day
+    assert statements == 3
@@ -0,0 +1,48 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from backend.database import PoolMonitor, pool_limits, worker_connection_share
+
+
+def test_budget_is_split_per_worker_and_engine():
+    # 90 connections for 4 workers on 3 instances: 7 each, 3 sync + 4 async
+    assert worker_connection_share(90, workers=4, instances=3) == (3, 4)
+    assert pool_limits(4, pool_size=5, max_overflow=10) == (4, 0)
+    assert pool_limits(12, pool_size=5, max_overflow=10) == (5, 7)
+    # No budget keeps the configured sizes
+    assert worker_connection_share(0) == (0, 0)
+    assert pool_limits(0, pool_size=5, max_overflow=10) == (5, 10)
+    with pytest.raises(ValueError):
+        worker_connection_share(10, workers=4, instances=3)
+
+
+def test_monitor_reports_saturation(tmp_path, caplog):
+    monitor = PoolMonitor("test", slow_checkout_ms=20)
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=monitor.pool_class(),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    monitor.engine = engine
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            stats = monitor.stats()
+            assert stats["checked_out"] == 1
+            assert stats["overflow"] == 0
+            with caplog.at_level(logging.WARNING, logger="backend.database"):
+                with pytest.raises(exc.TimeoutError):
+                    engine.connect()
+    finally:
+        engine.dispose()
+
+    stats = monitor.stats()
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == stats["slow_checkouts"] == 1
+    assert stats["wait_ms_max"] >= 50
+    assert stats["checked_out"] == 0
+    assert "Slow test pool checkout" in caplog.text
@@ -0,0 +1,65 @@
+import json
+import logging
+import queue
+import time
+
+import pytest
+
+from backend.logging_config import (
+    JSONFormatter,
+    LazyJSON,
+    LazyQueueHandler,
+    SamplingFilter,
+    parse_levels,
+)
+
+
+def make_record(msg, args=(), level=logging.DEBUG, lineno=10, **extra):
+    record = logging.LogRecord("backend.test", level, __file__, lineno, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampling_limits_each_call_site_and_reports_drops():
+    sampler = SamplingFilter(rate=0.001, burst=3)
+    results = [sampler.filter(make_record("hot")) for _ in range(10)]
+    assert results == [True] * 3 + [False] * 7
+    # Other call sites and higher levels are unaffected
+    assert sampler.filter(make_record("hot", lineno=11))
+    assert all(sampler.filter(make_record("warn", level=logging.WARNING)) for _ in range(10))
+
+    sampler.rate = 1000
+    time.sleep(0.01)
+    record = make_record("hot")
+    assert sampler.filter(record)
+    assert record.sampled_out == 7
+
+
+def test_formatting_is_deferred_only_for_immutable_arguments():
+    handler = LazyQueueHandler(queue.SimpleQueue())
+    lazy = handler.prepare(make_record("user %s logged in from %s", ("7", "10.0.0.1")))
+    assert lazy.args == ("7", "10.0.0.1")
+
+    claims = {"sub": "7"}
+    eager = handler.prepare(make_record("claims %s", (claims,)))
+    claims["sub"] = "999"
+    assert eager.args is None
+    assert eager.getMessage() == "claims {'sub': '7'}"
+
+
+def test_json_output_includes_extra_fields():
+    payload = {"envelopeId": "abc", "status": "completed"}
+    record = make_record("Webhook payload: %s", (LazyJSON(payload),), data={"path": "/x"})
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry["message"] == 'Webhook payload: {"envelopeId":"abc","status":"completed"}'
+    assert entry["level"] == "DEBUG"
+    assert entry["data"] == {"path": "/x"}
+
+
+def test_parse_levels():
+    assert parse_levels("sqlalchemy.engine=warning, backend.auth=DEBUG,") == {
+        "sqlalchemy.engine": "WARNING",
+        "backend.auth": "DEBUG",
+    }
+    with pytest.raises(ValueError):
+        parse_levels("backend.auth")
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime
+
+from backend import models
+from backend.gql.loaders import Loaders
+from backend.gql.pagination import GRAPHQL_MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from backend.gql.router import schema
+from backend.tests.helpers import seeded_session
+
+PAGE = """
+    query Page($first: Int, $after: String) {
+        appointmentsConnection(first: $first, after: $after) {
+            edges { cursor node { id appointmentDate } }
+            pageInfo { hasNextPage endCursor }
+            estimatedTotal
+        }
+    }
+"""
+
+
+def execute_all(requests):
+    """Run (query, variables) pairs in order on one seeded session"""
+
+    async def scenario():
+        engine, db = await seeded_session()
+        # Five appointments share a date, so pages must break ties by id
+        for _ in range(5):
+            db.add(models.Appointment(
+                user_id=1, first_name="Jane", last_name="Doe", email="jane@example.com", phone="555-0100",
+                service="Tax filing", appointment_date=datetime(2024, 1, 10),
+                status=models.AppointmentStatus.PENDING,
+            ))
+        await db.commit()
+        context = {"async_db": db, "async_read_db": db, "db": None, "current_user": None, "loaders": Loaders(db)}
+        try:
+            results = []
+            for query, variables in requests:
+                results.append(await schema.execute(query, variable_values=variables, context_value=context))
+            return results
+        finally:
+            await db.close()
+            await engine.dispose()
+
+    return asyncio.run(scenario())
+
+
+def test_cursors_round_trip():
+    key = [datetime(2024, 1, 10, 9, 30), 42]
+    assert decode_cursor(encode_cursor(key), 2) == key
+
+
+def test_pages_cover_every_row_once_newest_first():
+    seen, after = [], None
+    for _ in range(10):
+        result, = execute_all([(PAGE, {"first": 7, "after": after})])
+        assert result.errors is None, result.errors
+        connection = result.data["appointmentsConnection"]
+        assert connection["estimatedTotal"] == 25
+        seen.extend(edge["node"] for edge in connection["edges"])
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        after = connection["pageInfo"]["endCursor"]
+
+    assert len(seen) == 25
+    assert len({node["id"] for node in seen}) == 25
+    keys = [(node["appointmentDate"], node["id"]) for node in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_page_size_and_cursor_are_validated():
+    too_big, bad_cursor = execute_all([
+        (PAGE, {"first": GRAPHQL_MAX_PAGE_SIZE + 1}),
+        (PAGE, {"after": "not-a-cursor"}),
+    ])
+    assert f"first must be between 1 and {GRAPHQL_MAX_PAGE_SIZE}" in too_big.errors[0].message
+    assert bad_cursor.errors[0].message == "Invalid cursor"
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import bcrypt
+import pytest
+
+from backend.password_hasher import PasswordHasher, PasswordHasherOverloaded
+
+
+def _fast_hash(password: str) -> str:
+    # Minimum bcrypt cost keeps the tests quick
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=4)).decode("utf-8")
+
+
+def test_verify_and_hash_round_trip():
+    hasher = PasswordHasher(max_workers=2)
+
+    async def run():
+        hashed = await hasher.hash("s3cret-pass")
+        assert await hasher.verify("s3cret-pass", hashed)
+        assert not await hasher.verify("wrong-pass", hashed)
+        assert not await hasher.verify("s3cret-pass", "not-a-bcrypt-hash")
+
+    try:
+        asyncio.run(run())
+        stats = hasher.stats()
+        assert stats["completed"] == 4
+        assert stats["queue_depth"] == 0
+        assert stats["running"] == 0
+    finally:
+        hasher.shutdown()
+
+
+def test_event_loop_keeps_running_during_bcrypt():
+    """A full-cost bcrypt call must not stall other coroutines on the loop."""
+    hasher = PasswordHasher(max_workers=1)
+    hashed = bcrypt.hashpw(b"password123", bcrypt.gensalt(rounds=12)).decode("utf-8")
+
+    async def run():
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        assert await hasher.verify("password123", hashed)
+        task.cancel()
+        gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+        return gaps
+
+    try:
+        gaps = asyncio.run(run())
+        assert len(gaps) > 3
+        assert max(gaps) < 0.1
+    finally:
+        hasher.shutdown()
+
+
+def test_rejects_when_queue_is_full():
+    hasher = PasswordHasher(max_workers=1, max_queue=2)
+    hashed = _fast_hash("password123")
+
+    async def run():
+        # The first job occupies the only worker; two more fill the queue
+        jobs = [asyncio.create_task(hasher.run(time.sleep, 0.2))]
+        await asyncio.sleep(0.05)
+        jobs += [asyncio.create_task(hasher.verify("password123", hashed)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordHasherOverloaded):
+            await hasher.verify("password123", hashed)
+        return await asyncio.gather(*jobs)
+
+    try:
+        results = asyncio.run(run())
+        assert results[1:] == [True, True]
+        stats = hasher.stats()
+        assert stats["rejected"] == 1
+        assert stats["max_queue_depth"] == 2
+        assert stats["max_wait_ms"] > 0
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from graphql import parse, validate
+
+from backend.gql import persisted_queries as apq
+from backend.gql.extensions import document_cache
+from backend.gql.persisted_queries import persisted_queries, query_hash
+from backend.gql.router import router, schema
+from backend.redis_client import async_redis_client
+
+QUERY = "query Inbox { messagesConnection { pageInfo { hasNextPage } } }"
+
+
+def persisted(query):
+    return {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router, prefix="/graphql")
+    with patch.object(async_redis_client, "redis", fakeredis.aioredis.FakeRedis(decode_responses=True)):
+        persisted_queries.local.clear()
+        # One event loop for every request, as the fake Redis connection is bound to it
+        with TestClient(app) as client:
+            yield client
+    persisted_queries.local.clear()
+
+
+def test_hash_is_registered_once_then_sent_alone(client):
+    missing = client.post("/graphql", json={"extensions": persisted(QUERY)}).json()
+    assert missing["errors"][0]["message"] == "PersistedQueryNotFound"
+    assert missing["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+    registered = client.post("/graphql", json={"query": QUERY, "extensions": persisted(QUERY)}).json()
+    assert registered["data"]["messagesConnection"]["pageInfo"] == {"hasNextPage": False}
+
+    # A worker that has not seen the registration finds it in Redis
+    persisted_queries.local.clear()
+    by_hash = client.get("/graphql", params={"extensions": json.dumps(persisted(QUERY))})
+    assert by_hash.status_code == 200
+    assert by_hash.json()["data"] == registered["data"]
+
+
+def test_rejects_mismatched_hashes_and_mutations_over_get(client):
+    wrong = {"persistedQuery": {"version": 1, "sha256Hash": query_hash("{ __typename }")}}
+    mismatch = client.post("/graphql", json={"query": QUERY, "extensions": wrong}).json()
+    assert mismatch["errors"][0]["message"] == "provided sha does not match query"
+
+    mutation = 'mutation { createUser(input: {email: "a@b.c", fullName: "A", phone: "1", password: "x"}) { id } }'
+    client.post("/graphql", json={"query": mutation, "extensions": persisted(mutation)})
+    response = client.get("/graphql", params={"extensions": json.dumps(persisted(mutation))})
+    assert response.status_code == 400
+
+
+def test_registrations_are_limited_per_client(client):
+    other = "query Other { messagesConnection { pageInfo { endCursor } } }"
+    with patch.object(apq, "GRAPHQL_PERSISTED_QUERY_REGISTRATIONS", "1 per hour"):
+        client.post("/graphql", json={"query": QUERY, "extensions": persisted(QUERY)})
+        # Over the limit the query still runs, but is not stored
+        ran = client.post("/graphql", json={"query": other, "extensions": persisted(other)}).json()
+        assert ran["data"]["messagesConnection"]["pageInfo"] == {"endCursor": None}
+
+    assert client.post("/graphql", json={"extensions": persisted(QUERY)}).json()["data"]
+    missing = client.post("/graphql", json={"extensions": persisted(other)}).json()
+    assert missing["errors"][0]["message"] == "PersistedQueryNotFound"
+
+    too_long = "{ __typename }" + " " * apq.GRAPHQL_PERSISTED_QUERY_MAX_LENGTH
+    rejected = client.post("/graphql", json={"query": too_long, "extensions": persisted(too_long)}).json()
+    assert rejected["errors"][0]["message"] == "Query is too long to persist"
+
+
+def test_repeated_documents_skip_parse_and_validation():
+    invalid = "query Broken { messagesConnection { noSuchField } }"
+    document_cache.clear()
+
+    async def scenario():
+        return [await schema.execute(invalid, context_value={}) for _ in range(2)]
+
+    with patch("strawberry.schema.execute.parse", wraps=parse) as parsed, \
+            patch("strawberry.schema.execute.validate", wraps=validate) as validated:
+        first, second = asyncio.run(scenario())
+
+    assert parsed.call_count == validated.call_count == 1
+    assert "noSuchField" in first.errors[0].message
+    assert [e.message for e in second.errors] == [e.message for e in first.errors]
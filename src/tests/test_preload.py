@@ -0,0 +1,74 @@
+import json
+import logging
+import os
+
+import pytest
+
+from backend import database, logging_config
+from backend.run_server import memory_usage
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+def in_child(check):
+    """Run ``check`` in a forked child and return what it returned"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            result = check()
+        except BaseException as e:
+            result = {"error": repr(e)}
+        os.write(write_fd, json.dumps(result).encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        output = f.read()
+    os.waitpid(pid, 0)
+    return json.loads(output)
+
+
+@pytest.fixture
+def app_logging():
+    """setup_logging() for one test, then the listener stopped and pytest's logging restored"""
+    if logging_config._listener is not None:
+        yield  # configured by someone else; leave it alone
+        return
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    levels = {name: logging.getLogger(name).level for name in logging_config.DEFAULT_LEVELS}
+    logging_config.setup_logging()
+    try:
+        yield
+    finally:
+        logging_config.stop_logging()
+        root.handlers[:] = handlers
+        root.setLevel(level)
+        for name, logger_level in levels.items():
+            logging.getLogger(name).setLevel(logger_level)
+
+
+def test_forked_worker_gets_its_own_pools_and_log_listener(app_logging):
+    # Compared by identity: a freed pool's id can be reused by its replacement
+    parent_pools = [database.engine.pool, database.async_engine.sync_engine.pool]
+
+    def check():
+        logging.getLogger(__name__).debug("worker started")
+        child_pools = [database.engine.pool, database.async_engine.sync_engine.pool]
+        return {
+            "shared_pools": sum(pool is parent for pool, parent in zip(child_pools, parent_pools)),
+            "listener_alive": logging_config._listener._thread.is_alive(),
+        }
+
+    child = in_child(check)
+    assert "error" not in child, child
+    assert child["shared_pools"] == 0
+    assert child["listener_alive"]
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="needs /proc smaps_rollup")
+def test_memory_usage_of_this_process():
+    usage = memory_usage(os.getpid())
+    assert usage["rss"] >= usage["pss"] > 0
+    assert usage["shared"] + usage["private"] == usage["rss"]
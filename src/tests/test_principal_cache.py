@@ -0,0 +1,93 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend import models
+from backend.auth import load_principal, invalidate_principal, principal_cache
+from backend.cache import TTLCache
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    factory = sessionmaker(bind=engine)
+    factory.statements = statements
+
+    db = factory()
+    db.add(models.User(id=1, email="jane@example.com", full_name="Jane Doe", hashed_password="x"))
+    db.add(models.User(id=2, email="old@example.com", full_name="Old User", hashed_password="x", is_active=False))
+    db.commit()
+    db.close()
+
+    principal_cache.clear()
+    yield factory
+    principal_cache.clear()
+
+
+def test_repeat_lookups_skip_the_database(session_factory):
+    db = session_factory()
+    user = load_principal(db, "1", token_exp=time.time() + 300)
+    assert user.email == "jane@example.com"
+    db.close()
+
+    session_factory.statements.clear()
+    db = session_factory()
+    user = load_principal(db, "1", token_exp=time.time() + 300)
+    assert session_factory.statements == []
+    assert user.email == "jane@example.com"
+    assert user in db
+
+    # The attached copy can be modified and committed like a loaded row
+    user.full_name = "Jane Q. Doe"
+    db.commit()
+    db.close()
+    invalidate_principal(1)
+
+    db = session_factory()
+    assert load_principal(db, "1").full_name == "Jane Q. Doe"
+    db.close()
+
+
+def test_invalidate_forces_reload(session_factory):
+    db = session_factory()
+    load_principal(db, "1")
+    invalidate_principal(1)
+    session_factory.statements.clear()
+    load_principal(db, "1")
+    assert len(session_factory.statements) == 1
+    db.close()
+
+
+def test_inactive_users_are_rejected_unless_requested(session_factory):
+    db = session_factory()
+    assert load_principal(db, "2") is None
+    assert load_principal(db, "2", active_only=False).email == "old@example.com"
+    assert load_principal(db, "999") is None
+    db.close()
+
+
+def test_entries_never_outlive_the_token():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("expired", 1, expires_at=time.time() - 1)
+    assert cache.get("expired") is None
+
+    cache.set("short", 1, expires_at=time.time() + 0.05)
+    assert cache.get("short") == 1
+    time.sleep(0.1)
+    assert cache.get("short") is None
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
@@ -0,0 +1,88 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from graphql import parse
+
+from backend.gql import cost
+from backend.gql.cost import operation_cost
+from backend.gql.router import schema
+
+
+def estimate(query, variables=None):
+    return operation_cost(schema._schema, parse(query), variables=variables)
+
+
+def test_lists_multiply_by_page_size_or_assumed_table_size():
+    assert estimate("{ messages(limit: 30) { messages { id } } }").cost == 1 + 30
+    assert estimate("{ messages(limit: 30) { messages { id sender { email } } } }").cost == 1 + 30 * 2
+    assert estimate(
+        "query($first: Int) { appointmentsConnection(first: $first) { nodes { id user { email } } } }",
+        {"first": 5},
+    ).cost == 1 + 5 * 2
+    # Unpaginated root lists read the whole table
+    assert estimate("{ allAppointments { id user { email } } }").cost == cost.GRAPHQL_UNBOUNDED_LIST_SIZE * 2
+    # Fragments are followed; scalars and introspection are free
+    assert estimate("""
+        { appointment(appointmentId: 1) { ...Who __typename } }
+        fragment Who on AppointmentType { user { email } }
+    """).cost == 2
+
+
+def test_date_ranges_cost_one_per_day():
+    query = '{ getUserActivityStats(startDate: "2024-01-01", endDate: "%s") { activeUsers } }'
+    assert estimate(query % "2024-01-31").cost == 31
+    assert estimate(query % "2027-01-01").cost > cost.GRAPHQL_MAX_QUERY_COST
+
+
+def test_operations_over_the_static_limits_do_not_run():
+    nested = "{ appointment(appointmentId: 1) { user { id } } }"
+    activity = '{ getUserActivityStats(startDate: "2020-01-01", endDate: "2024-12-31") { activeUsers } }'
+
+    async def scenario():
+        with patch.object(cost, "GRAPHQL_MAX_DEPTH", 1):
+            too_deep = await schema.execute(nested, context_value={})
+        # Would build an entry per day for five years without ever reaching the database here
+        too_costly = await schema.execute(activity, context_value={})
+        return too_deep, too_costly
+
+    too_deep, too_costly = asyncio.run(scenario())
+    assert too_deep.data is None
+    assert too_deep.errors[0].extensions["code"] == "QUERY_TOO_DEEP"
+    assert too_costly.errors[0].extensions["code"] == "QUERY_TOO_COSTLY"
+    assert too_costly.extensions["cost"]["requested"] == 1827
+
+
+def test_http_clients_spend_a_budget_reported_in_extensions():
+    fakeredis = pytest.importorskip("fakeredis")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.gql.router import router
+    from backend.redis_client import async_redis_client
+    from backend.security import limiter
+
+    app = FastAPI()
+    app.include_router(router, prefix="/graphql")
+    query = "{ messagesConnection(first: 40) { nodes { id } } }"
+
+    # No local leases, so every charge is visible in Redis at once
+    with patch.object(async_redis_client, "redis", fakeredis.aioredis.FakeRedis(decode_responses=True)), \
+            patch.object(cost, "GRAPHQL_COST_BUDGET", "100 per hour"), \
+            patch.object(limiter, "lease_size", 1), TestClient(app) as client:
+        first = client.post("/graphql", json={"query": query}).json()
+        second = client.post("/graphql", json={"query": query}).json()
+        third = client.post("/graphql", json={"query": query}).json()
+
+        # Requests that never execute still pay one unit each
+        for _ in range(17):
+            assert "errors" in client.post("/graphql", json={"query": "{ messagesConnection {"}).json()
+        broke = client.post("/graphql", json={"query": "{ __typename }"}).json()
+
+    assert first["extensions"]["cost"]["requested"] == 41
+    assert first["extensions"]["cost"]["budget"]["remaining"] == 59
+    assert second["extensions"]["cost"]["budget"]["remaining"] == 18
+    assert third["data"] is None
+    assert third["errors"][0]["extensions"]["code"] == "RATE_LIMITED"
+    assert third["errors"][0]["extensions"]["retryAfter"] > 0
+    assert broke["errors"][0]["extensions"]["code"] == "RATE_LIMITED"
@@ -0,0 +1,212 @@
+"""
+EXPLAIN regression tests for the hot query shapes.
+
+Each query is explained on a seeded database and fails if it reads one of
+its tables with a sequential scan. The indexes are the ones the 20261017
+migrations build, and must match the models' indexes. Runs on SQLite by
+default; set EXPLAIN_DATABASE_URL to a scratch Postgres database to check
+the real planner (the tables are dropped and recreated there).
+"""
+import importlib.util
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import Index, create_engine, func, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from backend import models
+from backend.contact_models import Base as ContactBase, Contact
+
+USERS = 200
+ROWS = 5000
+START = datetime(2020, 1, 1)
+
+MIGRATIONS = Path(__file__).resolve().parents[1] / "migrations" / "versions"
+INDEX_MIGRATIONS = ("20261017_appointment_indexes", "20261017_message_contact_indexes")
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "sqlite")
+def _explain_sqlite(element, compiler, **kw):
+    return "EXPLAIN QUERY PLAN " + compiler.process(element.statement, **kw)
+
+
+@compiles(Explain, "postgresql")
+def _explain_postgresql(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def migrated_indexes():
+    """CREATE INDEX statements left in place by INDEX_MIGRATIONS, by index name"""
+    statements = {}
+    for revision in INDEX_MIGRATIONS:
+        spec = importlib.util.spec_from_file_location(revision, MIGRATIONS / f"{revision}.py")
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        with patch.object(migration, "op", MagicMock()) as op:
+            migration.upgrade()
+        for call in op.execute.call_args_list:
+            sql = call.args[0]
+            created = re.match(r"CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+) ON (.+)", sql)
+            dropped = re.match(r"DROP INDEX CONCURRENTLY IF EXISTS (\w+)", sql)
+            if created:
+                statements[created[1]] = f"CREATE INDEX {created[1]} ON {created[2]}"
+            elif dropped:
+                statements.pop(dropped[1], None)
+            else:
+                raise AssertionError(f"Unexpected statement in {revision}: {sql}")
+    return statements
+
+
+def model_indexes():
+    """The indexes the models declare in __table_args__, as CREATE INDEX statements by name"""
+    return {
+        arg.name: str(CreateIndex(arg).compile(dialect=postgresql.dialect()))
+        for model in (models.Appointment, models.Message, Contact)
+        for arg in model.__table_args__
+        if isinstance(arg, Index)
+    }
+
+
+def seed(engine):
+    for base in (models.Base, ContactBase):
+        base.metadata.drop_all(engine)
+        base.metadata.create_all(engine)
+    # Plan against the indexes existing databases get from the migrations
+    with engine.begin() as conn:
+        for name, statement in migrated_indexes().items():
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            conn.execute(text(statement))
+    statuses = list(models.AppointmentStatus)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"id": i, "email": f"user{i}@example.com", "full_name": f"User {i}", "first_name": "User",
+             "last_name": str(i), "phone": "555-0100", "hashed_password": "x", "role": models.Role.CLIENT}
+            for i in range(1, USERS + 1)
+        ])
+        conn.execute(models.Appointment.__table__.insert(), [
+            {"user_id": i % USERS + 1, "first_name": "User", "last_name": str(i), "email": f"user{i % USERS + 1}@example.com",
+             "phone": "555-0100", "service": f"Service {i % 7}", "appointment_date": START + timedelta(hours=7 * i),
+             "status": statuses[i % len(statuses)]}
+            for i in range(ROWS)
+        ])
+        conn.execute(models.Message.__table__.insert(), [
+            {"sender_id": i % USERS + 1, "subject": "Hello", "content": "Hi", "message_type": models.MessageType.EMAIL,
+             "status": models.MessageStatus.SENT, "recipient_type": models.MessageRecipientType.SPECIFIC,
+             "created_at": START + timedelta(minutes=i), "updated_at": START}
+            for i in range(ROWS)
+        ])
+        conn.execute(models.MessageRecipient.__table__.insert(), [
+            {"message_id": i + 1, "recipient_id": (i * 7) % USERS + 1, "status": models.MessageStatus.SENT}
+            for i in range(ROWS)
+        ])
+        conn.execute(Contact.__table__.insert(), [
+            {"name": f"Contact {i}", "email": f"contact{i}@example.com", "subject": "Question", "message": "Hi",
+             "created_at": START + timedelta(minutes=i)}
+            for i in range(ROWS)
+        ])
+        conn.execute(text("ANALYZE"))
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    url = os.getenv("EXPLAIN_DATABASE_URL") or f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+    engine = create_engine(url)
+    seed(engine)
+    yield engine
+    engine.dispose()
+
+
+def seq_scans(engine, statement):
+    """Tables the plan of ``statement`` reads with a sequential scan"""
+    with engine.connect() as conn:
+        rows = conn.execute(Explain(statement)).all()
+    if engine.dialect.name == "sqlite":
+        # "SCAN t" is a full scan; "SCAN t USING INDEX" walks an index in order
+        return [row[-1].split()[1] for row in rows if row[-1].startswith("SCAN ") and "USING" not in row[-1]]
+
+    plan = rows[0][0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    found, nodes = [], [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan":
+            found.append(node["Relation Name"])
+        nodes.extend(node.get("Plans", ()))
+    return found
+
+
+Appointment = models.Appointment
+Message = models.Message
+window_start = START + timedelta(days=100)
+
+HOT_QUERIES = {
+    "createAppointment duplicate check": select(Appointment).where(
+        Appointment.email == "user7@example.com",
+        Appointment.service == "Service 3",
+        Appointment.status != models.AppointmentStatus.CANCELLED,
+    ).limit(1),
+    "createAppointment overlap check": select(Appointment).where(
+        Appointment.appointment_date.between(window_start - timedelta(hours=1), window_start + timedelta(hours=1)),
+        Appointment.status != models.AppointmentStatus.CANCELLED,
+    ).limit(1),
+    "userAppointments": select(Appointment).where(
+        Appointment.user_id == 7
+    ).order_by(Appointment.appointment_date.desc()),
+    "analytics daily count": select(func.count(Appointment.id)).where(
+        Appointment.appointment_date >= window_start,
+        Appointment.appointment_date < window_start + timedelta(days=1),
+    ),
+    "messages sent": select(Message).where(
+        Message.sender_id == 7
+    ).order_by(Message.created_at.desc()).limit(20),
+    "messages inbox": select(Message).join(
+        models.MessageRecipient, models.MessageRecipient.message_id == Message.id
+    ).where(models.MessageRecipient.recipient_id == 7).order_by(Message.created_at.desc()).limit(20),
+    "messages all": select(Message).order_by(Message.created_at.desc()).limit(20),
+    "contact list": select(Contact).order_by(Contact.created_at.desc()).offset(0).limit(100),
+    # Keyset pages of the GraphQL connections, after a cursor deep in the table
+    "appointmentsConnection page": select(Appointment).where(
+        tuple_(Appointment.appointment_date, Appointment.id) < tuple_(window_start, 500)
+    ).order_by(Appointment.appointment_date.desc(), Appointment.id.desc()).limit(21),
+    "userAppointmentsConnection page": select(Appointment).where(
+        Appointment.user_id == 7,
+        tuple_(Appointment.appointment_date, Appointment.id) < tuple_(window_start, 500),
+    ).order_by(Appointment.appointment_date.desc(), Appointment.id.desc()).limit(21),
+    "messagesConnection sent page": select(Message).where(
+        Message.sender_id == 7,
+        tuple_(Message.created_at, Message.id) < tuple_(window_start, 500),
+    ).order_by(Message.created_at.desc(), Message.id.desc()).limit(21),
+    "contactsConnection page": select(Contact).where(
+        tuple_(Contact.created_at, Contact.id) < tuple_(window_start, 500)
+    ).order_by(Contact.created_at.desc(), Contact.id.desc()).limit(21),
+}
+
+
+def test_migrations_build_the_model_indexes():
+    assert migrated_indexes() == model_indexes()
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_uses_an_index(engine, name):
+    assert seq_scans(engine, HOT_QUERIES[name]) == []
+
+
+def test_detects_sequential_scans(engine):
+    unindexed = select(Appointment).where(Appointment.notes == "x")
+    assert seq_scans(engine, unindexed) == ["appointments"]
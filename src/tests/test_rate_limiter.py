@@ -0,0 +1,83 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from backend.rate_limiter import RateLimiter, parse
+from backend.redis_client import async_redis_client
+from backend.tests.helpers import run_with_redis
+
+
+def make_request(ip="10.0.0.1"):
+    return Request({"type": "http", "method": "GET", "path": "/x", "headers": [], "client": (ip, 1234)})
+
+
+def test_limit_is_exact_across_workers():
+    async def scenario(r):
+        workers = [RateLimiter(), RateLimiter()]
+        results = [await workers[i % 2].hit("login:ip:1", "20/minute") for i in range(30)]
+        assert sum(result.allowed for result in results) == 20
+        assert not results[-1].allowed
+        assert results[-1].retry_after > 0
+
+    run_with_redis(scenario)
+
+
+def test_clients_well_under_the_limit_mostly_skip_redis():
+    async def scenario(r):
+        limiter = RateLimiter(lease_size=10)
+        with patch.object(r, "evalsha", wraps=r.evalsha) as evalsha:
+            results = [await limiter.hit("api:user:1", "1000/hour") for _ in range(100)]
+        assert all(result.allowed for result in results)
+        assert evalsha.call_count <= 12
+        # Leased requests are already counted in Redis
+        assert results[-1].remaining == 900
+
+    run_with_redis(scenario)
+
+
+def test_falls_back_to_local_limits_while_redis_is_down():
+    async def scenario(r):
+        limiter = RateLimiter()
+        with patch.object(async_redis_client, "is_healthy", return_value=False), \
+                patch.object(r, "evalsha", side_effect=AssertionError("Redis used")):
+            results = [await limiter.hit("api:ip:1", "5/minute") for _ in range(7)]
+        assert [result.allowed for result in results] == [True] * 5 + [False] * 2
+
+    run_with_redis(scenario)
+
+
+def test_route_decorator_is_per_route_and_per_client():
+    async def scenario(r):
+        limiter = RateLimiter()
+
+        @limiter.limit("2/minute")
+        async def endpoint(request):
+            return "ok"
+
+        assert await endpoint(request=make_request()) == "ok"
+        assert await endpoint(request=make_request()) == "ok"
+        with pytest.raises(HTTPException) as exc:
+            await endpoint(request=make_request())
+        assert exc.value.status_code == 429
+        assert int(exc.value.headers["Retry-After"]) >= 1
+        assert await endpoint(request=make_request("10.0.0.2")) == "ok"
+
+    run_with_redis(scenario)
+
+
+def test_redis_client_rate_limit_is_atomic():
+    async def scenario(r):
+        results = await asyncio.gather(*[async_redis_client.is_rate_limited("rl:test", 10, 60) for _ in range(25)])
+        assert sum(not limited for limited, _ in results) == 10
+
+    run_with_redis(scenario)
+
+
+def test_parse():
+    assert (parse("500 per day").amount, parse("500 per day").period) == (500, 86400)
+    assert parse("10 per 5 minutes").period == 300
+    with pytest.raises(ValueError):
+        parse("lots")
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import models
+from backend.database import ReplicaRouter, SerializedAsyncSession
+
+
+async def make_database(path, email):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+        await conn.execute(models.User.__table__.insert().values(
+            id=1, email=email, full_name="Jane Doe", hashed_password="x"
+        ))
+    return engine, sessionmaker(engine, class_=SerializedAsyncSession, expire_on_commit=False)
+
+
+async def read_email(router, Primary):
+    async with Primary() as primary_db:
+        db = await router.async_read_session(primary_db)
+        try:
+            return (await db.execute(select(models.User.email))).scalar_one()
+        finally:
+            if db is not primary_db:
+                await db.close()
+
+
+def test_reads_follow_the_replica_except_after_a_write(tmp_path):
+    shared = {}
+
+    async def mark(key, seconds):
+        shared[key] = seconds
+
+    async def wrote_recently(key):
+        return key in shared
+
+    async def scenario():
+        primary, Primary = await make_database(tmp_path / "primary.db", "primary@example.com")
+        replica, Replica = await make_database(tmp_path / "replica.db", "replica@example.com")
+        router = ReplicaRouter(async_replica_factory=Replica)
+        router.instrument(primary.sync_engine)
+        router.track_writes(mark, wrote_recently)
+        seen = []
+        try:
+            # Outside a tracked request reads go to the replica
+            seen.append(await read_email(router, Primary))
+
+            # A request that writes reads its own write from the primary...
+            token = router.begin_request("ip:10.0.0.1")
+            router.identify("user:1")
+            async with Primary() as db:
+                await db.execute(update(models.User).values(full_name="Jane Roe"))
+                await db.commit()
+            seen.append(await read_email(router, Primary))
+            await router.record_writes()
+            router.end_request(token)
+
+            # ...and so do its next requests, on this worker or another one
+            for worker in (router, ReplicaRouter(async_replica_factory=Replica)):
+                worker.track_writes(mark, wrote_recently)
+                token = worker.begin_request("user:1")
+                seen.append(await read_email(worker, Primary))
+                worker.end_request(token)
+
+            token = router.begin_request("user:2")
+            seen.append(await read_email(router, Primary))
+            router.end_request(token)
+        finally:
+            await primary.dispose()
+            await replica.dispose()
+        return seen
+
+    assert asyncio.run(scenario()) == [
+        "replica@example.com",
+        "primary@example.com",
+        "primary@example.com",
+        "primary@example.com",
+        "replica@example.com",
+    ]
+
+
+def test_unreachable_replica_falls_back_to_the_primary(tmp_path):
+    async def scenario():
+        primary, Primary = await make_database(tmp_path / "primary.db", "primary@example.com")
+        missing = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+        router = ReplicaRouter(
+            async_replica_factory=sessionmaker(missing, class_=SerializedAsyncSession),
+            retry_after=60,
+        )
+        try:
+            emails = [await read_email(router, Primary) for _ in range(2)]
+        finally:
+            await primary.dispose()
+            await missing.dispose()
+        return router, emails
+
+    router, emails = asyncio.run(scenario())
+    assert emails == ["primary@example.com"] * 2
+    # The second read did not try the replica again
+    assert router.fallbacks == 1
+    assert router.stats()["available"] is False
@@ -0,0 +1,77 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from backend.redis_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    GuardedAsyncRedis,
+    async_redis_client,
+)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3)
+    opened = []
+    breaker.on_open = lambda: opened.append(True)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.is_closed
+
+    breaker.record_failure()
+    assert not breaker.is_closed
+    assert opened == [True]
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.is_closed
+    breaker.before_call()
+
+
+def test_real_command_failures_trip_breaker_and_probe_recovers():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    breaker = CircuitBreaker("test", failure_threshold=2, probe_interval=0.05)
+    breaker.on_open = async_redis_client._start_probe
+    client = GuardedAsyncRedis(
+        connection_pool=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True).connection_pool,
+        breaker=breaker,
+    )
+
+    async def scenario():
+        with patch.object(async_redis_client, "redis", client), \
+                patch.object(async_redis_client, "breaker", breaker):
+            await async_redis_client.redis.set("k", "v")
+            assert async_redis_client.is_healthy()
+
+            server.connected = False
+            assert await async_redis_client.is_valid_refresh_token("1", "jti") is True  # fails open
+            assert await async_redis_client.delete_session("session:1") is False
+            assert not async_redis_client.is_healthy()
+
+            # Fails fast while open; pipelines are guarded too
+            with pytest.raises(CircuitOpenError):
+                await client.get("k")
+            with pytest.raises(CircuitOpenError):
+                await client.pipeline().get("k").execute()
+
+            server.connected = True
+            for _ in range(50):
+                if async_redis_client.is_healthy():
+                    break
+                await asyncio.sleep(0.02)
+            assert async_redis_client.is_healthy()
+            assert await client.get("k") == "v"
+
+    asyncio.run(scenario())
+
+
+def test_is_healthy_does_not_touch_redis():
+    with patch.object(async_redis_client.redis, "execute_command", side_effect=AssertionError("PING sent")):
+        assert async_redis_client.is_healthy() is True
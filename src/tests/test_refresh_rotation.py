@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
+
+from backend import models
+from backend.auth import create_refresh_token
+from backend.database import SerializedAsyncSession
+from backend.redis_client import async_redis_client
+from backend.routers.auth import RefreshTokenRequest, refresh_token
+from backend.tests.helpers import local_redis, run_with_redis
+
+PARALLEL_REFRESHES = 50
+
+
+def test_rotation_and_reuse_detection():
+    async def scenario(r):
+        await async_redis_client.issue_tokens("1", "jti-a", 60, "fam")
+        assert await async_redis_client.rotate_refresh_token("1", "jti-a", "jti-b", 60, "fam") == "ok"
+        assert await r.get("token_family:1:fam") == "jti-b"
+        assert not await r.exists("refresh_token:1:jti-a")
+
+        # Within the grace period a repeat is refused but the family survives
+        assert await async_redis_client.rotate_refresh_token("1", "jti-a", "jti-c", 60, "fam") == "invalid"
+        assert await r.get("token_family:1:fam") == "jti-b"
+
+        # Once it has passed, presenting the rotated-away token again burns
+        # the family and every other refresh token of the user
+        await async_redis_client.issue_tokens("1", "jti-x", 60, "other")
+        await r.delete("rotated_refresh_token:1:jti-a")
+        assert await async_redis_client.rotate_refresh_token("1", "jti-a", "jti-c", 60, "fam") == "reuse"
+        assert await r.keys("refresh_token:1:*") == []
+        assert await r.keys("token_family:1:*") == []
+        assert not await r.exists("user_index:1:refresh_tokens")
+        assert await async_redis_client.rotate_refresh_token("1", "jti-b", "jti-d", 60, "fam") == "invalid"
+
+    run_with_redis(scenario, local_redis)
+
+
+def test_parallel_rotations_of_one_token_admit_a_single_winner():
+    async def scenario(r):
+        await async_redis_client.issue_tokens("1", "jti-0", 60, "fam")
+        results = await asyncio.gather(*[
+            async_redis_client.rotate_refresh_token("1", "jti-0", f"jti-{i + 1}", 60, "fam")
+            for i in range(PARALLEL_REFRESHES)
+        ])
+        assert results.count("ok") == 1
+        assert results.count("invalid") == PARALLEL_REFRESHES - 1
+        # The losers did not burn the winner's successor
+        winner = f"jti-{results.index('ok') + 1}"
+        assert await r.get("token_family:1:fam") == winner
+        assert await r.keys("refresh_token:1:*") == [f"refresh_token:1:{winner}"]
+
+    run_with_redis(scenario, local_redis)
+
+
+def test_parallel_refresh_requests():
+    pytest.importorskip("aiosqlite")
+    token, family = create_refresh_token("1")
+    jti = jwt.get_unverified_claims(token)["jti"]
+    request = Request({"type": "http", "method": "POST", "path": "/api/auth/refresh-token", "headers": []})
+
+    async def attempt(db):
+        try:
+            return await refresh_token(request, RefreshTokenRequest(refresh_token=token), db=db)
+        except HTTPException as e:
+            return e.status_code
+
+    async def scenario(r):
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+        # All attempts share one session, as concurrent GraphQL resolvers do
+        async with sessionmaker(engine, class_=SerializedAsyncSession, expire_on_commit=False)() as db:
+            db.add(models.User(id=1, email="jane@example.com", full_name="Jane Doe", hashed_password="x"))
+            await db.commit()
+
+            await async_redis_client.issue_tokens("1", jti, 60, family)
+            results = await asyncio.gather(*[attempt(db) for _ in range(PARALLEL_REFRESHES)])
+        await engine.dispose()
+        winners = [res for res in results if not isinstance(res, int)]
+        assert len(winners) == 1
+        assert all(res == 401 for res in results if isinstance(res, int))
+
+    run_with_redis(scenario, local_redis)
@@ -0,0 +1,69 @@
+from unittest.mock import AsyncMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.rate_limiter import RateLimitResult
+from backend.security import SecurityMiddleware
+
+
+def make_client(limiter=None):
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items():
+        return {"ok": True}
+
+    @app.get("/api/docs/page")
+    async def docs_page():
+        return {"ok": True}
+
+    app.add_middleware(SecurityMiddleware, limiter=limiter, allowed_origins=["http://localhost:3000"])
+    return TestClient(app)
+
+
+def test_preflight_is_answered_without_reaching_the_app():
+    client = make_client()
+    response = client.options("/items", headers={
+        "Origin": "http://localhost:3000",
+        "Access-Control-Request-Method": "POST",
+        "Access-Control-Request-Headers": "authorization, content-type",
+    })
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+    assert response.headers["access-control-allow-headers"] == "authorization, content-type"
+    assert "POST" in response.headers["access-control-allow-methods"]
+
+    rejected = client.options("/items", headers={
+        "Origin": "http://evil.example",
+        "Access-Control-Request-Method": "POST",
+    })
+    assert rejected.status_code == 400
+
+
+def test_response_headers_are_added_once():
+    client = make_client()
+    response = client.get("/items", headers={"Origin": "http://localhost:3000"})
+    assert response.status_code == 200
+    assert response.headers["x-frame-options"] == "DENY"
+    assert "content-security-policy" in response.headers
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert len(response.headers.get_list("x-process-time")) == 1
+
+    docs = client.get("/api/docs/page", headers={"Origin": "http://unknown.example"})
+    assert "content-security-policy" not in docs.headers
+    assert "access-control-allow-origin" not in docs.headers
+
+
+def test_rate_limited_requests_get_429_with_headers():
+    limiter = AsyncMock()
+    limiter.check_default_limits.return_value = RateLimitResult(False, 100, 0, 30, 1700000000)
+    response = make_client(limiter).get("/items")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+    assert response.headers["x-ratelimit-limit"] == "100"
+
+    limiter.check_default_limits.return_value = RateLimitResult(True, 100, 42, 0, 1700000000)
+    response = make_client(limiter).get("/items")
+    assert response.status_code == 200
+    assert response.headers["x-ratelimit-remaining"] == "42"
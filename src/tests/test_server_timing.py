@@ -0,0 +1,61 @@
+import bcrypt
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from backend import server_timing
+from backend.password_hasher import password_hasher
+from backend.security import SecurityMiddleware
+from backend.server_timing import TimedJSONResponse, instrument_engine
+
+
+def parse_server_timing(value):
+    metrics = {}
+    for part in value.split(", "):
+        name, *params = part.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+def make_client():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    hashed = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode()
+    app = FastAPI(default_response_class=TimedJSONResponse)
+
+    @app.get("/sync")
+    def sync_endpoint():
+        # Runs in the threadpool, in a copy of the request context
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return {"ok": True}
+
+    @app.get("/login")
+    async def login():
+        return {"valid": await password_hasher.verify("secret", hashed)}
+
+    app.add_middleware(SecurityMiddleware, allowed_origins=[])
+    return TestClient(app)
+
+
+def test_breakdown_is_reported_per_request():
+    client = make_client()
+    metrics = parse_server_timing(client.get("/sync").headers["server-timing"])
+    assert metrics["db"]["desc"] == '"2"'
+    assert float(metrics["db"]["dur"]) >= 0
+    assert "serialize" in metrics
+    assert float(metrics["total"]["dur"]) >= float(metrics["db"]["dur"])
+
+    # Each request starts from an empty collector
+    metrics = parse_server_timing(client.get("/login").headers["server-timing"])
+    assert "db" not in metrics
+    assert metrics["bcrypt"]["desc"] == '"1"'
+
+
+def test_nothing_is_recorded_outside_a_request():
+    assert server_timing.current() is None
+    with server_timing.timed("redis"):
+        pass
+    server_timing.record("db", 1.0)
+    assert server_timing.current() is None
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from backend import sql_monitor
+from backend.gql.loaders import Loaders
+from backend.gql.router import schema
+from backend.security import SecurityMiddleware
+from backend.tests.helpers import seeded_session
+
+
+def test_request_statements_are_counted_per_endpoint():
+    engine = create_engine("sqlite://")
+    sql_monitor.instrument_engine(engine)
+    app = FastAPI()
+
+    @app.get("/report")
+    def report():
+        with engine.connect() as conn:
+            for day in range(3):
+                conn.execute(text("SELECT :day"), {"day": day})
+        return {"ok": True}
+
+    app.add_middleware(SecurityMiddleware, allowed_origins=[])
+    with sql_monitor.capture() as logs:
+        TestClient(app).get("/report")
+
+    assert [log.label for log in logs] == ["GET /report"]
+    assert logs[0].count == 3
+    assert logs[0].repeated(threshold=3) == [("SELECT ?", 3)]
+
+
+def test_graphql_operation_flags_repeated_statements(caplog):
+    # Aliased root fields are not batched: one lookup per alias
+    aliases = "\n".join(f"a{i}: appointment(appointmentId: {i}) {{ id }}" for i in range(1, 7))
+    query = f"query SixAppointments {{ {aliases} }}"
+
+    async def scenario():
+        engine, db = await seeded_session()
+        sql_monitor.instrument_engine(engine.sync_engine)
+        db.expunge_all()  # make db.get() go to the database
+        try:
+            return await schema.execute(
+                query,
+                context_value={"async_db": db, "async_read_db": db, "db": None, "current_user": None,
+                               "loaders": Loaders(db)},
+            )
+        finally:
+            await db.close()
+            await engine.dispose()
+
+    with sql_monitor.capture() as logs, caplog.at_level(logging.WARNING, logger="backend.sql_monitor"):
+        result = asyncio.run(scenario())
+
+    assert result.errors is None
+    log = logs[-1]
+    assert log.label == "graphql SixAppointments"
+    assert log.count == 6
+    assert log.repeated()[0][1] == 6
+    assert "Possible N+1 in graphql SixAppointments" in caplog.text
@@ -0,0 +1,53 @@
+"""
+Worker boot time.
+
+Imports ``backend.main`` in a fresh interpreter under ``-X importtime`` and
+fails if the import pulls in the DocuSign SDK or reportlab. The boot time
+(importtime's own overhead included) is printed; it only fails the test
+when STARTUP_BUDGET_MS is set and exceeded, since it depends on the
+machine. The database URL points at a server that does not exist, so the
+import must not connect.
+"""
+import os
+import subprocess
+import sys
+
+STARTUP_BUDGET_MS = os.getenv("STARTUP_BUDGET_MS")
+LAZY_MODULES = ("docusign_esign", "reportlab")
+
+
+def import_profile():
+    """Map of module name to cumulative import time in microseconds"""
+    env = {
+        key: value for key, value in os.environ.items()
+        if not key.startswith("DOCUSIGN_")
+    }
+    env.update(
+        PYTHONPATH=os.pathsep.join(sys.path),
+        DATABASE_URL="postgresql://nobody@127.0.0.1:9/none",
+        JWT_SECRET_KEY=env.get("JWT_SECRET_KEY", "startup-test"),
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.main"],
+        env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def test_main_imports_without_heavy_sdks(record_property):
+    profile = import_profile()
+
+    loaded = sorted({name.split(".")[0] for name in profile} & set(LAZY_MODULES))
+    assert loaded == []
+    boot_ms = profile["backend.main"] / 1000
+    record_property("boot_ms", round(boot_ms))
+    print(f"backend.main took {boot_ms:.0f} ms to import")
+    if STARTUP_BUDGET_MS:
+        assert boot_ms < float(STARTUP_BUDGET_MS), f"backend.main took {boot_ms:.0f} ms to import"
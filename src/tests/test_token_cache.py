@@ -0,0 +1,54 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from backend import auth
+from backend.redis_client import async_redis_client
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    auth.token_cache.clear()
+    yield
+    auth.token_cache.clear()
+
+
+def test_repeat_verification_skips_decode():
+    token = auth.create_access_token(user_id="7")
+    with patch.object(async_redis_client, "is_blacklisted", return_value=False), \
+            patch.object(auth, "_decode_token", wraps=auth._decode_token) as decode:
+        first = asyncio.run(auth.verify_token(token))
+        second = asyncio.run(auth.verify_token(token))
+    assert first == second
+    assert first["sub"] == "7"
+    assert decode.call_count == 1
+
+
+def test_blacklisted_token_is_rejected_even_when_cached():
+    token = auth.create_access_token(user_id="7")
+    with patch.object(async_redis_client, "is_blacklisted", return_value=False):
+        asyncio.run(auth.verify_token(token))
+    with patch.object(async_redis_client, "is_blacklisted", return_value=True):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(auth.verify_token(token))
+    assert exc.value.status_code == 401
+    assert auth.token_cache.get(auth._token_digest(token)) is None
+
+
+def test_expired_tokens_are_not_cached():
+    token = auth.create_access_token(user_id="7", expires_delta=timedelta(seconds=-5))
+    with patch.object(async_redis_client, "is_blacklisted", return_value=False):
+        with pytest.raises(HTTPException):
+            asyncio.run(auth.verify_token(token))
+    assert len(auth.token_cache) == 0
+
+
+def test_callers_cannot_mutate_cached_claims():
+    token = auth.create_access_token(user_id="7")
+    with patch.object(async_redis_client, "is_blacklisted", return_value=False):
+        payload = asyncio.run(auth.verify_token(token))
+        payload["sub"] = "999"
+        assert asyncio.run(auth.verify_token(token))["sub"] == "7"
@@ -0,0 +1,60 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from jose import jwt
+from starlette.requests import Request
+
+from backend.redis_client import async_redis_client
+from backend.routers.auth import create_token_response
+from backend.tests.helpers import run_with_redis
+
+
+def make_request():
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/api/auth/login",
+        "headers": [(b"user-agent", b"pytest")],
+        "client": ("10.0.0.1", 1234),
+    })
+
+
+def test_issue_tokens_writes_everything_in_one_transaction():
+    async def scenario(r):
+        with patch.object(r, "setex", side_effect=AssertionError("unbatched write")):
+            assert await async_redis_client.issue_tokens(
+                user_id="5",
+                token_id="jti-1",
+                expires_in=60,
+                token_family="fam-1",
+                session_key="session:5:10.0.0.1:pytest",
+                session_data={"ip": "10.0.0.1"},
+            )
+        assert await r.get("token_family:5:fam-1") == "jti-1"
+        assert await r.get("refresh_token:5:jti-1") == "fam-1"
+        assert json.loads(await r.get("session:5:10.0.0.1:pytest")) == {"ip": "10.0.0.1"}
+        assert 0 < await r.ttl("refresh_token:5:jti-1") <= 60
+
+    run_with_redis(scenario)
+
+
+def test_login_registers_the_issued_refresh_token():
+    user = SimpleNamespace(id=5, email="a@example.com", full_name="A", phone="", role=None, is_active=True)
+
+    async def scenario(r):
+        with patch.object(async_redis_client, "is_healthy", side_effect=AssertionError("no PING on login")):
+            response = await create_token_response(user, db=None, request=make_request())
+        claims = jwt.get_unverified_claims(response.refresh_token)
+        assert await r.get(f"refresh_token:5:{claims['jti']}") == claims["tf"]
+        assert await r.get(f"token_family:5:{claims['tf']}") == claims["jti"]
+        session = json.loads(await r.get("session:5:10.0.0.1:pytest"))
+        assert session["user_agent"] == "pytest"
+
+    run_with_redis(scenario)
+
+
+def test_issue_tokens_reports_failure():
+    with patch.object(async_redis_client.redis, "pipeline", side_effect=ConnectionError("down")):
+        assert asyncio.run(async_redis_client.issue_tokens(user_id="5", token_id="jti-1", expires_in=60)) is False
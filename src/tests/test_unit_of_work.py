@@ -0,0 +1,135 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import connection_leaks
+from backend.contact_models import Base as ContactBase, Contact
+from backend.database import SerializedAsyncSession, replica_router
+from backend.gql.loaders import Loaders
+from backend.gql.router import schema
+from backend.gql.unit_of_work import RequestContext, UnitOfWork
+
+CREATE = """
+    mutation Create($email: String!) {
+        createContact(input: {name: "Jane", email: $email, phone: "555-0100", subject: "Hi", message: "Hello"}) { id }
+    }
+"""
+CREATE_THEN_FAIL = """
+    mutation CreateThenFail {
+        createContact(input: {name: "Jane", email: "a@example.com", phone: "1", subject: "Hi", message: "Hello"}) { id }
+        updateContactStatus(contactId: 999, status: "read") { id }
+    }
+"""
+
+CREATE_THEN_FAILED_DELETE = """
+    mutation CreateThenDelete {
+        createContact(input: {name: "Jane", email: "kept@example.com", phone: "1", subject: "Hi", message: "Hello"}) { id }
+        deleteAppointment(input: {id: 1})
+    }
+"""
+
+
+def run_requests(tmp_path, requests):
+    """Run each (query, variables) as its own request; returns (results, opened sessions, contacts)"""
+    pytest.importorskip("aiosqlite")
+    url = f"sqlite:///{tmp_path}/uow.db"
+    engine = create_engine(url)
+    ContactBase.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    opened = []
+
+    def session_factory():
+        opened.append(factory())
+        return opened[-1]
+
+    async def scenario():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/uow.db")
+        results = []
+        for query, variables in requests:
+            async_db = SerializedAsyncSession(async_engine)
+            unit_of_work = UnitOfWork(async_db, session_factory)
+            context = RequestContext(
+                async_db=async_db, async_read_db=async_db, current_user=None,
+                loaders=Loaders(async_db), unit_of_work=unit_of_work,
+            )
+            try:
+                results.append(await schema.execute(query, variable_values=variables, context_value=context))
+            finally:
+                await unit_of_work.close()
+        await async_engine.dispose()
+        return results
+
+    results = asyncio.run(scenario())
+    with factory() as db:
+        contacts = [email for email, in db.query(Contact.email).order_by(Contact.id)]
+    engine.dispose()
+    return results, opened, contacts
+
+
+def test_sync_session_opens_only_when_used_and_commits_once(tmp_path):
+    results, opened, contacts = run_requests(tmp_path, [
+        ("{ messagesConnection { pageInfo { hasNextPage } } }", None),
+        (CREATE, {"email": "jane@example.com"}),
+    ])
+
+    assert all(result.errors is None for result in results)
+    # The query never asked for the sync session; the mutation opened exactly one
+    assert len(opened) == 1
+    assert contacts == ["jane@example.com"]
+    assert not opened[0].in_transaction()
+
+
+def test_read_session_is_picked_on_first_use_only(tmp_path):
+    both_pages = """
+        { inbox: messagesConnection { pageInfo { hasNextPage } } sent: messagesConnection(type: "sent") { pageInfo { hasNextPage } } }
+    """
+    with patch.object(replica_router, "async_read_session", AsyncMock(side_effect=lambda db: db)) as pick:
+        run_requests(tmp_path, [(CREATE, {"email": "jane@example.com"})])
+        assert pick.call_count == 0
+        # Two resolvers ask for it concurrently; the replica is consulted once
+        results, _, _ = run_requests(tmp_path, [(both_pages, None)])
+        assert results[0].errors is None
+        assert pick.call_count == 1
+
+
+def test_operation_with_errors_is_rolled_back(tmp_path):
+    results, opened, contacts = run_requests(tmp_path, [(CREATE_THEN_FAIL, None)])
+
+    assert "Contact with ID 999 not found" in results[0].errors[0].message
+    assert contacts == []
+
+
+def test_failed_delete_only_rolls_back_its_savepoint(tmp_path):
+    # The contacts database has no appointments table, so the delete fails
+    results, opened, contacts = run_requests(tmp_path, [(CREATE_THEN_FAILED_DELETE, None)])
+
+    assert results[0].errors is None
+    assert results[0].data["deleteAppointment"] is False
+    assert contacts == ["kept@example.com"]
+
+
+def test_leaked_connections_are_reported(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/leaks.db")
+    connection_leaks.instrument_engine(engine, "sync")
+    Session = sessionmaker(bind=engine)
+
+    with connection_leaks.track("closed") as log:
+        with Session() as db:
+            db.execute(text("SELECT 1"))
+    assert log.leaked() == []
+
+    log, token = connection_leaks.start("leaky")
+    leaky = Session()
+    leaky.execute(text("SELECT 1"))
+    leaked = connection_leaks.finish(log, token)
+    leaky.close()
+    engine.dispose()
+
+    assert len(leaked) == 1
+    assert leaked[0]["pool"] == "sync"
+    assert "test_unit_of_work.py" in leaked[0]["origin"]
+    assert "test_leaked_connections_are_reported" in leaked[0]["origin"]
@@ -0,0 +1,77 @@
+from unittest.mock import Mock
+
+from backend.redis_client import REFRESH_INDEX, SESSIONS_INDEX, async_redis_client, user_index_key
+from backend.tests.helpers import fake_redis, run_with_redis
+
+
+async def redis_without_scans():
+    """Fails the test if the code under test walks the keyspace"""
+    r = await fake_redis()
+    r.keys = Mock(side_effect=AssertionError("KEYS"))
+    r.scan_iter = Mock(side_effect=AssertionError("SCAN"))
+    return r
+
+
+def test_revoking_a_user_only_touches_their_indexed_keys():
+    async def scenario(r):
+        await async_redis_client.issue_tokens("1", "a", 60, "fam-1", session_key="session:1:ip:ua")
+        await async_redis_client.issue_tokens("1", "b", 60, "fam-2")
+        await async_redis_client.issue_tokens("2", "c", 60, "fam-3")
+
+        assert await async_redis_client.revoke_all_user_refresh_tokens("1") == 4
+        assert not await r.exists("refresh_token:1:a", "refresh_token:1:b", "token_family:1:fam-1")
+        assert not await r.exists(user_index_key("1", REFRESH_INDEX))
+        assert await r.exists("refresh_token:2:c", "token_family:2:fam-3") == 2
+        assert await async_redis_client.get_user_sessions("1") == ["session:1:ip:ua"]
+
+    run_with_redis(scenario, redis_without_scans)
+
+
+def test_expired_keys_are_pruned_from_the_index():
+    async def scenario(r):
+        await async_redis_client.issue_tokens("1", "a", 60, session_key="session:1:ip:one")
+        await async_redis_client.issue_tokens("1", "b", 60, session_key="session:1:ip:two")
+        await r.delete("session:1:ip:one")  # as if it had expired
+
+        assert await async_redis_client.get_user_sessions("1") == ["session:1:ip:two"]
+        assert await r.smembers(user_index_key("1", SESSIONS_INDEX)) == {"session:1:ip:two"}
+
+        await async_redis_client.delete_session("session:1:ip:two")
+        assert await r.scard(user_index_key("1", SESSIONS_INDEX)) == 0
+
+    run_with_redis(scenario, redis_without_scans)
+
+
+def test_rotation_and_single_revocation_keep_the_index_exact():
+    async def scenario(r):
+        index = user_index_key("1", REFRESH_INDEX)
+        await async_redis_client.issue_tokens("1", "a", 60, "fam")
+        assert await async_redis_client.rotate_refresh_token("1", "a", "b", 60, "fam") == "ok"
+        assert await r.smembers(index) == {"refresh_token:1:b", "token_family:1:fam"}
+        assert await r.ttl(index) > 60
+
+        await async_redis_client.revoke_refresh_token("1", "b")
+        assert await r.smembers(index) == set()
+
+    run_with_redis(scenario, redis_without_scans)
+
+
+def test_keys_issued_before_the_indexes_existed_are_backfilled_and_revoked():
+    async def scenario(r):
+        # Written by a release that had no user indexes
+        await r.setex("refresh_token:1:legacy", 60, "fam")
+        await r.setex("token_family:1:fam", 60, "legacy")
+        await r.setex("session:1:ip:ua", 60, "{}")
+        await r.setex("refresh_token:2:other", 60, "")
+        await async_redis_client.issue_tokens("1", "new", 60)
+
+        assert await async_redis_client.run_backfill("user_indexes", async_redis_client.backfill_user_indexes) == 4
+        # The claim keeps other workers from scanning the keyspace again
+        assert await async_redis_client.run_backfill("user_indexes", async_redis_client.backfill_user_indexes) is None
+
+        assert await async_redis_client.get_user_sessions("1") == ["session:1:ip:ua"]
+        assert await async_redis_client.revoke_all_user_refresh_tokens("1") == 3
+        assert not await r.exists("refresh_token:1:legacy", "token_family:1:fam", "refresh_token:1:new")
+        assert await r.exists("refresh_token:2:other") == 1
+
+    run_with_redis(scenario)